@@ -0,0 +1,666 @@
+"""
+数据分析层：实验拟合的闭式最小二乘实现，只依赖 NumPy（不导入 matplotlib/scipy），可在 API 进程与绘图进程中共用。
+
+- 所有函数沿最后一维计算，x / y / w 按 NumPy 规则广播：一维数组得到标量结果，
+  堆叠的二维数组（多组测量、多名学生）一次得到每行的结果；
+- w 为非负权重：补齐长度不一的序列时用 0/1 掩码屏蔽填充位（见 pad），也可以是重抽样次数；
+- 样本不足或 x 无变化时相应结果为 NaN，不抛出异常。
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class LinearFit(NamedTuple):
+    """y = slope·x + intercept 的拟合结果；*_se 为标准误差，n 为有效样本数（权重之和）。"""
+    slope: np.ndarray
+    intercept: np.ndarray
+    r2: np.ndarray
+    slope_se: np.ndarray
+    intercept_se: np.ndarray
+    n: np.ndarray
+
+    def predict(self, x) -> np.ndarray:
+        x = np.asarray(x, dtype=float)
+        if np.ndim(self.slope) == 0:
+            return self.slope * x + self.intercept
+        return self.slope[..., None] * x + self.intercept[..., None]
+
+
+def _prepare(x, y, w) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    w = np.ones_like(y) if w is None else np.asarray(w, dtype=float)
+    x, y, w = np.broadcast_arrays(x, y, w)
+    # 被屏蔽的位置可能是任意填充值，先置 0 避免 NaN 传播
+    masked = w == 0
+    return np.where(masked, 0.0, x), np.where(masked, 0.0, y), w
+
+
+def _scalar(*values):
+    return tuple(v[()] if isinstance(v, np.ndarray) and v.ndim == 0 else v for v in values)
+
+
+def r2_score(y, y_pred, w=None) -> np.ndarray:
+    """决定系数 R² = 1 - SSE/SST；SST 为 0（y 全相同）时取 0。"""
+    y_pred, y, w = _prepare(y_pred, y, w)
+    n = w.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (w * y).sum(axis=-1) / n
+        ss_res = (w * (y - y_pred) ** 2).sum(axis=-1)
+        ss_tot = (w * (y - mean[..., None]) ** 2).sum(axis=-1)
+        r2 = np.where(ss_tot > 0, 1.0 - ss_res / np.where(ss_tot > 0, ss_tot, 1.0), 0.0)
+    return _scalar(r2)[0]
+
+
+def linear_fit(x, y, w=None) -> LinearFit:
+    """普通最小二乘直线拟合（闭式解）。"""
+    x, y, w = _prepare(x, y, w)
+    n = w.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_mean = (w * x).sum(axis=-1) / n
+        y_mean = (w * y).sum(axis=-1) / n
+        dx = x - x_mean[..., None]
+        dy = y - y_mean[..., None]
+        sxx = (w * dx * dx).sum(axis=-1)
+        sxy = (w * dx * dy).sum(axis=-1)
+        syy = (w * dy * dy).sum(axis=-1)
+        slope = np.where(sxx > 0, sxy / np.where(sxx > 0, sxx, 1.0), np.nan)
+        intercept = y_mean - slope * x_mean
+        sse = np.maximum(syy - slope * sxy, 0.0)
+        r2 = np.where(syy > 0, 1.0 - sse / np.where(syy > 0, syy, 1.0), 0.0)
+        s2 = np.where(n > 2, sse / np.where(n > 2, n - 2, 1.0), np.nan)
+        slope_se = np.sqrt(s2 / sxx)
+        intercept_se = np.sqrt(s2 * (1.0 / n + x_mean ** 2 / sxx))
+    return LinearFit(*_scalar(slope, intercept, r2, slope_se, intercept_se, n))
+
+
+def proportional_fit(x, y, w=None) -> LinearFit:
+    """过原点直线拟合 y = slope·x：slope = Σxy / Σx²；R² 与普通拟合一样相对 y 的均值计算。"""
+    x, y, w = _prepare(x, y, w)
+    n = w.sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sxx = (w * x * x).sum(axis=-1)
+        slope = np.where(sxx > 0, (w * x * y).sum(axis=-1) / np.where(sxx > 0, sxx, 1.0), 0.0)
+        resid = y - slope[..., None] * x
+        sse = (w * resid * resid).sum(axis=-1)
+        y_mean = (w * y).sum(axis=-1) / n
+        ss_tot = (w * (y - y_mean[..., None]) ** 2).sum(axis=-1)
+        r2 = np.where(ss_tot > 0, 1.0 - sse / np.where(ss_tot > 0, ss_tot, 1.0), 0.0)
+        s2 = np.where(n > 1, sse / np.where(n > 1, n - 1, 1.0), np.nan)
+        slope_se = np.sqrt(s2 / sxx)
+    return LinearFit(*_scalar(slope, np.zeros_like(slope), r2, slope_se, np.zeros_like(slope), n))
+
+
+def log_fit(x, y, w=None) -> LinearFit:
+    """对数拟合 y = slope·ln(x) + intercept（对 ln x 做直线拟合）；要求有效数据的 x > 0。"""
+    x = np.asarray(x, dtype=float)
+    valid = np.ones(np.broadcast_shapes(x.shape, np.shape(y)), dtype=bool) if w is None else np.asarray(w) != 0
+    if np.any((np.broadcast_to(x, valid.shape) <= 0) & valid):
+        raise ValueError("对数拟合要求 x > 0")
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return linear_fit(np.log(np.where(x > 0, x, 1.0)), y, w)
+
+
+def least_squares(columns, y, w=None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """线性最小二乘 y ≈ Σ coef_j·columns[j]，多组数据按行一次完成；返回 (coef, 拟合值, R²)，coef 形状 (..., 列数)。
+
+    对加权设计矩阵做两遍修正 Gram-Schmidt 正交化（即批量 QR 分解）后回代，不构造正规方程，
+    列之间接近共线（如 1、ln R、(ln R)³）时仍保持数值稳定；列退化或有效点数不足列数时该组结果为 NaN。"""
+    y = np.asarray(y, dtype=float)
+    cols = [np.asarray(c, dtype=float) for c in columns]
+    shape = np.broadcast_shapes(y.shape, *(c.shape for c in cols), () if w is None else np.shape(w))
+    w = np.broadcast_to(np.ones(()) if w is None else np.asarray(w, dtype=float), shape)
+    sw = np.sqrt(w)
+    y = np.where(w > 0, np.broadcast_to(y, shape), 0.0)
+    A = [np.where(w > 0, np.broadcast_to(c, shape), 0.0) * sw for c in cols]
+    p = len(A)
+    R = np.zeros(shape[:-1] + (p, p))
+    Q: List[np.ndarray] = []
+    ok = (w > 0).sum(axis=-1) >= p
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for j, v in enumerate(A):
+            norm0 = np.sqrt((v * v).sum(axis=-1))
+            for _ in range(2):
+                for k, q in enumerate(Q):
+                    r = (q * v).sum(axis=-1)
+                    R[..., k, j] += r
+                    v = v - r[..., None] * q
+            norm = np.sqrt((v * v).sum(axis=-1))
+            ok &= norm > 1e-10 * norm0
+            R[..., j, j] = norm
+            Q.append(v / np.where(norm > 0, norm, 1.0)[..., None])
+        z = [(q * y * sw).sum(axis=-1) for q in Q]
+        coef = np.zeros(shape[:-1] + (p,))
+        for j in reversed(range(p)):
+            acc = z[j] - sum(R[..., j, k] * coef[..., k] for k in range(j + 1, p))
+            coef[..., j] = acc / R[..., j, j]
+        coef = np.where(ok[..., None], coef, np.nan)
+        fitted = sum(coef[..., j, None] * np.broadcast_to(c, shape) for j, c in enumerate(cols))
+        r2 = np.where(ok, r2_score(y, fitted, w), np.nan)
+    return coef, fitted, r2
+
+
+# 密立根：元电荷搜索范围（×10⁻¹⁹ C）。上限小于下限的 2 倍，范围内不会同时出现 e 与 e/2、2e
+CHARGE_MIN = 1.2
+CHARGE_MAX = 2.2
+
+
+def _charge_score(q, w, grid):
+    """各候选 e 下 q/e 偏离最近整数的加权均方值；grid 形状 (G,) 或 (..., G)，结果形状 (..., G)。"""
+    r = q[..., None, :] / grid[..., :, None]
+    d = r - np.rint(r)
+    return (w[..., None, :] * d * d).sum(axis=-1) / w.sum(axis=-1)[..., None]
+
+
+def charge_quantum(q, w=None, e_min: Optional[float] = None, e_max: Optional[float] = None,
+                   steps: int = 2000, refine: int = 50) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """由电荷量 q 推断元电荷与倍数（不需要 ni）：在 [e_min, e_max] 的密集网格上一次计算所有候选 e 的得分
+    （q/e 偏离整数的加权均方值），取最小者并在相邻网格间细化，返回 (e, n, rms)；范围缺省为 CHARGE_MIN~CHARGE_MAX。
+    n = round(q/e)（至少为 1），rms 为 q/e 偏离整数的均方根（0~0.5，越小说明电荷越接近整数倍）。
+    q 为二维时每行独立搜索（整个班级一次完成）；q 需为正，掩码位置可为任意值。"""
+    q = np.asarray(q, dtype=float)
+    w = np.ones_like(q) if w is None else np.broadcast_to(np.asarray(w, dtype=float), q.shape)
+    q = np.where(w == 0, 0.0, q)
+    grid = np.linspace(CHARGE_MIN if e_min is None else e_min, CHARGE_MAX if e_max is None else e_max, steps)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        coarse = grid[np.argmin(_charge_score(q, w, grid), axis=-1)]
+        step = grid[1] - grid[0]
+        fine = coarse[..., None] + np.linspace(-step, step, 2 * refine + 1)
+        score = _charge_score(q, w, fine)
+        idx = np.argmin(score, axis=-1)[..., None]
+        e = np.take_along_axis(fine, idx, axis=-1)[..., 0]
+        rms = np.sqrt(np.take_along_axis(score, idx, axis=-1)[..., 0])
+        n = np.maximum(np.rint(q / e[..., None]), 1.0)
+    return _scalar(e, n, rms)
+
+
+def resample_weights(mask, resamples: int, rng: np.random.Generator) -> np.ndarray:
+    """bootstrap 重抽样：对单个数据集 mask（形状 (n,) 或 (1, n)）中的有效点有放回抽取同样多个点，
+    一次生成 (resamples, n) 的抽中次数矩阵（多项分布）。作为权重 w 传给上述拟合，即一次得到每次重抽样的结果。
+    抽取的下标按行平移后用一次 bincount 计数，比逐行的多项分布抽样快一个数量级。"""
+    m = np.asarray(mask, dtype=float).reshape(-1)
+    total = m.sum()
+    if total <= 0:
+        return np.zeros((resamples, m.size))
+    valid = np.flatnonzero(m > 0)
+    draws = int(round(total))
+    if np.all(m[valid] == 1.0):
+        idx = valid[rng.integers(0, valid.size, size=(resamples, draws))]
+    else:
+        idx = rng.choice(m.size, size=(resamples, draws), p=m / total)
+    idx += np.arange(resamples)[:, None] * m.size
+    return np.bincount(idx.ravel(), minlength=resamples * m.size).reshape(resamples, m.size).astype(float)
+
+
+def percentile_interval(samples, level: float = 0.95) -> Tuple[float, float]:
+    """重抽样结果的百分位置信区间（忽略退化样本的 NaN）；全部无效时为 (NaN, NaN)。"""
+    samples = np.asarray(samples, dtype=float).reshape(-1)
+    samples = samples[np.isfinite(samples)]
+    if samples.size == 0:
+        return float('nan'), float('nan')
+    alpha = (1.0 - level) / 2.0 * 100.0
+    lo, hi = np.percentile(samples, [alpha, 100.0 - alpha])
+    return float(lo), float(hi)
+
+
+def pad(series: Sequence[Sequence[float]], fill: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """把长度不一的序列补齐为二维数组，返回 (values, mask)；mask 可直接作为上述拟合的权重 w。"""
+    width = max((len(s) for s in series), default=0)
+    values = np.full((len(series), width), fill, dtype=float)
+    mask = np.zeros((len(series), width), dtype=float)
+    for i, s in enumerate(series):
+        values[i, :len(s)] = s
+        mask[i, :len(s)] = 1.0
+    return values, mask
+
+
+# -------------------------- 三次样条 --------------------------
+
+class Spline(NamedTuple):
+    """分段三次多项式：第 i 段 [x_i, x_{i+1}] 上 y = c0 + c1·t + c2·t² + c3·t³（t = x - x_i）。
+    c 的形状为 (4, ..., n-1)，多组 y 共用同一 x 时每组一行。"""
+    x: np.ndarray
+    c: np.ndarray
+
+    def __call__(self, xs) -> np.ndarray:
+        xs = np.asarray(xs, dtype=float)
+        i = np.clip(np.searchsorted(self.x, xs, side='right') - 1, 0, len(self.x) - 2)
+        t = xs - self.x[i]
+        c0, c1, c2, c3 = (c[..., i] for c in self.c)
+        return c0 + t * (c1 + t * (c2 + t * c3))
+
+
+def cubic_spline(x, y) -> Spline:
+    """三次样条插值，not-a-knot 边界（与 scipy.interpolate.CubicSpline 默认一致），x 需严格递增。
+
+    以各节点导数为未知量的方程组是三对角的，系数矩阵只与 x 有关：消元系数只算一次，
+    y 为二维（多组电流共用同一 VG2K）时所有组在同一次前代/回代中求解。"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = x.size
+    if n < 2 or np.any(np.diff(x) <= 0):
+        raise ValueError("样条插值要求 x 严格递增且至少 2 个点")
+    dx = np.diff(x)
+    m = np.diff(y, axis=-1) / dx
+    if n == 2:
+        s = np.stack([m[..., 0], m[..., 0]], axis=-1)
+    else:
+        lower = np.zeros(n)
+        diag = np.zeros(n)
+        upper = np.zeros(n)
+        rhs = np.zeros(y.shape)
+        diag[1:-1] = 2 * (dx[:-1] + dx[1:])
+        upper[1:-1] = dx[:-1]
+        lower[1:-1] = dx[1:]
+        rhs[..., 1:-1] = 3 * (dx[1:] * m[..., :-1] + dx[:-1] * m[..., 1:])
+        if n == 3:
+            # 三个点：not-a-knot 退化为过三点的抛物线
+            diag[0], upper[0] = 1.0, 1.0
+            diag[-1], lower[-1] = 1.0, 1.0
+            rhs[..., 0] = 2 * m[..., 0]
+            rhs[..., -1] = 2 * m[..., -1]
+        else:
+            d0 = x[2] - x[0]
+            diag[0], upper[0] = dx[1], d0
+            rhs[..., 0] = ((dx[0] + 2 * d0) * dx[1] * m[..., 0] + dx[0] ** 2 * m[..., 1]) / d0
+            d1 = x[-1] - x[-3]
+            diag[-1], lower[-1] = dx[-2], d1
+            rhs[..., -1] = (dx[-1] ** 2 * m[..., -2] + (2 * d1 + dx[-1]) * dx[-2] * m[..., -1]) / d1
+        # 追赶法：消元系数只依赖 x，逐点递推对所有组同时进行
+        factor = np.zeros(n)
+        denom = np.zeros(n)
+        denom[0] = diag[0]
+        for i in range(1, n):
+            factor[i] = lower[i] / denom[i - 1]
+            denom[i] = diag[i] - factor[i] * upper[i - 1]
+        for i in range(1, n):
+            rhs[..., i] -= factor[i] * rhs[..., i - 1]
+        s = np.empty(y.shape)
+        s[..., -1] = rhs[..., -1] / denom[-1]
+        for i in range(n - 2, -1, -1):
+            s[..., i] = (rhs[..., i] - upper[i] * s[..., i + 1]) / denom[i]
+    c2 = (3 * m - 2 * s[..., :-1] - s[..., 1:]) / dx
+    c3 = (s[..., :-1] + s[..., 1:] - 2 * m) / dx ** 2
+    return Spline(x, np.stack([y[..., :-1], s[..., :-1], c2, c3]))
+
+
+def spline_extrema(spline: Spline) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """样条的极值点：每段导数 c1 + 2c2·t + 3c3·t² 为二次式，所有组、所有段的根一次求出。
+    返回 (组号, x, y, 是否为极大值)，按组号、x 排序；一维样条的组号全为 0。"""
+    c = spline.c.reshape(4, -1, spline.c.shape[-1])
+    _, c1, c2, c3 = c
+    h = np.diff(spline.x)
+    A, B, C = 3 * c3, 2 * c2, c1
+    with np.errstate(invalid='ignore', divide='ignore'):
+        disc = B * B - 4 * A * C
+        sq = np.sqrt(np.where(disc >= 0, disc, np.nan))
+        # 数值稳定的求根公式；A≈0 时退化为一次方程
+        q = -0.5 * (B + np.copysign(sq, B))
+        quad = np.abs(A) > 1e-12 * (np.abs(B) + np.abs(C) + 1e-300)
+        r1 = np.where(quad, q / A, -C / B)
+        r2 = np.where(quad, C / q, np.nan)
+    roots = np.stack([r1, r2])
+    # 每段取 [0, h)，避免在节点处重复计数；变号才是极值（排除重根）
+    curvature = 2 * c2[None] + 6 * c3[None] * roots
+    valid = (roots >= 0) & (roots < h) & np.isfinite(roots) & (np.abs(curvature) > 0)
+    k, g, i = np.nonzero(valid)
+    t = roots[k, g, i]
+    xs = spline.x[i] + t
+    ys = c[0, g, i] + t * (c[1, g, i] + t * (c[2, g, i] + t * c[3, g, i]))
+    peak = curvature[k, g, i] < 0
+    order = np.lexsort((xs, g))
+    return g[order], xs[order], ys[order], peak[order]
+
+
+def _zigzag(x0: float, y0: float, xs, ys, peaks, tol: float) -> List[Tuple[float, float, bool]]:
+    """保留幅度不小于 tol 的交替峰谷：同类相邻取更极端者，反向变化小于 tol 的抖动忽略；曲线起点作为参照。"""
+    out: List[Tuple[float, float, bool]] = []
+    ref = y0
+    for x, y, peak in zip(xs, ys, peaks):
+        if out and out[-1][2] == peak:
+            if (y > out[-1][1]) if peak else (y < out[-1][1]):
+                out[-1] = (x, y, peak)
+        elif abs(y - (out[-1][1] if out else ref)) >= tol:
+            out.append((x, y, peak))
+    return out
+
+
+def _spacing_fit(positions: Sequence[float]) -> Tuple[float, float]:
+    """等间距位置的间距：位置对序号直线拟合的斜率及其标准误差（两个点时为间距本身，误差为 NaN）。"""
+    if len(positions) < 2:
+        return float('nan'), float('nan')
+    fit = linear_fit(np.arange(len(positions)), positions)
+    return float(fit.slope), float(fit.slope_se)
+
+
+def frank_hertz_extrema(vg2k, currents, prominence: float = 0.03) -> List[Dict[str, object]]:
+    """弗兰克-赫兹 I-VG2K 曲线的峰、谷与第一激发电位。
+
+    currents 为二维（每组一行、共用 vg2k）：所有组用同一个样条一次插值（cubic_spline），由导数的根求出全部极值点，
+    再按幅度过滤测量抖动（小于该组电流范围 prominence 倍的峰谷忽略）。
+    相邻峰（谷）的电压差即激发能（eV）；excitation_energy 取峰位对序号直线拟合的斜率，没有两个峰时改用谷。"""
+    x = np.asarray(vg2k, dtype=float)
+    Y = np.atleast_2d(np.asarray(currents, dtype=float))
+    rows, xs, ys, peaks = spline_extrema(cubic_spline(x, Y))
+    bounds = np.searchsorted(rows, np.arange(Y.shape[0] + 1))
+    results = []
+    for g in range(Y.shape[0]):
+        lo, hi = bounds[g], bounds[g + 1]
+        tol = prominence * float(Y[g].max() - Y[g].min())
+        kept = _zigzag(float(x[0]), float(Y[g, 0]), xs[lo:hi].tolist(), ys[lo:hi].tolist(), peaks[lo:hi].tolist(), tol)
+        peak_x = [p[0] for p in kept if p[2]]
+        valley_x = [p[0] for p in kept if not p[2]]
+        e_peak, se_peak = _spacing_fit(peak_x)
+        e_valley, se_valley = _spacing_fit(valley_x)
+        use_peaks = len(peak_x) >= 2
+        results.append({
+            'peaks': [{'x': p[0], 'y': p[1]} for p in kept if p[2]],
+            'valleys': [{'x': p[0], 'y': p[1]} for p in kept if not p[2]],
+            'peak_spacings': np.diff(peak_x).tolist(),
+            'valley_spacings': np.diff(valley_x).tolist(),
+            'excitation_energy': e_peak if use_peaks else e_valley,
+            'excitation_energy_se': se_peak if use_peaks else se_valley,
+            'excitation_energy_peaks': e_peak,
+            'excitation_energy_valleys': e_valley,
+        })
+    return results
+
+
+# -------------------------- 热敏电阻 --------------------------
+
+# 0 °C 对应的热力学温度（K）
+ZERO_CELSIUS = 273.15
+
+
+def _rows(value):
+    """批量结果的每行系数扩展一维，便于与自变量序列广播。"""
+    value = np.asarray(value, dtype=float)
+    return value if value.ndim == 0 else value[..., None]
+
+
+class CVDFit(NamedTuple):
+    """Pt100 的 Callendar–Van Dusen 方程（0 °C 以上）R(t) = R0·(1 + A·t + B·t²)，t 为 °C；
+    alpha = (R100 - R0)/(100·R0) = A + 100·B。"""
+    r0: np.ndarray
+    a: np.ndarray
+    b: np.ndarray
+    alpha: np.ndarray
+    r2: np.ndarray
+
+    def resistance(self, t) -> np.ndarray:
+        t = np.asarray(t, dtype=float)
+        return _rows(self.r0) * (1.0 + _rows(self.a) * t + _rows(self.b) * t * t)
+
+
+class BetaFit(NamedTuple):
+    """NTC 的 Beta 模型 R(T) = R25·exp(beta·(1/T - 1/298.15))，T 为 K；r2 为 ln R 的决定系数。"""
+    beta: np.ndarray
+    beta_se: np.ndarray
+    r25: np.ndarray
+    r2: np.ndarray
+
+    def resistance(self, t) -> np.ndarray:
+        inv = 1.0 / (np.asarray(t, dtype=float) + ZERO_CELSIUS) - 1.0 / (25.0 + ZERO_CELSIUS)
+        return _rows(self.r25) * np.exp(_rows(self.beta) * inv)
+
+
+class SteinhartHart(NamedTuple):
+    """NTC 的 Steinhart–Hart 方程 1/T = a + b·ln R + c·(ln R)³，T 为 K；max_error 为拟合温度的最大偏差（K）。"""
+    a: np.ndarray
+    b: np.ndarray
+    c: np.ndarray
+    max_error: np.ndarray
+
+    def temperature(self, r) -> np.ndarray:
+        """电阻（Ω）对应的温度（°C）。"""
+        log_r = np.log(np.asarray(r, dtype=float))
+        return 1.0 / (_rows(self.a) + _rows(self.b) * log_r + _rows(self.c) * log_r ** 3) - ZERO_CELSIUS
+
+
+def callendar_van_dusen(t, r, w=None) -> CVDFit:
+    """Pt100 电阻-温度（°C）数据按 R = R0 + R0·A·t + R0·B·t² 做线性最小二乘（least_squares），多组数据按行一次完成；
+    有效温度点少于 3 个时为 NaN。"""
+    t, r, w = _prepare(t, r, w)
+    coef, _, r2 = least_squares([np.ones_like(t), t, t * t], r, w)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r0 = coef[..., 0]
+        a, b = coef[..., 1] / r0, coef[..., 2] / r0
+    return CVDFit(*_scalar(r0, a, b, a + 100.0 * b, r2))
+
+
+def _ntc_prepare(t, r, w):
+    t, r, w = _prepare(t, r, w)
+    # 对数模型只使用 R > 0 的点
+    w = np.where(r > 0, w, 0.0)
+    return 1.0 / (t + ZERO_CELSIUS), np.log(np.where(w > 0, r, 1.0)), w
+
+
+def ntc_beta(t, r, w=None) -> BetaFit:
+    """NTC 电阻-温度（°C）数据的 Beta 拟合：ln R 对 1/T 直线拟合，斜率即 beta，闭式解。"""
+    inv_t, log_r, w = _ntc_prepare(t, r, w)
+    fit = linear_fit(inv_t, log_r, w)
+    with np.errstate(invalid='ignore', over='ignore'):
+        r25 = np.exp(fit.intercept + fit.slope / (25.0 + ZERO_CELSIUS))
+    return BetaFit(*_scalar(fit.slope, fit.slope_se, r25, fit.r2))
+
+
+def steinhart_hart(t, r, w=None) -> SteinhartHart:
+    """NTC 电阻-温度（°C）数据的 Steinhart–Hart 拟合：1/T 对 (1, ln R, (ln R)³) 做线性最小二乘（least_squares），
+    多组数据按行一次完成；有效点少于 3 个时为 NaN。"""
+    inv_t, log_r, w = _ntc_prepare(t, r, w)
+    coef, fitted, _ = least_squares([np.ones_like(log_r), log_r, log_r ** 3], inv_t, w)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        error = np.where(w > 0, np.abs(1.0 / fitted - 1.0 / inv_t), -np.inf).max(axis=-1)
+        error = np.where(np.isfinite(coef[..., 0]), error, np.nan)
+    return SteinhartHart(*_scalar(coef[..., 0], coef[..., 1], coef[..., 2], error))
+
+
+# -------------------------- 太阳能电池 --------------------------
+
+# 300 K 时的热电压 kT/q（V）
+THERMAL_VOLTAGE = 0.025852
+
+
+class IVParams(NamedTuple):
+    """光照伏安曲线参数（电压 V、电流 mA）：短路电流、开路电压、最大功率点、填充因子、串联/并联电阻（Ω）。"""
+    isc: np.ndarray
+    voc: np.ndarray
+    pmax: np.ndarray
+    vmp: np.ndarray
+    imp: np.ndarray
+    ff: np.ndarray
+    rs: np.ndarray
+    rsh: np.ndarray
+
+
+class DiodeFit(NamedTuple):
+    """单二极管模型 I = I0·(exp((V - I·Rs)/a) - 1) 的拟合结果：I0（mA）、a = n·Ns·kT/q（V）、
+    n 为理想因子与串联片数之积（a/kT·q）、Rs（Ω）、r2 为电压的决定系数。"""
+    i0: np.ndarray
+    a: np.ndarray
+    n: np.ndarray
+    rs: np.ndarray
+    r2: np.ndarray
+
+    def voltage(self, current) -> np.ndarray:
+        """给定电流（mA）的模型电压：V = a·ln(I/I0 + 1) + I·Rs（对电流显式，绘图时不必迭代求解）。"""
+        i = np.asarray(current, dtype=float)
+        return self.a * np.log(i / self.i0 + 1.0) + i * self.rs / 1000.0
+
+
+def _sort_valid(v, i, w):
+    """按电压排序，无效点排到最后；返回 (v, i, w, 有效点序号 1..k)。"""
+    v, i, w = _prepare(v, i, w)
+    order = np.argsort(np.where(w > 0, v, np.inf), axis=-1, kind='stable')
+    v, i, w = (np.take_along_axis(a, order, axis=-1) for a in (v, i, w))
+    return v, i, w, np.cumsum(w > 0, axis=-1)
+
+
+def iv_parameters(v, i, w=None, edge: float = 0.1) -> IVParams:
+    """由光照伏安曲线（电流为正的发电象限）计算电池参数，多条曲线按行一次完成。
+
+    - 最大功率点：相邻测量点之间按线性插值，P(t) = V(t)·I(t) 为二次式，各段极值与端点一起取最大；
+    - Isc、Rsh：低电压端（前 edge 比例、至少 3 个点）拟合 I = Isc - V/Rsh；
+    - Voc、Rs：高电压端（后 edge 比例、至少 3 个点）拟合 V = Voc - Rs·I；
+      测量未到达 I=0 或 V=0 时即为外推值；
+    - FF = Pmax / (Isc·Voc)。"""
+    v, i, w, rank = _sort_valid(v, i, w)
+    count = rank[..., -1:]
+    k = np.maximum(3, np.ceil(edge * count))
+    valid = w > 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # bootstrap 时 w 为抽中次数，端点拟合按次数加权
+        low = linear_fit(v, i, np.where(valid & (rank <= k), w, 0.0))
+        high = linear_fit(i, v, np.where(valid & (rank > count - k), w, 0.0))
+        isc = low.intercept
+        rsh = -1000.0 / low.slope
+        voc = high.intercept
+        rs = -1000.0 * high.slope
+        # 各段内的功率极值：P(t) = (v0 + t·dv)(i0 + t·di)，t ∈ [0, 1]
+        v0, i0 = v[..., :-1], i[..., :-1]
+        dv, di = np.diff(v, axis=-1), np.diff(i, axis=-1)
+        seg = valid[..., :-1] & valid[..., 1:]
+        t = np.clip(np.where(dv * di != 0, -(v0 * di + i0 * dv) / (2 * dv * di), 0.0), 0.0, 1.0)
+        cand_v = np.concatenate([v0 + t * dv, v], axis=-1)
+        cand_i = np.concatenate([i0 + t * di, i], axis=-1)
+        power = np.where(np.concatenate([seg, valid], axis=-1), cand_v * cand_i, -np.inf)
+        best = np.argmax(power, axis=-1)[..., None]
+        pmax = np.take_along_axis(power, best, axis=-1)[..., 0]
+        vmp = np.take_along_axis(cand_v, best, axis=-1)[..., 0]
+        imp = np.take_along_axis(cand_i, best, axis=-1)[..., 0]
+        ff = pmax / (isc * voc)
+    return IVParams(*_scalar(isc, voc, pmax, vmp, imp, ff, rs, rsh))
+
+
+def diode_fit(v, i, w=None) -> DiodeFit:
+    """全暗伏安曲线的单二极管模型拟合，多条曲线按行一次完成。
+
+    正向导通区 I ≫ I0，模型化为 V = a·ln I + Rs·I + c（c = -a·ln I0），对未知量 (a, Rs, c) 是线性的，
+    用 least_squares 一次求解，无需迭代与初值；只使用 I > 0 的点。"""
+    v, i, w = _prepare(v, i, w)
+    w = np.where(i > 0, w, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        log_i = np.log(np.where(w > 0, i, 1.0))
+        coef, _, r2 = least_squares([log_i, i, np.ones_like(i)], v, w)
+        a, rs, c = coef[..., 0], coef[..., 1], coef[..., 2]
+        i0 = np.exp(-c / a)
+    return DiodeFit(*_scalar(i0, a, a / THERMAL_VOLTAGE, rs * 1000.0, r2))
+
+
+# -------------------------- 激光二极管阈值 --------------------------
+
+class LaserThreshold(NamedTuple):
+    """LD 的 P-I 曲线两段拟合：激射区直线 P = slope·I + intercept 与 P=0 的交点为阈值电流 i_th，
+    i_th_se 为其标准误差（反预测公式，不含分段位置本身的不确定度），slope_se 为斜率的标准误差；
+    start 为激射区第一个点的电流，below 为阈值以下（自发辐射区）的点数，r2 为激射区直线的决定系数。"""
+    i_th: np.ndarray
+    i_th_se: np.ndarray
+    slope: np.ndarray
+    intercept: np.ndarray
+    slope_se: np.ndarray
+    r2: np.ndarray
+    start: np.ndarray
+    below: np.ndarray
+
+
+def _segment_line(s):
+    """由一段的累加量 (Σw, Σwx, Σwy, Σwx², Σwxy, Σwy²) 求直线：返回 (slope, x̄, ȳ, sxx, sse, syy)。"""
+    sw, sx, sy, sxx, sxy, syy = (s[..., j] for j in range(6))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_mean, y_mean = sx / sw, sy / sw
+        cxx = np.maximum(sxx - sx * x_mean, 0.0)
+        cxy = sxy - sx * y_mean
+        cyy = np.maximum(syy - sy * y_mean, 0.0)
+        slope = np.where(cxx > 0, cxy / np.where(cxx > 0, cxx, 1.0), np.nan)
+        sse = np.where(cxx > 0, np.maximum(cyy - slope * cxy, 0.0), 0.0)
+    return slope, x_mean, y_mean, cxx, sse, cyy
+
+
+def laser_threshold(i, p, w=None, start=None, min_points: int = 2) -> LaserThreshold:
+    """LD 阈值电流，多条曲线按行一次完成。
+
+    start 为 None 时自动分段：按电流排序后，对所有候选分段位置（两段各至少 min_points 个点）一次算出
+    “阈值以下直线 + 激射区直线”的残差平方和，取最小者。各段的累加量由前缀和相减得到，
+    所有候选共 O(n) 次运算，而不是逐个位置重新拟合；点数不足两段时整条曲线按激射区拟合。
+    start 为整数（或每行一个整数的数组）时沿用手动方式：原始顺序下标 ≥ start 的点为激射区。"""
+    i, p, w = _prepare(i, p, w)
+    n = i.shape[-1]
+    valid = w > 0
+    # 先减去整体均值，累加量的相减不损失精度
+    with np.errstate(invalid='ignore', divide='ignore'):
+        total = w.sum(axis=-1, keepdims=True)
+        x0 = np.where(total > 0, (w * i).sum(axis=-1, keepdims=True) / total, 0.0)
+        y0 = np.where(total > 0, (w * p).sum(axis=-1, keepdims=True) / total, 0.0)
+    x, y = np.where(valid, i - x0, 0.0), np.where(valid, p - y0, 0.0)
+
+    def moments(w, x, y):
+        return np.stack([w, w * x, w * y, w * x * x, w * x * y, w * y * y], axis=-1)
+
+    if start is not None:
+        idx = np.arange(n)
+        lasing = valid & (idx >= np.asarray(start)[..., None])
+        seg = moments(np.where(lasing, w, 0.0), x, y).sum(axis=-2)
+        below = (valid & ~lasing).sum(axis=-1)
+        first = np.where(lasing, i, np.inf).min(axis=-1)
+    else:
+        order = np.argsort(np.where(valid, i, np.inf), axis=-1, kind='stable')
+        ws, xs, ys = (np.take_along_axis(a, order, axis=-1) for a in (w, x, y))
+        m = moments(ws, xs, ys)
+        # prefix[..., k, :] 为排序后前 k 个点的累加量，k = 0..n
+        prefix = np.concatenate([np.zeros(m.shape[:-2] + (1, 6)), np.cumsum(m, axis=-2)], axis=-2)
+        suffix = prefix[..., -1:, :] - prefix
+        counts = np.concatenate([np.zeros(ws.shape[:-1] + (1,)), np.cumsum(ws > 0, axis=-1)], axis=-1)
+        count = counts[..., -1:]
+        cost = _segment_line(prefix)[4] + _segment_line(suffix)[4]
+        ok = (counts >= min_points) & (count - counts >= min_points)
+        cost = np.where(ok, cost, np.inf)
+        k = np.where(ok.any(axis=-1), np.argmin(cost, axis=-1), 0)
+        seg = np.take_along_axis(suffix, k[..., None, None], axis=-2)[..., 0, :]
+        below = np.take_along_axis(counts, k[..., None], axis=-1)[..., 0].astype(int)
+        i_sorted = np.take_along_axis(i, order, axis=-1)
+        first = np.take_along_axis(np.concatenate([i_sorted, np.full(i.shape[:-1] + (1,), np.nan)], axis=-1),
+                                   k[..., None], axis=-1)[..., 0]
+    slope, x_mean, y_mean, sxx, sse, syy = _segment_line(seg)
+    x0, y0 = x0[..., 0], y0[..., 0]
+    sw = seg[..., 0]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        intercept = (y_mean + y0) - slope * (x_mean + x0)
+        i_th = np.where(slope != 0, -intercept / slope, np.nan)
+        s2 = np.where(sw > 2, sse / np.where(sw > 2, sw - 2, 1.0), np.nan)
+        i_th_se = np.sqrt(s2 / slope ** 2 * (1.0 / sw + (i_th - x_mean - x0) ** 2 / sxx))
+        r2 = np.where(syy > 0, 1.0 - sse / np.where(syy > 0, syy, 1.0), 0.0)
+        slope_se = np.sqrt(s2 / sxx)
+    return LaserThreshold(*_scalar(i_th, i_th_se, slope, intercept, slope_se, np.where(np.isfinite(slope), r2, np.nan),
+                                   first, below))
+
+
+# -------------------------- 导出常数 --------------------------
+
+def spring_constant(t2_m_slope):
+    """弹簧振子：T² = (4π²/k)·M，由 T²-M 斜率得劲度系数 k（N/m）；斜率为 0 时取 0。"""
+    s = np.asarray(t2_m_slope, dtype=float)
+    with np.errstate(divide='ignore'):
+        return _scalar(np.where(s != 0, 4 * np.pi ** 2 / np.where(s != 0, s, 1.0), 0.0))[0]
+
+
+def angular_frequency(v2_x2_slope):
+    """简谐振动：v² = ω²(A² - x²)，v²-x² 斜率为 -ω²；斜率非负时取 0。"""
+    s = np.asarray(v2_x2_slope, dtype=float)
+    return _scalar(np.where(s < 0, np.sqrt(np.abs(s)), 0.0))[0]
+
+
+def period(omega):
+    """由角频率得周期 T = 2π/ω；ω 为 0 时取 0。"""
+    o = np.asarray(omega, dtype=float)
+    with np.errstate(divide='ignore'):
+        return _scalar(np.where(o > 0, 2 * np.pi / np.where(o > 0, o, 1.0), 0.0))[0]
+
+
+def x_intercept(fit: LinearFit):
+    """直线与 x 轴交点 -intercept/slope（如 LD 阈值电流）；斜率为 0 时取 0。"""
+    k = np.asarray(fit.slope, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return _scalar(np.where(k != 0, -np.asarray(fit.intercept) / np.where(k != 0, k, 1.0), 0.0))[0]
+
@@ -0,0 +1,359 @@
+"""
+批量分析：对同一实验的多份数据集（如一个教学班的提交）一次性计算拟合结果与导出常数，不绘图。
+
+每个实验的分析函数接收已校验的请求体列表，把各数据集的序列补齐为二维数组（app.analysis.pad，掩码屏蔽填充位），
+对所有数据集一次完成向量化拟合，返回 {列名: 每个数据集的取值}；无法计算的值为 NaN（输出为 null）。
+
+- 接口：POST /api/admin/analysis/<实验名>（管理员），见 doc/api.md；
+- 命令行：python -m app.batch_analysis <实验名> datasets.json [-o result.csv]
+
+各分析函数的 resample 参数用于 bootstrap：把每条拟合的掩码换成重抽样次数矩阵，得到单个数据集导出常数的置信区间（见 bootstrap）。
+
+本模块在首次使用时才导入（依赖 numpy），API 进程启动时不加载。
+"""
+
+import argparse
+import csv
+import json
+import math
+import sys
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from pydantic import ValidationError
+
+from . import analysis, figures
+from .experiments import EXPERIMENTS, Experiment, PlotInputError
+
+Columns = Dict[str, np.ndarray]
+# 拟合权重的变换：批量分析原样使用掩码；bootstrap 时换成重抽样次数矩阵（见 bootstrap）
+Resample = Callable[[np.ndarray], np.ndarray]
+# bootstrap 每批重抽样矩阵（次数 × 点数）的元素数上限（float64 约 8 MB），见 bootstrap
+BOOTSTRAP_CHUNK_ELEMENTS = 1 << 20
+
+
+def _keep(mask: np.ndarray) -> np.ndarray:
+    return mask
+
+
+class UnsupportedExperiment(ValueError):
+    """该实验没有可批量计算的拟合结果。"""
+
+
+def _pad(payloads: Sequence[Any], getter: Callable[[Any], Any]):
+    return analysis.pad([getter(p) for p in payloads])
+
+
+def _fit_columns(prefix: str, fit: analysis.LinearFit) -> Columns:
+    return {
+        f'{prefix}_slope': fit.slope, f'{prefix}_intercept': fit.intercept,
+        f'{prefix}_slope_se': fit.slope_se, f'{prefix}_r2': fit.r2,
+    }
+
+
+def _relative_se(value, slope, slope_se):
+    # 导出常数与斜率成反比时，相对误差与斜率相同
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.abs(value) * slope_se / np.abs(slope)
+
+
+# -------------------------- 各实验 --------------------------
+
+def _millikan_ni(payloads) -> List[Any]:
+    """各数据集的倍数 ni：已提供的直接使用；未提供的按搜索范围分组，每组一次向量化推断（见 analysis.charge_quantum）。"""
+    ni: List[Any] = [p.ni if figures.filled(p.ni) else None for p in payloads]
+    groups: Dict[tuple, List[int]] = {}
+    for i, p in enumerate(payloads):
+        if ni[i] is None:
+            groups.setdefault((p.e_min, p.e_max), []).append(i)
+    for (e_min, e_max), idx in groups.items():
+        qi, mask = _pad([payloads[i] for i in idx], lambda p: p.qi)
+        _, n, _ = analysis.charge_quantum(qi, mask, e_min, e_max)
+        for row, i in enumerate(idx):
+            ni[i] = n[row, :len(payloads[i].qi)]
+    return ni
+
+
+def millikan(payloads, resample: Resample = _keep) -> Columns:
+    ni, mask = analysis.pad(_millikan_ni(payloads))
+    qi, _ = _pad(payloads, lambda p: p.qi)
+    fit = analysis.proportional_fit(ni, qi, resample(mask))
+    return {'e': fit.slope, 'e_se': fit.slope_se, 'r2': fit.r2, 'n': fit.n}
+
+
+def mechanics(payloads, resample: Resample = _keep) -> Columns:
+    weights, mask = _pad(payloads, lambda p: p.t2m.weights_g)
+    T10, _ = _pad(payloads, lambda p: p.t2m.T10_avg_s)
+    m0 = np.array([float(p.t2m.m0_g) for p in payloads])
+    M_kg = (m0[:, None] + weights) / 1000.0
+    t2m = analysis.linear_fit(M_kg, (T10 / 10.0) ** 2, resample(mask))
+    k = analysis.spring_constant(t2m.slope)
+
+    x_cm, mask_v = _pad(payloads, lambda p: p.v2x2.x_cm)
+    v_cms, _ = _pad(payloads, lambda p: p.v2x2.v_avg_cms)
+    v2x2 = analysis.linear_fit(x_cm ** 2, v_cms ** 2, resample(mask_v))
+    omega = analysis.angular_frequency(v2x2.slope)
+    return dict(
+        _fit_columns('t2m', t2m), k=k, k_se=_relative_se(k, t2m.slope, t2m.slope_se),
+        **_fit_columns('v2x2', v2x2), omega=omega, T_calc=analysis.period(omega),
+    )
+
+
+def _group_mean(t_rows: List[Any], v_rows: List[List[Optional[Any]]]):
+    """每个数据集若干次测量按点取平均（长度与 t 不一致或缺失的测量不参与），返回 (t, v_avg, mask)。"""
+    t, mask = analysis.pad(t_rows)
+    n, width = t.shape
+    groups = max(len(v) for v in v_rows)
+    values = np.zeros((n, groups, width))
+    used = np.zeros((n, groups))
+    for i, vs in enumerate(v_rows):
+        for j, v in enumerate(vs):
+            if v is not None and len(v) == len(t_rows[i]):
+                values[i, j, :len(v)] = v
+                used[i, j] = 1.0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        v_avg = (values * used[:, :, None]).sum(axis=1) / used.sum(axis=1)[:, None]
+    return t, v_avg, mask
+
+
+def ultrasound(payloads, resample: Resample = _keep) -> Columns:
+    t, v, mask = _group_mean(
+        [p.t_free_fall for p in payloads],
+        [[p.v_free_fall_1, p.v_free_fall_2, p.v_free_fall_3, p.v_free_fall_4] for p in payloads],
+    )
+    free_fall = analysis.linear_fit(t, v, resample(mask))
+    cols: Columns = {'g': free_fall.slope, 'g_se': free_fall.slope_se, 'g_r2': free_fall.r2}
+    for idx in (1, 2, 3):
+        t, v, mask = _group_mean(
+            [getattr(p, f't{idx}') for p in payloads],
+            [[getattr(p, f'v{idx}_{k}') for k in (1, 2, 3, 4)] for p in payloads],
+        )
+        fit = analysis.linear_fit(t, v, resample(mask))
+        cols.update({f'a{idx}': fit.slope, f'a{idx}_se': fit.slope_se, f'a{idx}_r2': fit.r2})
+    m, mask = _pad(payloads, lambda p: p.m)
+    a, _ = _pad(payloads, lambda p: p.a_measured)
+    cols.update(_fit_columns('newton', analysis.linear_fit(m, a, resample(mask))))
+    return cols
+
+
+def solar_cell(payloads, resample: Resample = _keep) -> Columns:
+    lp, mask = _pad(payloads, lambda p: p.light_power)
+    isc, _ = _pad(payloads, lambda p: p.short_circuit_current)
+    voc, _ = _pad(payloads, lambda p: p.open_circuit_voltage)
+    # 两条拟合来自同一组测量，按行成对重抽样
+    w = resample(mask)
+    cols = _fit_columns('isc_power', analysis.linear_fit(lp, isc, w))
+    # 对数拟合要求光功率为正：含非正值的数据集不参与（结果为 null）
+    log_mask = mask * ~((lp <= 0) & (mask > 0)).any(axis=1, keepdims=True)
+    cols.update(_fit_columns('voc_log_power', analysis.log_fit(np.where(log_mask > 0, lp, 1.0), voc, w * log_mask)))
+    # 伏安曲线参数：光照、全暗曲线各自按点重抽样
+    lv, lmask = _pad(payloads, lambda p: p.light_voltage)
+    li, _ = _pad(payloads, lambda p: p.light_current)
+    iv = analysis.iv_parameters(lv, li, resample(lmask))
+    cols.update({name: getattr(iv, name) for name in ('pmax', 'vmp', 'imp', 'isc', 'voc')})
+    cols.update(fill_factor=iv.ff, rs=iv.rs, rsh=iv.rsh)
+    dv, dmask = _pad(payloads, lambda p: p.dark_voltage)
+    di, _ = _pad(payloads, lambda p: p.dark_current)
+    diode = analysis.diode_fit(dv, di, resample(dmask))
+    cols.update({f'diode_{name}': getattr(diode, name) for name in ('i0', 'n', 'rs', 'r2')})
+    return cols
+
+
+def thermal(payloads, resample: Resample = _keep) -> Columns:
+    temps, mask = _pad(payloads, lambda p: figures.temperatures(p))
+    r, _ = _pad(payloads, lambda p: p.pt100_resistance)
+    ntc, _ = _pad(payloads, lambda p: p.ntc_resistance)
+    # 每个温度点同时测 Pt100 与 NTC：所有拟合按温度点成对重抽样
+    w = resample(mask)
+    fit = analysis.linear_fit(temps, r, w)
+    cols = dict(_fit_columns('pt100', fit), pt100_R0=fit.intercept)
+    cols.update(_thermal_models(temps, r, ntc, w))
+    # 温度系数取 Callendar–Van Dusen 拟合的 alpha，与图中标注及数据接口一致
+    cols['pt100_alpha'] = cols['cvd_alpha']
+    return cols
+
+
+def _thermal_models(temps, pt100, ntc, mask) -> Columns:
+    """Pt100 的 Callendar–Van Dusen 系数与 NTC 的 Beta、Steinhart–Hart 系数。"""
+    cvd = analysis.callendar_van_dusen(temps, pt100, mask)
+    beta = analysis.ntc_beta(temps, ntc, mask)
+    sh = analysis.steinhart_hart(temps, ntc, mask)
+    return {
+        'cvd_R0': cvd.r0, 'cvd_A': cvd.a, 'cvd_B': cvd.b, 'cvd_alpha': cvd.alpha, 'cvd_r2': cvd.r2,
+        'ntc_beta': beta.beta, 'ntc_beta_se': beta.beta_se, 'ntc_R25': beta.r25, 'ntc_beta_r2': beta.r2,
+        'sh_a': sh.a, 'sh_b': sh.b, 'sh_c': sh.c, 'sh_max_error': sh.max_error,
+    }
+
+
+def frank_hertz(payloads, resample: Resample = _keep) -> Columns:
+    """第一激发电位：与数据接口相同，每组取峰位（峰不足两个时取谷位）对序号直线拟合的斜率，数据集的值为各组平均。
+    极值位置由原始曲线求出；bootstrap 时每组的极值位置分别重抽样。"""
+    positions: List[List[float]] = []
+    owner: List[int] = []
+    for i, p in enumerate(payloads):
+        currents = np.stack([np.asarray(g.currents, dtype=float) for g in p.groups])
+        for r in analysis.frank_hertz_extrema(figures.vg2k(p), currents):
+            points = r['peaks'] if len(r['peaks']) >= 2 else r['valleys']
+            positions.append([q['x'] for q in points])
+            owner.append(i)
+    x, mask = analysis.pad(positions)
+    order = np.broadcast_to(np.arange(x.shape[1], dtype=float), x.shape)
+    w = np.stack([resample(mask[j]) for j in range(len(positions))], axis=-2)
+    slope = analysis.linear_fit(order, x, w).slope
+    # 按数据集对有效的组取平均
+    groups = (np.asarray(owner)[:, None] == np.arange(len(payloads))).astype(float)
+    valid = np.isfinite(slope)
+    count = valid.astype(float) @ groups
+    with np.errstate(divide='ignore', invalid='ignore'):
+        energy = np.where(valid, slope, 0.0) @ groups / count
+    return {'excitation_energy': energy, 'excitation_energy_groups': count}
+
+
+def photo_devices(payloads, resample: Resample = _keep) -> Columns:
+    ld_I, mask = _pad(payloads, lambda p: p.ld_I)
+    ld_P, _ = _pad(payloads, lambda p: p.ld_P)
+    # 与绘图一致：给定 ld_linear_start_idx 的数据集从该下标起拟合，其余自动分段（analysis.laser_threshold）
+    manual = np.array([p.ld_linear_start_idx is not None for p in payloads])
+    start = np.array([
+        max(0, min(int(p.ld_linear_start_idx or 0), max(0, len(p.ld_I) - 1))) for p in payloads
+    ])
+    w = resample(mask)
+    fixed = analysis.laser_threshold(ld_I, ld_P, w, start=start)
+    # 自动分段只在原始数据上选一次（按电流排序后的位置），重抽样沿用该位置：
+    # 区间与 I_th_se 对应同一个激射区，不会因个别重抽样改选分段而出现离群值
+    order = np.argsort(np.where(mask > 0, ld_I, np.inf), axis=-1, kind='stable')
+    I_s, P_s, mask_s = (np.take_along_axis(a, order, axis=-1) for a in (ld_I, ld_P, mask))
+    split = analysis.laser_threshold(I_s, P_s, mask_s).below
+    w_s = np.take_along_axis(w, np.broadcast_to(order, w.shape), axis=-1)
+    auto = analysis.laser_threshold(I_s, P_s, w_s, start=split)
+    th = analysis.LaserThreshold(*(np.where(manual, b, a) for a, b in zip(auto, fixed)))
+    return {
+        'ld_slope': th.slope, 'ld_intercept': th.intercept, 'ld_slope_se': th.slope_se, 'ld_r2': th.r2,
+        'ld_start_current': th.start, 'ld_below': th.below,
+        'I_th': th.i_th, 'I_th_se': th.i_th_se,
+    }
+
+
+ANALYZERS: Dict[str, Callable[..., Columns]] = {
+    'frank-hertz': frank_hertz,
+    'millikan': millikan,
+    'mechanics': mechanics,
+    'ultrasound': ultrasound,
+    'solar-cell': solar_cell,
+    'thermal': thermal,
+    'photo-devices': photo_devices,
+}
+
+
+# -------------------------- 不确定度 --------------------------
+
+def bootstrap(exp: Experiment, payload, resamples: int = 2000, level: float = 0.95, seed: int = 0) -> Dict[str, Dict[str, Optional[float]]]:
+    """单个数据集导出常数（exp.constants）的 bootstrap 置信区间。
+
+    每条拟合的有效点生成一批有放回重抽样的抽中次数（多项分布），作为权重传给拟合函数，一批重抽样在同一次向量化计算中完成；
+    每批的重抽样矩阵不超过 BOOTSTRAP_CHUNK_ELEMENTS 个元素，长序列分多批计算，内存占用不随点数增长。
+    退化的重抽样（如 x 全相同）结果为 NaN，不计入区间。
+    固定随机种子，相同数据得到相同区间。返回 {常数: {value, ci_low, ci_high, se}}，无法计算的值为 None。"""
+    analyze = ANALYZERS[exp.name]
+    rng = np.random.default_rng(seed)
+    sizes: List[int] = []
+    point = analyze([payload], resample=lambda mask: sizes.append(np.size(mask)) or mask)
+    # 同一批内各条拟合的重抽样次数相同，按最长的序列确定每批次数
+    chunk = max(1, min(resamples, BOOTSTRAP_CHUNK_ELEMENTS // max(sizes, default=1)))
+    samples = {name: np.empty(resamples) for name in exp.constants}
+    for start in range(0, resamples, chunk):
+        size = min(chunk, resamples - start)
+        part = analyze([payload], resample=lambda mask: analysis.resample_weights(mask, size, rng))
+        for name in exp.constants:
+            samples[name][start:start + size] = np.asarray(part[name], dtype=float).reshape(-1)
+    result = {}
+    for name in exp.constants:
+        s = samples[name]
+        lo, hi = analysis.percentile_interval(s, level)
+        finite = s[np.isfinite(s)]
+        result[name] = {
+            'value': _number(np.asarray(point[name]).reshape(-1)[0]),
+            'ci_low': _number(lo), 'ci_high': _number(hi),
+            'se': _number(finite.std(ddof=1)) if finite.size > 1 else None,
+        }
+    return result
+
+
+# -------------------------- 表格 --------------------------
+
+def _number(value: float) -> Optional[float]:
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def run(exp: Experiment, datasets: Sequence[Dict[str, Any]], labels: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """校验并分析全部数据集，返回 {experiment, columns, rows}；每行含 label、error 与 values（按 columns 顺序）。
+    单个数据集校验失败只影响该行。"""
+    analyze = ANALYZERS.get(exp.name)
+    if analyze is None:
+        raise UnsupportedExperiment(f"实验 {exp.name} 暂不支持批量分析")
+    if labels is not None and len(labels) != len(datasets):
+        raise ValueError("labels 数量需与 datasets 一致")
+    errors: List[Optional[str]] = []
+    valid = []
+    for data in datasets:
+        try:
+            payload = exp.request_model.model_validate(data)
+            exp.validate(payload)
+        except ValidationError as e:
+            err = e.errors()[0]
+            errors.append(f"字段 {'.'.join(str(x) for x in err['loc'])} 格式错误")
+        except PlotInputError as e:
+            errors.append(str(e))
+        else:
+            errors.append(None)
+            valid.append(payload)
+    columns = analyze(valid) if valid else {}
+    names = list(columns)
+    table = [np.broadcast_to(np.asarray(columns[name], dtype=float), (len(valid),)).tolist() for name in names]
+    rows = []
+    k = 0
+    for i, error in enumerate(errors):
+        values: List[Optional[float]] = [None] * len(names)
+        if error is None:
+            values = [_number(col[k]) for col in table]
+            k += 1
+        rows.append({'label': labels[i] if labels else str(i + 1), 'error': error, 'values': values})
+    return {'experiment': exp.name, 'columns': names, 'rows': rows}
+
+
+# -------------------------- 命令行 --------------------------
+
+def _load(path: str) -> Dict[str, Any]:
+    """读取数据集文件：JSON（数据集列表，或 {"datasets": [...], "labels": [...]}），或每行一个数据集的 JSON Lines。"""
+    with (sys.stdin if path == '-' else open(path, encoding='utf-8')) as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        data = [json.loads(line) for line in text.splitlines() if line.strip()]
+    return data if isinstance(data, dict) else {'datasets': data}
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(prog='python -m app.batch_analysis', description='批量计算实验拟合结果（不绘图）')
+    parser.add_argument('experiment', choices=sorted(ANALYZERS), help='实验名')
+    parser.add_argument('datasets', help="数据集文件（JSON 或 JSON Lines），'-' 表示标准输入")
+    parser.add_argument('-o', '--output', help='输出 CSV 文件，缺省输出到标准输出')
+    args = parser.parse_args(argv)
+
+    data = _load(args.datasets)
+    result = run(EXPERIMENTS[args.experiment], data.get('datasets') or [], data.get('labels'))
+    out = open(args.output, 'w', newline='', encoding='utf-8-sig') if args.output else sys.stdout
+    try:
+        writer = csv.writer(out)
+        writer.writerow(['label'] + result['columns'] + ['error'])
+        for row in result['rows']:
+            writer.writerow([row['label']] + ['' if v is None else f'{v:.6g}' for v in row['values']] + [row['error'] or ''])
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
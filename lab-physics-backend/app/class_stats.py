@@ -0,0 +1,214 @@
+"""
+班级统计：每次绘图成功后计算该数据集的导出常数（Experiment.constants：g、e、Pt100 斜率、LD 阈值电流等，见 app.batch_analysis），
+增量更新按 (实验, 班级) 持久化的聚合量：样本数、均值、方差（Welford 算法）、最小/最大值与直方图。
+
+- 班级来自请求头 X-Cohort（可选，支持百分号编码的中文）；每次提交同时计入该班级与全部（cohort 为空串）；
+- 直方图按相对宽度分桶（相邻桶边界相差 HISTOGRAM_RATIO 倍），不需要预先指定取值范围；
+- 读取只取每个导出常数的一行聚合，耗时与提交数量无关；
+- 按学生统计：每个学生在每个实验只保留最近一次提交的样本（analysis_samples 表）。重新提交时先从聚合中撤销该学生的旧值
+  （Welford 反向更新、直方图对应桶减一，撤销的是最小/最大值时按其余学生的样本重算），再计入新值；
+  请求体相同的重复提交（如同步后再异步提交同一数据）不重复计数，全部图命中图级缓存的提交不再统计；
+- 多进程/多实例并发更新：在事务内以 SELECT ... FOR UPDATE 锁定样本行与聚合行再读-改-写；两个提交同时插入首行时，
+  唯一约束 uq_sample_key/uq_aggregate_key 冲突的一方回滚后重试，重试时该行已存在、按更新处理（SQLite 由数据库写锁串行化）。
+"""
+
+import hashlib
+import json
+import logging
+import math
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .experiments import EXPERIMENTS
+from .models import AnalysisAggregate, AnalysisSample
+
+# 相对分桶：第 i 个正值桶为 [r^i, r^(i+1))，负值对称，0 单独一桶
+HISTOGRAM_RATIO = 1.02
+_LOG_RATIO = math.log(HISTOGRAM_RATIO)
+
+# 并发冲突（首行插入的唯一约束冲突、死锁、数据库写锁超时）时的最多尝试次数
+UPDATE_ATTEMPTS = 5
+
+
+def _bucket(value: float) -> str:
+    if value == 0:
+        return '0'
+    return f"{'-' if value < 0 else '+'}{math.floor(math.log(abs(value)) / _LOG_RATIO)}"
+
+
+def _bucket_range(key: str):
+    if key == '0':
+        return 0.0, 0.0
+    i = int(key[1:])
+    lo, hi = HISTOGRAM_RATIO ** i, HISTOGRAM_RATIO ** (i + 1)
+    return (-hi, -lo) if key[0] == '-' else (lo, hi)
+
+
+def _add(row: AnalysisAggregate, value: float):
+    """Welford 增量更新：count、mean、m2（离差平方和）。"""
+    row.count = (row.count or 0) + 1
+    delta = value - (row.mean or 0.0)
+    row.mean = (row.mean or 0.0) + delta / row.count
+    row.m2 = (row.m2 or 0.0) + delta * (value - row.mean)
+    row.min_value = value if row.min_value is None else min(row.min_value, value)
+    row.max_value = value if row.max_value is None else max(row.max_value, value)
+    hist = json.loads(row.histogram or '{}')
+    key = _bucket(value)
+    hist[key] = hist.get(key, 0) + 1
+    row.histogram = json.dumps(hist, separators=(',', ':'))
+    row.updated_at = datetime.utcnow()
+
+
+def _remove(row: AnalysisAggregate, value: float):
+    """撤销一次 _add：count、mean、m2 反向更新，直方图对应桶减一；min/max 由调用方按剩余样本重算。"""
+    hist = json.loads(row.histogram or '{}')
+    if row.count <= 1:
+        row.count, row.mean, row.m2 = 0, 0.0, 0.0
+        row.min_value = row.max_value = None
+        hist = {}
+    else:
+        mean = (row.count * row.mean - value) / (row.count - 1)
+        row.m2 = max(0.0, row.m2 - (value - mean) * (value - row.mean))
+        row.mean = mean
+        row.count -= 1
+        key = _bucket(value)
+        if hist.get(key, 0) > 1:
+            hist[key] -= 1
+        else:
+            hist.pop(key, None)
+    row.histogram = json.dumps(hist, separators=(',', ':'))
+    row.updated_at = datetime.utcnow()
+
+
+def _cohorts(cohort: Optional[str]) -> List[str]:
+    # 每次提交同时计入全部（空串）与所属班级
+    return ['', cohort] if cohort else ['']
+
+
+def _reset_extremes(db: Session, row: AnalysisAggregate, user_id: int):
+    """按其余学生的样本重算 min/max（撤销的值恰为最小或最大值时）。"""
+    query = db.query(AnalysisSample.constants).filter(
+        AnalysisSample.experiment == row.experiment, AnalysisSample.user_id != user_id,
+    )
+    if row.cohort:
+        query = query.filter(AnalysisSample.cohort == row.cohort)
+    values = [v[row.quantity] for v in (json.loads(c) for c, in query) if row.quantity in v]
+    row.min_value = min(values, default=None)
+    row.max_value = max(values, default=None)
+
+
+def digest(payload) -> str:
+    """请求体哈希（规范化 JSON），用于识别同一学生内容相同的重复提交。"""
+    return hashlib.sha256(payload.model_dump_json().encode('utf-8')).hexdigest()
+
+
+def update(db: Session, experiment: str, user_id: int, cohort: Optional[str], values: Dict[str, float], payload_digest: str = ''):
+    """把某学生一次分析的结果计入聚合，替换该学生此前的样本（NaN/无穷值跳过）。"""
+    values = {k: float(v) for k, v in values.items() if v is not None and math.isfinite(float(v))}
+    if not values:
+        return
+    for attempt in range(UPDATE_ATTEMPTS):
+        try:
+            _update_locked(db, experiment, user_id, cohort or '', values, payload_digest)
+            db.commit()
+            return
+        except (IntegrityError, OperationalError):
+            # 其他提交同时插入了同一首行或持有锁：回滚本次修改后重新读取，已存在的行按更新处理
+            db.rollback()
+            if attempt == UPDATE_ATTEMPTS - 1:
+                raise
+            time.sleep(0.05 * (attempt + 1))
+
+
+def _update_locked(db: Session, experiment: str, user_id: int, cohort: str, values: Dict[str, float], payload_digest: str):
+    samples = db.query(AnalysisSample).filter(
+        AnalysisSample.experiment == experiment, AnalysisSample.user_id == user_id,
+    )
+    if db.get_bind().dialect.name == 'sqlite':
+        # SQLite 不支持 FOR UPDATE，且 SELECT 不开启写事务：先执行一条空更新取得数据库写锁，之后读到的是最新提交
+        samples.update({AnalysisSample.user_id: AnalysisSample.user_id}, synchronize_session=False)
+    # 行锁持有到事务提交，其他进程对同一样本行/聚合行的读-改-写在此等待
+    sample = samples.with_for_update().one_or_none()
+    previous = json.loads(sample.constants) if sample is not None else {}
+    old_cohorts = _cohorts(sample.cohort) if sample is not None else []
+    new_cohorts = _cohorts(cohort)
+    query = db.query(AnalysisAggregate).filter(
+        AnalysisAggregate.experiment == experiment,
+        AnalysisAggregate.cohort.in_(list(dict.fromkeys(old_cohorts + new_cohorts))),
+        AnalysisAggregate.quantity.in_(list(dict.fromkeys(list(previous) + list(values)))),
+    )
+    rows = {(r.cohort, r.quantity): r for r in query.with_for_update()}
+    for c in old_cohorts:
+        for quantity, value in previous.items():
+            row = rows.get((c, quantity))
+            if row is None:
+                continue
+            _remove(row, value)
+            if row.count and (value <= row.min_value or value >= row.max_value):
+                _reset_extremes(db, row, user_id)
+    for c in new_cohorts:
+        for quantity, value in values.items():
+            row = rows.get((c, quantity))
+            if row is None:
+                row = rows[(c, quantity)] = AnalysisAggregate(experiment=experiment, cohort=c, quantity=quantity)
+                db.add(row)
+            _add(row, value)
+    if sample is None:
+        sample = AnalysisSample(experiment=experiment, user_id=user_id)
+        db.add(sample)
+    sample.cohort = cohort
+    sample.digest = payload_digest
+    sample.constants = json.dumps(values, separators=(',', ':'))
+    sample.updated_at = datetime.utcnow()
+    db.flush()
+
+
+def observe(user_id: int, experiment: str, payload, cohort: Optional[str] = None):
+    """绘图成功后调用：计算该数据集的导出常数，替换该学生在聚合中的样本；失败只记录日志，不影响绘图结果。"""
+    quantities = EXPERIMENTS[experiment].constants
+    if not quantities:
+        return
+    payload_digest = digest(payload)
+    db = SessionLocal()
+    try:
+        current = db.query(AnalysisSample.digest, AnalysisSample.cohort).filter(
+            AnalysisSample.experiment == experiment, AnalysisSample.user_id == user_id,
+        ).first()
+        if current is not None and tuple(current) == (payload_digest, cohort or ''):
+            # 内容相同的重复提交
+            return
+        # 按需导入（依赖 numpy）
+        from .batch_analysis import ANALYZERS
+        columns = ANALYZERS[experiment]([payload])
+        values = {q: float(columns[q][0]) for q in quantities if q in columns}
+        update(db, experiment, user_id, cohort, values, payload_digest)
+    except Exception:
+        db.rollback()
+        logging.exception(f"failed to update class stats for {experiment}")
+    finally:
+        db.close()
+
+
+def read(db: Session, experiment: str, cohort: str = '') -> Dict[str, Dict[str, Any]]:
+    """读取某实验某班级（空串为全部）的聚合：{导出常数: {count, mean, std, min, max, histogram}}。"""
+    result: Dict[str, Dict[str, Any]] = {}
+    for row in db.query(AnalysisAggregate).filter(
+        AnalysisAggregate.experiment == experiment, AnalysisAggregate.cohort == cohort, AnalysisAggregate.count > 0,
+    ):
+        hist = json.loads(row.histogram or '{}')
+        buckets = sorted((_bucket_range(k) + (n,) for k, n in hist.items()), key=lambda b: b[0])
+        result[row.quantity] = {
+            'count': row.count,
+            'mean': row.mean,
+            # 样本标准差
+            'std': math.sqrt(row.m2 / (row.count - 1)) if row.count > 1 else None,
+            'min': row.min_value,
+            'max': row.max_value,
+            'histogram': [{'lo': lo, 'hi': hi, 'count': n} for lo, hi, n in buckets],
+        }
+    return result
@@ -21,6 +21,37 @@ class Settings:
     JWT_SECRET: str = os.getenv("JWT_SECRET", "change-me")
     JWT_EXPIRE_MINUTES: int = int(os.getenv("JWT_EXPIRE_MINUTES", "43200"))  # 30天
 
+    # 启动预热：'1' 表示在 on_startup 中预加载绘图栈并渲染丢弃图像，完成后才开始接收请求
+    WARMUP_ON_STARTUP: bool = os.getenv("WARMUP_ON_STARTUP", "0") == "1"
+
+    # 绘图 worker 进程：数量（0 表示在请求线程内直接绘图）、单进程最多执行任务数、RSS 上限（MB），超出后回收替换
+    RENDER_WORKERS: int = int(os.getenv("RENDER_WORKERS", "2"))
+    RENDER_MAX_TASKS: int = int(os.getenv("RENDER_MAX_TASKS", "200"))
+    RENDER_MAX_RSS_MB: int = int(os.getenv("RENDER_MAX_RSS_MB", "512"))
+    # 公平调度：单用户同时执行的绘图任务上限（0 表示不限），以及优先出队的角色（逗号分隔）
+    RENDER_USER_CONCURRENCY: int = int(os.getenv("RENDER_USER_CONCURRENCY", "2"))
+    RENDER_PRIORITY_ROLES: str = os.getenv("RENDER_PRIORITY_ROLES", "admin")
+    # 绘图准入：全局 / 单用户同时排队+执行的绘图请求上限（0 表示不限），超出返回 429。
+    # 同步绘图接口会占用线程池线程（默认 40 个），全局上限需明显小于线程池大小，保证其他接口可用
+    RENDER_MAX_PENDING: int = int(os.getenv("RENDER_MAX_PENDING", "16"))
+    RENDER_MAX_PENDING_PER_USER: int = int(os.getenv("RENDER_MAX_PENDING_PER_USER", "3"))
+
+    # 异步任务去重窗口（秒）：窗口内相同 Idempotency-Key（或相同用户+实验+请求体）的提交复用已有任务
+    IDEMPOTENCY_WINDOW_SECONDS: int = int(os.getenv("IDEMPOTENCY_WINDOW_SECONDS", "300"))
+
+    # 图级结果缓存条目数上限：相同用户、相同输入的图直接复用已生成文件（0 表示关闭）
+    FIGURE_CACHE_SIZE: int = int(os.getenv("FIGURE_CACHE_SIZE", "1024"))
+
+    # 显示降采样：单条曲线超过该点数时绘制前按桶保留极值点（拟合仍用完整数据），0 表示不降采样
+    PLOT_MAX_POINTS: int = int(os.getenv("PLOT_MAX_POINTS", "2000"))
+
+    # CSV 上传（/api/plots/<name>/csv）的文件大小上限（MB），超出返回 413
+    CSV_MAX_MB: int = int(os.getenv("CSV_MAX_MB", "20"))
+
+    # 不确定度（请求体 uncertainty=true）：bootstrap 重抽样次数与置信水平
+    BOOTSTRAP_RESAMPLES: int = int(os.getenv("BOOTSTRAP_RESAMPLES", "2000"))
+    BOOTSTRAP_CONFIDENCE: float = float(os.getenv("BOOTSTRAP_CONFIDENCE", "0.95"))
+
     # CORS
     CORS_ORIGINS: str = os.getenv("CORS_ORIGINS", "http://localhost:5173,http://127.0.0.1:5173")
 
@@ -1,13 +1,15 @@
-from fastapi import Depends, HTTPException, Request
+from fastapi import Depends, Header, HTTPException, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 import jwt
 from typing import Optional
+from urllib.parse import unquote
 
 from .database import get_db
 from .models import User
 from .crud import get_user_by_openid
 from .config import settings
+from . import workers
 
 
 bearer_scheme = HTTPBearer(auto_error=False)
@@ -41,4 +43,33 @@ def get_current_user(
 def get_current_admin_user(user: User = Depends(get_current_user)) -> User:
     if user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin permission required")
-    return user
\ No newline at end of file
+    return user
+
+
+def admit_render(user: User) -> workers.Ticket:
+    """为一次绘图请求领取配额，配额已满时返回 429 与 Retry-After。"""
+    try:
+        return workers.admit(user.user_id, user.role)
+    except workers.RenderBusy as e:
+        detail = "您的绘图任务过多，请等待当前任务完成后重试" if e.per_user else "绘图服务繁忙，请稍后重试"
+        raise HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(e.retry_after)})
+
+
+def render_admission(user: User = Depends(get_current_user)):
+    """同步绘图接口的准入依赖：请求结束后释放配额（ticket 已 handoff 给异步任务时除外）。"""
+    ticket = admit_render(user)
+    try:
+        yield ticket
+    finally:
+        if not ticket.handed_off:
+            ticket.release()
+
+
+def get_cohort(x_cohort: Optional[str] = Header(None)) -> Optional[str]:
+    """可选请求头 X-Cohort：提交所属的班级（中文需百分号编码），用于班级统计（见 app/class_stats.py）。"""
+    if not x_cohort:
+        return None
+    cohort = unquote(x_cohort).strip()
+    if len(cohort) > 64:
+        raise HTTPException(status_code=400, detail="X-Cohort 不能超过 64 个字符")
+    return cohort or None
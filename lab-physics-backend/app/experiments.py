@@ -0,0 +1,211 @@
+"""
+实验注册表：每个实验声明 请求体模型、校验函数、绘图任务拆分（app.figures）与完成提示。
+
+同步接口 /api/plots/<name>、异步接口 /api/plots/<name>/start、CSV 上传 /api/plots/<name>/csv、数据接口 /api/plots/<name>/data 与批量提交 /api/plots/batch
+都由注册表生成/分发，统一走 app.pipeline（缓存、绘图记录、耗时统计、data URI）。
+新增实验只需在此登记。
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Type
+
+from pydantic import BaseModel
+
+from . import figures, ingest
+from .figures import filled
+from .schemas import (
+    FiberPlotRequest, FrankHertzRequest, FrankHertzDataResponse, MillikanRequest, MechanicsRequest,
+    ThermalRequest, ThermalDataResponse, PhotoDevicesRequest, PhotoDevicesDataResponse, SolarCellRequest, SolarCellDataResponse, UltrasoundRequest,
+)
+
+
+class PlotInputError(ValueError):
+    """请求数据不满足绘图要求（接口层返回 400，detail 为异常信息；参数取值无效时 status_code 为 422）。"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class Experiment:
+    def __init__(
+        self,
+        name: str,
+        request_model: Type[BaseModel],
+        validate: Callable[[BaseModel], None],
+        jobs: Callable[[int, BaseModel], List[figures.FigureJob]],
+        message: Optional[str] = None,
+        csv_payload: ingest.CSVPayloadBuilder = ingest.fields_payload,
+        constants: Sequence[str] = (),
+        data_model: Optional[Type[BaseModel]] = None,
+    ):
+        self.name = name
+        self.request_model = request_model
+        self.validate = validate
+        self.jobs = jobs
+        # 固定的完成提示；为 None 时使用 “共生成N张图像”
+        self.message = message
+        # CSV 上传（/api/plots/<name>/csv）时由 {表头: 数组} 构造请求体，见 app.ingest
+        self.csv_payload = csv_payload
+        # 导出常数（列名同 app.batch_analysis）：纳入班级统计（app.class_stats）与 bootstrap 置信区间
+        self.constants = tuple(constants)
+        # 数据接口 /api/plots/<name>/data 的响应模型（不绘图，结果由 app.results 计算）；为 None 时不提供该接口
+        self.data_model = data_model
+
+    def completed_message(self, count: int) -> str:
+        return self.message or f"共生成{count}张图像"
+
+
+# -------------------------- 请求校验 --------------------------
+
+def _require(payload, names: List[str]):
+    for name in names:
+        if not filled(getattr(payload, name, None)):
+            raise PlotInputError(f"字段 {name} 不能为空")
+
+
+def check_fiber(payload: FiberPlotRequest):
+    if payload.plot_type == 'iu':
+        if not (filled(payload.U) and filled(payload.I)):
+            raise PlotInputError("I-U 图需提供 U 与 I 数组")
+        if len(payload.U) != len(payload.I):
+            raise PlotInputError("U 与 I 长度需一致")
+    elif payload.plot_type == 'pi':
+        if not (filled(payload.I) and filled(payload.P)):
+            raise PlotInputError("P-I 图需提供 I 与 P 数组")
+        if len(payload.I) != len(payload.P):
+            raise PlotInputError("I 与 P 长度需一致")
+    elif payload.plot_type == 'photodiode':
+        if not all(filled(v) for v in (payload.V, payload.I0, payload.I1, payload.I2)):
+            raise PlotInputError("光电二极管图需提供 V、I0、I1、I2 数组")
+        if not len(payload.V) == len(payload.I0) == len(payload.I1) == len(payload.I2):
+            raise PlotInputError("V、I0、I1、I2 长度需一致")
+    else:
+        raise PlotInputError("未知的 plot_type")
+
+
+def check_frank_hertz(payload: FrankHertzRequest):
+    if not payload.groups:
+        raise PlotInputError("请至少提供一组数据")
+    VG2K = figures.vg2k(payload)
+    if any(b <= a for a, b in zip(VG2K[:-1], VG2K[1:])):
+        raise PlotInputError("VG2K 需严格递增")
+    for g in payload.groups:
+        if len(g.currents) != len(VG2K):
+            raise PlotInputError("每组 currents 需与 VG2K 长度一致（默认 82 项）")
+
+
+def check_millikan(payload: MillikanRequest):
+    if not filled(payload.qi):
+        raise PlotInputError("qi 不能为空")
+    if filled(payload.ni):
+        if len(payload.ni) != len(payload.qi):
+            raise PlotInputError("ni 与 qi 数组长度需一致且均非空")
+        return
+    # 自动推断 ni：电荷量需为正，搜索范围需有效
+    if (payload.qi <= 0).any():
+        raise PlotInputError("自动推断 ni 时 qi 需全部为正")
+    # 按需导入（依赖 numpy）：只传一端时另一端取默认值
+    from .analysis import CHARGE_MAX, CHARGE_MIN
+    e_min = CHARGE_MIN if payload.e_min is None else payload.e_min
+    e_max = CHARGE_MAX if payload.e_max is None else payload.e_max
+    if e_min <= 0:
+        raise PlotInputError("e_min 需为正", status_code=422)
+    if e_min >= e_max:
+        raise PlotInputError(f"e_min 需小于 e_max（当前搜索范围 {e_min:g}~{e_max:g}）", status_code=422)
+    # 范围跨越 2 倍时 e/2（或 2e）同样使 qi/e 接近整数，推断结果不唯一
+    if e_max >= 2 * e_min:
+        raise PlotInputError(f"e_max 需小于 e_min 的 2 倍（当前搜索范围 {e_min:g}~{e_max:g}）", status_code=422)
+
+
+def check_mechanics(payload: MechanicsRequest):
+    # T2-M
+    if not (payload.t2m and filled(payload.t2m.weights_g) and filled(payload.t2m.T10_avg_s)):
+        raise PlotInputError("t2m 字段缺失或为空")
+    if len(payload.t2m.weights_g) != len(payload.t2m.T10_avg_s):
+        raise PlotInputError("weights_g 与 T10_avg_s 需长度一致")
+    # v2-x2
+    if not (payload.v2x2 and filled(payload.v2x2.x_cm) and filled(payload.v2x2.v_avg_cms)):
+        raise PlotInputError("v2x2 字段缺失或为空")
+    if len(payload.v2x2.x_cm) != len(payload.v2x2.v_avg_cms):
+        raise PlotInputError("x_cm 与 v_avg_cms 需长度一致")
+
+
+def check_thermal(payload: ThermalRequest):
+    # 默认温度序列：55,60,65,70,75,80（若前端未提供）
+    temperatures = figures.temperatures(payload)
+    if not (filled(payload.pt100_resistance) and filled(payload.ntc_resistance)):
+        raise PlotInputError("pt100_resistance / ntc_resistance 不能为空")
+    if not (len(temperatures) == len(payload.pt100_resistance) == len(payload.ntc_resistance)):
+        raise PlotInputError("三个数组长度需一致")
+
+
+def check_photo_devices(payload: PhotoDevicesRequest):
+    # 基本非空校验（长度不做强制一致，按各自曲线绘制）
+    _require(payload, [
+        'led_I','led_V','led_P','ld_I','ld_V','ld_P','pd_L','pd_I_L','pd_V','pd_I_V','pd_wl','pd_I_wl','pt_L','pt_I_L','pt_V','pt_I_V','pt_wl','pt_I_wl'
+    ])
+
+
+def check_solar_cell(payload: SolarCellRequest):
+    _require(payload, [
+        'dark_voltage','dark_current','light_voltage','light_current','relative_intensity','light_power','short_circuit_current','open_circuit_voltage'
+    ])
+    # 伏安曲线按点配对（最大功率点、二极管拟合）
+    if len(payload.dark_voltage) != len(payload.dark_current):
+        raise PlotInputError("dark_voltage 与 dark_current 长度需一致")
+    if len(payload.light_voltage) != len(payload.light_current):
+        raise PlotInputError("light_voltage 与 light_current 长度需一致")
+
+
+def check_ultrasound(payload: UltrasoundRequest):
+    # 校验必填数组非空
+    _require(payload, [
+        't_free_fall','v_free_fall_1',
+        't1','v1_1','v1_2','v1_3','v1_4',
+        't2','v2_1','v2_2','v2_3','v2_4',
+        't3','v3_1','v3_2','v3_3','v3_4',
+        'm','a_measured'
+    ])
+    # 长度一致性：自由落体 1..4 组速度需与 t_free_fall 一致
+    n_free = len(payload.t_free_fall)
+    for vname in ['v_free_fall_1','v_free_fall_2','v_free_fall_3','v_free_fall_4']:
+        v = getattr(payload, vname, None)
+        if v is not None and len(v) != n_free:
+            raise PlotInputError(f"{vname} 长度需与 t_free_fall 一致")
+    # 三组匀变速：各组 4 次测量长度需与对应 t 数组一致
+    for tname, vnames in [
+        ('t1', ['v1_1','v1_2','v1_3','v1_4']),
+        ('t2', ['v2_1','v2_2','v2_3','v2_4']),
+        ('t3', ['v3_1','v3_2','v3_3','v3_4']),
+    ]:
+        n = len(getattr(payload, tname))
+        for vn in vnames:
+            if len(getattr(payload, vn)) != n:
+                raise PlotInputError(f"{vn} 长度需与 {tname} 一致")
+
+
+# -------------------------- 注册表 --------------------------
+
+EXPERIMENTS: Dict[str, Experiment] = {e.name: e for e in [
+    Experiment('fiber', FiberPlotRequest, check_fiber, figures.fiber_jobs, "生成完成"),
+    Experiment('frank-hertz', FrankHertzRequest, check_frank_hertz, figures.frank_hertz_jobs,
+               csv_payload=ingest.frank_hertz_payload, constants=['excitation_energy'], data_model=FrankHertzDataResponse),
+    Experiment('millikan', MillikanRequest, check_millikan, figures.millikan_jobs, "生成完成",
+               constants=['e']),
+    Experiment('mechanics', MechanicsRequest, check_mechanics, figures.mechanics_jobs, "生成完成",
+               constants=['k', 'omega']),
+    Experiment('thermal', ThermalRequest, check_thermal, figures.thermal_jobs,
+               constants=['pt100_slope', 'pt100_alpha', 'cvd_R0', 'cvd_A', 'cvd_B',
+                          'ntc_beta', 'ntc_R25', 'sh_a', 'sh_b', 'sh_c'], data_model=ThermalDataResponse),
+    Experiment('photo-devices', PhotoDevicesRequest, check_photo_devices, figures.photo_devices_jobs, "生成完成",
+               constants=['I_th'], data_model=PhotoDevicesDataResponse),
+    Experiment('solar-cell', SolarCellRequest, check_solar_cell, figures.solar_cell_jobs,
+               constants=['isc_power_slope', 'voc_log_power_slope', 'pmax', 'fill_factor', 'rs', 'rsh',
+                          'diode_i0', 'diode_n'], data_model=SolarCellDataResponse),
+    Experiment('ultrasound', UltrasoundRequest, check_ultrasound, figures.ultrasound_jobs,
+               constants=['g', 'a1', 'a2', 'a3', 'newton_slope']),
+]}
+
+
+def get(name: str) -> Experiment:
+    return EXPERIMENTS[name]
@@ -0,0 +1,123 @@
+"""
+各实验的绘图任务拆分：每张图对应 app.plots 中的一个单图函数。
+
+*_jobs(user_id, payload) 返回 [(函数名, 参数元组), ...]，顺序即图像顺序；
+由 workers.Ticket.map 同时提交到绘图进程池并行绘制，结果按列表顺序返回。
+本模块不导入 app.plots，可在 API 进程中使用。
+"""
+
+from typing import List, Tuple
+
+FigureJob = Tuple[str, tuple]
+
+# 弗兰克-赫兹默认 VG2K：1..82（共 82 个点）
+DEFAULT_VG2K = [float(i) for i in range(1, 83)]
+# 热学默认温度序列（°C）
+DEFAULT_TEMPERATURES = [55.0, 60.0, 65.0, 70.0, 75.0, 80.0]
+
+
+def filled(values) -> bool:
+    """数组字段已提供且非空（字段为 NumPy 数组，不能直接用于 if 判断）。"""
+    return values is not None and len(values) > 0
+
+
+def vg2k(payload):
+    return payload.VG2K if filled(payload.VG2K) else DEFAULT_VG2K
+
+
+def temperatures(payload):
+    return payload.temperatures if filled(payload.temperatures) else DEFAULT_TEMPERATURES
+
+
+def fiber_jobs(user_id: int, payload) -> List[FigureJob]:
+    if payload.plot_type == 'iu':
+        return [('plot_fiber_iu', (user_id, payload.U, payload.I))]
+    if payload.plot_type == 'pi':
+        return [('plot_fiber_pi', (user_id, payload.I, payload.P))]
+    if payload.plot_type == 'photodiode':
+        return [('plot_photodiode_iv', (user_id, payload.V, payload.I0, payload.I1, payload.I2))]
+    return []
+
+
+def frank_hertz_jobs(user_id: int, payload) -> List[FigureJob]:
+    VG2K = vg2k(payload)
+    return [
+        ('plot_frank_hertz_group', (user_id, VG2K, g.currents, g.label, idx))
+        for idx, g in enumerate(payload.groups, start=1)
+    ]
+
+
+def millikan_jobs(user_id: int, payload) -> List[FigureJob]:
+    if filled(payload.ni):
+        return [('plot_millikan', (user_id, payload.ni, payload.qi))]
+    # 未提供 ni：绘图时由 qi 推断
+    return [('plot_millikan', (user_id, None, payload.qi, payload.e_min, payload.e_max))]
+
+
+def mechanics_jobs(user_id: int, payload) -> List[FigureJob]:
+    return [
+        ('plot_mech_t2_m', (user_id, payload.t2m.m0_g, payload.t2m.weights_g, payload.t2m.T10_avg_s)),
+        ('plot_mech_v2_x2', (user_id, payload.v2x2.x_cm, payload.v2x2.v_avg_cms)),
+    ]
+
+
+def thermal_jobs(user_id: int, payload) -> List[FigureJob]:
+    temps = temperatures(payload)
+    return [
+        ('plot_thermal_pt100', (user_id, temps, payload.pt100_resistance)),
+        ('plot_thermal_ntc', (user_id, temps, payload.ntc_resistance)),
+    ]
+
+
+# 光电器件的十个子图：名称 -> 用到的请求字段，顺序即合并图中的位置（2 行 × 5 列，先行后列）
+PHOTO_PANELS = {
+    'ld_pi': ('ld_I', 'ld_P', 'ld_linear_start_idx'),
+    'ld_iv': ('ld_V', 'ld_I'),
+    'led_pi': ('led_I', 'led_P'),
+    'led_iv': ('led_V', 'led_I'),
+    'pd_light': ('pd_L', 'pd_I_L'),
+    'pd_iv': ('pd_V', 'pd_I_V'),
+    'pd_spectrum': ('pd_wl', 'pd_I_wl'),
+    'pt_light': ('pt_L', 'pt_I_L'),
+    'pt_iv': ('pt_V', 'pt_I_V'),
+    'pt_spectrum': ('pt_wl', 'pt_I_wl'),
+}
+
+
+def photo_devices_jobs(user_id: int, payload) -> List[FigureJob]:
+    if payload.panels:
+        # 只绘制选中的子图，每个子图是独立的任务（各自缓存、并行绘制）
+        return [
+            ('plot_photo_panel', (user_id, name) + tuple(getattr(payload, f) for f in PHOTO_PANELS[name]))
+            for name in payload.panels
+        ]
+    return [('plot_photo_devices', (
+        user_id,
+        payload.led_I, payload.led_V, payload.led_P,
+        payload.ld_I, payload.ld_V, payload.ld_P, payload.ld_linear_start_idx,
+        payload.pd_L, payload.pd_I_L, payload.pd_V, payload.pd_I_V, payload.pd_wl, payload.pd_I_wl,
+        payload.pt_L, payload.pt_I_L, payload.pt_V, payload.pt_I_V, payload.pt_wl, payload.pt_I_wl,
+    ))]
+
+
+def solar_cell_jobs(user_id: int, payload) -> List[FigureJob]:
+    return [
+        ('plot_solar_dark_iv', (user_id, payload.dark_voltage, payload.dark_current)),
+        ('plot_solar_light_iv', (user_id, payload.light_voltage, payload.light_current)),
+        ('plot_solar_isc_intensity', (user_id, payload.relative_intensity, payload.short_circuit_current)),
+        ('plot_solar_voc_intensity', (user_id, payload.relative_intensity, payload.open_circuit_voltage)),
+        ('plot_solar_isc_power', (user_id, payload.light_power, payload.short_circuit_current)),
+        ('plot_solar_voc_power', (user_id, payload.light_power, payload.open_circuit_voltage)),
+    ]
+
+
+def ultrasound_jobs(user_id: int, payload) -> List[FigureJob]:
+    p = payload
+    return [
+        ('plot_ultrasound_free_fall', (user_id, p.t_free_fall, p.v_free_fall_1, p.v_free_fall_2, p.v_free_fall_3, p.v_free_fall_4)),
+        ('plot_ultrasound_uniform', (user_id, p.t1, [p.v1_1, p.v1_2, p.v1_3, p.v1_4], 1)),
+        ('plot_ultrasound_uniform', (user_id, p.t2, [p.v2_1, p.v2_2, p.v2_3, p.v2_4], 2)),
+        ('plot_ultrasound_uniform', (user_id, p.t3, [p.v3_1, p.v3_2, p.v3_3, p.v3_4], 3)),
+        ('plot_ultrasound_newton', (user_id, p.m, p.a_measured)),
+    ]
+
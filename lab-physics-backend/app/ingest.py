@@ -0,0 +1,223 @@
+"""
+仪器导出 CSV 的流式解析：POST /api/plots/<name>/csv 的请求体按块读取、逐行解析，不在内存中保留原始文本。
+
+- 首个非空、非 # 开头的行为表头（文件可带 UTF-8 BOM），分隔符自动识别（逗号 / 制表符 / 分号）；
+- 每列按表头映射到请求体字段：表头去掉单位后缀（如 "dark_voltage (V)"）即字段名，嵌套字段用点号（如 t2m.weights_g），
+  也可通过 columns=表头:字段,... 显式指定；未映射到字段的列（序号、备注等）忽略；
+- 各列长度可以不同：列末尾的空单元格视为该列已结束，因此同一文件可并排放置不同长度的序列；
+  列开头或中间的空单元格会使该列与同行其他列错位，记入 gaps（接口层返回 422），不跳过也不补值；
+- 含非数值单元格的列不再累积，记入 invalid；只有该列映射到实验字段时才报错；
+- 数值逐行追加到 array('d')（每个值 8 字节），结束时零拷贝转为 NumPy 数组（numpy 在此时才导入）；
+- 单行长度与文件总大小有上限（CSV_MAX_MB），超出即停止读取；
+- 解析在线程池中按块（FEED_BYTES）进行，不阻塞事件循环。
+"""
+
+import codecs
+import re
+from array import array
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from .config import settings
+
+# 单行最大字节数：防止无换行的超长内容占用内存
+MAX_LINE_BYTES = 64 * 1024
+# 请求体累积到该大小后交给线程池解析一次，减少线程切换
+FEED_BYTES = 1024 * 1024
+_DELIMITERS = [b',', b'\t', b';']
+_UNIT_SUFFIX = re.compile(r'\s*[\(\[（【].*$')
+_CURRENTS_HEADER = re.compile(r'^currents[\s_\-]*\w+$')
+
+
+class CSVError(ValueError):
+    """CSV 内容不符合要求（接口层返回 400；超出大小上限时 status_code 为 413）。"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def column_field(header: str) -> str:
+    """表头对应的默认字段名：去掉空白与单位后缀，例如 "v1_1 (m/s)" -> "v1_1"。"""
+    return _UNIT_SUFFIX.sub('', header.strip().strip('"').strip())
+
+
+def parse_column_map(spec: Optional[str]) -> Dict[str, str]:
+    """解析 columns=表头:字段,表头:字段 形式的显式映射。"""
+    mapping: Dict[str, str] = {}
+    for pair in (spec or '').split(','):
+        if not pair.strip():
+            continue
+        header, sep, field = pair.rpartition(':')
+        if not sep or not header.strip() or not field.strip():
+            raise CSVError(f"columns 参数格式应为 表头:字段，收到 {pair.strip()}")
+        mapping[header.strip()] = field.strip()
+    return mapping
+
+
+class ColumnReader:
+    """逐块喂入 CSV 字节，按列累积为 float64 数组。"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.headers: Optional[List[str]] = None
+        self.columns: Dict[str, Any] = {}
+        self.delimiter = b','
+        self._values: List[array] = []
+        self._rest = b''
+        self._line_no = 0
+        # 含非数值单元格的列：表头 -> 错误信息
+        self.invalid: Dict[str, str] = {}
+        # 开头或中间有空单元格的列：表头 -> 错误信息
+        self.gaps: Dict[str, str] = {}
+        # 各列第一个空单元格所在行；之后再出现数值即为中间空缺
+        self._blank: List[Optional[int]] = []
+        # 尚未出现空单元格与非数值单元格时整行直接追加
+        self._plain = True
+
+    def feed(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.max_bytes and self.size > self.max_bytes:
+            raise CSVError(f"文件超过 {self.max_bytes // (1024 * 1024)} MB 上限", status_code=413)
+        lines = (self._rest + chunk).split(b'\n')
+        self._rest = lines.pop()
+        if len(self._rest) > MAX_LINE_BYTES:
+            raise CSVError(f"第{self._line_no + 1}行过长")
+        for line in lines:
+            self._line(line)
+
+    def close(self) -> Dict[str, Any]:
+        import numpy as np
+        if self._rest:
+            self._line(self._rest)
+            self._rest = b''
+        if self.headers is None:
+            raise CSVError("CSV 为空或缺少表头")
+        return {
+            h: np.frombuffer(v, dtype=np.float64)
+            for h, v in zip(self.headers, self._values) if len(v) and h not in self.invalid and h not in self.gaps
+        }
+
+    def _line(self, line: bytes):
+        self._line_no += 1
+        if self._line_no == 1 and line.startswith(codecs.BOM_UTF8):
+            # Excel 导出的 UTF-8 文件带 BOM，去掉后才能识别开头的 # 注释行
+            line = line[len(codecs.BOM_UTF8):]
+        line = line.strip()
+        if not line or line.startswith(b'#'):
+            return
+        if self.headers is None:
+            self._header(line)
+            return
+        cells = [cell.strip().strip(b'"').strip() for cell in line.split(self.delimiter)[:len(self.headers)]]
+        # 整行为空（如 ",,,"）不影响各列对齐，按空行处理
+        if not any(cells):
+            return
+        if self._plain and len(cells) == len(self.headers) and all(cells):
+            # 常见情形：此前没有空单元格或非数值列，整行都是数值
+            try:
+                values = [float(cell) for cell in cells]
+            except ValueError:
+                pass
+            else:
+                for col, value in enumerate(values):
+                    self._values[col].append(value)
+                return
+        self._plain = False
+        cells += [b''] * (len(self.headers) - len(cells))
+        for col, cell in enumerate(cells):
+            header = self.headers[col]
+            if header in self.invalid or header in self.gaps:
+                continue
+            if not cell:
+                if self._blank[col] is None:
+                    self._blank[col] = self._line_no
+                continue
+            if self._blank[col] is not None:
+                self.gaps[header] = f"第{self._blank[col]}行第{col + 1}列（{header}）为空，与同行其他列错位；空单元格只能出现在该列末尾"
+                del self._values[col][:]
+                continue
+            try:
+                self._values[col].append(float(cell))
+            except ValueError:
+                self.invalid[header] = f"第{self._line_no}行第{col + 1}列（{header}）不是数值"
+                del self._values[col][:]
+
+    def _header(self, line: bytes):
+        self.delimiter = next((d for d in _DELIMITERS if d in line), b',')
+        try:
+            text = line.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise CSVError("表头需为 UTF-8 编码")
+        self.headers = [h.strip().strip('"').strip() for h in text.split(self.delimiter.decode())]
+        self._values = [array('d') for _ in self.headers]
+        self._blank = [None] * len(self.headers)
+
+
+async def read_csv(stream: AsyncIterator[bytes], max_bytes: Optional[int] = None) -> ColumnReader:
+    """从请求体流读取 CSV；返回的 reader.columns 为 {表头: 数组}（空列、非数值列与有空缺的列省略）。
+    事件循环上只累积字节，解析在线程池中进行。"""
+    reader = ColumnReader(settings.CSV_MAX_MB * 1024 * 1024 if max_bytes is None else max_bytes)
+    pending: List[bytes] = []
+    size = 0
+    async for chunk in stream:
+        pending.append(chunk)
+        size += len(chunk)
+        if size >= FEED_BYTES:
+            await run_in_threadpool(reader.feed, b''.join(pending))
+            pending, size = [], 0
+    if pending:
+        await run_in_threadpool(reader.feed, b''.join(pending))
+    reader.columns = await run_in_threadpool(reader.close)
+    return reader
+
+
+def invalid_fields(reader: ColumnReader, mapping: Dict[str, str], errors: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """非数值列（或 errors=reader.gaps 时有空缺的列）按字段名索引的错误信息（接口层只报告映射到实验字段的列）。"""
+    errors = reader.invalid if errors is None else errors
+    return {mapping.get(h) or column_field(h): msg for h, msg in errors.items()}
+
+
+def _set_path(payload: dict, path: str, value):
+    keys = path.split('.')
+    for key in keys[:-1]:
+        payload = payload.setdefault(key, {})
+        if not isinstance(payload, dict):
+            raise CSVError(f"字段 {path} 与其他参数冲突")
+    payload[keys[-1]] = value
+
+
+def fields_payload(columns: Dict[str, Any], mapping: Dict[str, str], params: Dict[str, str]) -> dict:
+    """默认的请求体构造：每列按映射（缺省为去掉单位的表头）写入对应字段，查询参数提供其余标量字段。"""
+    payload: dict = {}
+    for key, value in params.items():
+        _set_path(payload, key, value)
+    for header, values in columns.items():
+        _set_path(payload, mapping.get(header) or column_field(header), values)
+    return payload
+
+
+def is_currents_field(field: str) -> bool:
+    """弗兰克-赫兹的电流列：字段名为 currents 或 currents_1、currents 2 等。"""
+    return field == 'currents' or bool(_CURRENTS_HEADER.match(field))
+
+
+def frank_hertz_payload(columns: Dict[str, Any], mapping: Dict[str, str], params: Dict[str, str]) -> dict:
+    """弗兰克-赫兹：VG2K 列（可省略）为加速电压；映射到 currents 的列（columns=表头:currents，
+    或表头本身为 currents、currents_1 等）各为一组电流，标签为去掉单位的表头。其余列（序号等）忽略。"""
+    payload: dict = dict(params)
+    payload['groups'] = []
+    for header, values in columns.items():
+        field = mapping.get(header) or column_field(header)
+        if field == 'VG2K':
+            payload['VG2K'] = values
+        elif is_currents_field(field):
+            payload['groups'].append({'label': column_field(header), 'currents': values})
+    if not payload['groups']:
+        raise CSVError("未找到电流列：请用 columns=表头:currents 指定各组电流列，或将表头命名为 currents_1、currents_2 等")
+    return payload
+
+
+CSVPayloadBuilder = Callable[[Dict[str, Any], Dict[str, str], Dict[str, str]], dict]
@@ -1,33 +1,32 @@
-from fastapi import FastAPI, Depends, HTTPException
-import base64
+from fastapi import FastAPI, Depends, HTTPException, Header, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm import Session
 from sqlalchemy import inspect, create_engine
 import logging
+import time
+from typing import Optional
 from .config import settings
 from .database import Base, engine, get_db
 from .schemas import (
     WechatLoginRequest, LoginResponse, UserOut, UsersOut,
-    FiberPlotRequest, FrankHertzRequest, MillikanRequest, MechanicsRequest,
     PlotImagesResponse,
-    ThermalRequest, PhotoDevicesRequest, SolarCellRequest, UltrasoundRequest,
-    TaskStartResponse, TaskStatusResponse,
+    TaskStartResponse, TaskStatusResponse, BatchPlotRequest, BatchItemStatus,
+    ExperimentName, AnalysisRequest, AnalysisResponse, ClassStatsResponse,
 )
-from .crud import get_user_by_openid, create_user, create_plot_records
+from .crud import get_user_by_openid, create_user
 from .auth import wechat_code2session
 from .security import create_access_token
-from .deps import get_current_user, get_current_admin_user
-from .plots import (
-    plot_fiber_iu, plot_fiber_pi, plot_photodiode_iv,
-    plot_frank_hertz, plot_millikan,
-    plot_mech_t2_m, plot_mech_v2_x2,
-    plot_thermal, plot_photo_devices, plot_solar_cell, plot_ultrasound,
-)
+from .deps import get_current_user, get_current_admin_user, render_admission, admit_render, get_cohort
+# 绘图在 worker 进程中执行（见 app/workers.py），API 进程不加载 matplotlib/scipy
+from . import class_stats, ingest, pipeline, workers
+from .responses import ModelJSONResponse
+from .experiments import EXPERIMENTS, Experiment, PlotInputError
 from .tasks import (
-    start_fiber_task, start_frank_hertz_task, start_thermal_task,
-    start_photo_devices_task, start_solar_cell_task, start_ultrasound_task,
-    start_millikan_task, start_mechanics_task, get_task_for_user,
+    start_task, start_batch_task, get_task_for_user, cancel_task,
+    task_key, find_task_by_key, part_images,
 )
 
 from . import models
@@ -85,6 +84,22 @@ def on_startup():
     except Exception:
         pass
 
+    # 可选预热：启动绘图 worker 并等待其完成预热；startup 完成前服务不会接收请求，预热结束即视为就绪
+    if settings.WARMUP_ON_STARTUP:
+        t0 = time.perf_counter()
+        try:
+            timings = workers.warmup()
+            detail = " ".join(f"{k}={v:.2f}s" for k, v in timings.items())
+            logging.info(f"plot warm-up finished in {time.perf_counter() - t0:.2f}s ({detail})")
+        except Exception:
+            # 预热失败不阻塞启动，首个请求仍可按原流程完成
+            logging.exception("plot warm-up failed")
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    workers.shutdown()
+
 
 @app.get("/api/ping")
 def ping():
@@ -116,258 +131,202 @@ def admin_list_users(admin=Depends(get_current_admin_user), db: Session = Depend
 
 
 # -------------------------- 绘图接口 --------------------------
+# 各实验的同步接口 /api/plots/<name>、异步接口 /api/plots/<name>/start、CSV 上传 /api/plots/<name>/csv
+# 与数据接口 /api/plots/<name>/data（仅登记了 data_model 的实验）由实验注册表（app/experiments.py）统一生成，
+# 绘图、记录、统计与 data URI 处理见 app/pipeline.py
 
-@app.post("/api/plots/fiber", response_model=PlotImagesResponse)
-def api_plot_fiber(payload: FiberPlotRequest, user=Depends(get_current_user)):
-    images = []
-    images_data = []
-    if payload.plot_type == 'iu':
-        if not (payload.U and payload.I):
-            raise HTTPException(status_code=400, detail="I-U 图需提供 U 与 I 数组")
-        fpath, url = plot_fiber_iu(user.user_id, payload.U, payload.I)
-        images.append(url)
-        if payload.return_data_uri:
-            with open(fpath, 'rb') as f:
-                images_data.append('data:image/png;base64,' + base64.b64encode(f.read()).decode('utf-8'))
-    elif payload.plot_type == 'pi':
-        if not (payload.I and payload.P):
-            raise HTTPException(status_code=400, detail="P-I 图需提供 I 与 P 数组")
-        fpath, url = plot_fiber_pi(user.user_id, payload.I, payload.P)
-        images.append(url)
-        if payload.return_data_uri:
-            with open(fpath, 'rb') as f:
-                images_data.append('data:image/png;base64,' + base64.b64encode(f.read()).decode('utf-8'))
-    elif payload.plot_type == 'photodiode':
-        if not (payload.V and payload.I0 and payload.I1 and payload.I2):
-            raise HTTPException(status_code=400, detail="光电二极管图需提供 V、I0、I1、I2 数组")
-        fpath, url = plot_photodiode_iv(user.user_id, payload.V, payload.I0, payload.I1, payload.I2)
-        images.append(url)
-        if payload.return_data_uri:
-            with open(fpath, 'rb') as f:
-                images_data.append('data:image/png;base64,' + base64.b64encode(f.read()).decode('utf-8'))
-    else:
-        raise HTTPException(status_code=400, detail="未知的 plot_type")
-    resp = PlotImagesResponse(images=images, message="生成完成")
-    if images_data:
-        resp.images_data = images_data
-    return resp
-
-
-@app.post("/api/plots/frank-hertz", response_model=PlotImagesResponse)
-def api_plot_frank_hertz(payload: FrankHertzRequest, user=Depends(get_current_user)):
-    if not payload.groups:
-        raise HTTPException(status_code=400, detail="请至少提供一组数据")
-    # 默认 VG2K：1..82（共 82 个点）
-    VG2K = payload.VG2K if payload.VG2K else [float(i) for i in range(1, 83)]
-    # 将 groups 转换为 (List[float], str) 列表
-    groups = []
-    for g in payload.groups:
-        if not g.currents or len(g.currents) != len(VG2K):
-            raise HTTPException(status_code=400, detail="每组 currents 需与 VG2K 长度一致（默认 82 项）")
-        groups.append((g.currents, g.label))
-    results = plot_frank_hertz(user.user_id, VG2K, groups)
-    images = []
-    images_data = []
-    for fpath, url in results:
-        images.append(url)
-        if payload.return_data_uri:
-            with open(fpath, 'rb') as f:
-                images_data.append('data:image/png;base64,' + base64.b64encode(f.read()).decode('utf-8'))
-    resp = PlotImagesResponse(images=images, message=f"共生成{len(images)}张图像")
-    if images_data:
-        resp.images_data = images_data
-    return resp
-
-
-# -------------------------- 新增绘图接口 --------------------------
-
-@app.post("/api/plots/thermal", response_model=PlotImagesResponse)
-def api_plot_thermal(payload: ThermalRequest, user=Depends(get_current_user), db: Session = Depends(get_db)):
-    # 默认温度序列：55,60,65,70,75,80（若前端未提供）
-    temperatures = payload.temperatures if payload.temperatures else [55.0, 60.0, 65.0, 70.0, 75.0, 80.0]
-    # 基本校验
-    if not (payload.pt100_resistance and payload.ntc_resistance):
-        raise HTTPException(status_code=400, detail="pt100_resistance / ntc_resistance 不能为空")
-    if not (len(temperatures) == len(payload.pt100_resistance) == len(payload.ntc_resistance)):
-        raise HTTPException(status_code=400, detail="三个数组长度需一致")
-    results = plot_thermal(user.user_id, temperatures, payload.pt100_resistance, payload.ntc_resistance)
+def _validate(exp: Experiment, payload):
     try:
-        create_plot_records(db, user.user_id, 'thermal', results)
-    except Exception:
-        pass
-    images = [u for _, u in results]
-    resp = PlotImagesResponse(images=images, message=f"共生成{len(images)}张图像")
-    if payload.return_data_uri:
-        imgs = []
-        for fp, _ in results:
-            with open(fp, 'rb') as f:
-                imgs.append('data:image/png;base64,' + base64.b64encode(f.read()).decode('utf-8'))
-        resp.images_data = imgs
-    return resp
+        exp.validate(payload)
+    except PlotInputError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+
+def _start_task(user, experiment: str, payload, idempotency_key: Optional[str], start_fn) -> TaskStartResponse:
+    """异步任务提交：窗口期内的重复提交（相同 Idempotency-Key，或相同用户+实验+请求体）直接复用已有任务，
+    不再占用绘图配额；否则领取配额并启动新任务。"""
+    key = task_key(user.user_id, experiment, payload, idempotency_key)
+    existing = find_task_by_key(user.user_id, key)
+    if existing is not None:
+        return TaskStartResponse(task_id=existing.task_id, status=existing.status)
+    ticket = admit_render(user)
+    try:
+        tid = start_fn(user.user_id, payload, ticket, key)
+    except BaseException:
+        # 任务未能交给后台线程（启动前出错）时归还配额，避免配额泄漏
+        if not ticket.handed_off:
+            ticket.release()
+        raise
+    return TaskStartResponse(task_id=tid, status='pending')
 
 
-@app.post("/api/plots/photo-devices", response_model=PlotImagesResponse)
-def api_plot_photo_devices(payload: PhotoDevicesRequest, user=Depends(get_current_user), db: Session = Depends(get_db)):
-    # 基本非空校验（长度不做强制一致，按各自曲线绘制）
-    for name in [
-        'led_I','led_V','led_P','ld_I','ld_V','ld_P','pd_L','pd_I_L','pd_V','pd_I_V','pd_wl','pd_I_wl','pt_L','pt_I_L','pt_V','pt_I_V','pt_wl','pt_I_wl'
-    ]:
-        arr = getattr(payload, name, None)
-        if not arr:
-            raise HTTPException(status_code=400, detail=f"字段 {name} 不能为空")
-    fpath, url = plot_photo_devices(
-        user.user_id,
-        payload.led_I, payload.led_V, payload.led_P,
-        payload.ld_I, payload.ld_V, payload.ld_P, payload.ld_linear_start_idx or 4,
-        payload.pd_L, payload.pd_I_L, payload.pd_V, payload.pd_I_V, payload.pd_wl, payload.pd_I_wl,
-        payload.pt_L, payload.pt_I_L, payload.pt_V, payload.pt_I_V, payload.pt_wl, payload.pt_I_wl
-    )
+async def _csv_payload(exp: Experiment, request: Request, columns: Optional[str]):
+    """流式读取 CSV 请求体并构造、校验该实验的请求体（列映射见 app/ingest.py）；其余查询参数作为标量字段。
+    事件循环上只收集字节，解析与校验在线程池中进行，不阻塞其他请求。"""
     try:
-        create_plot_records(db, user.user_id, 'photo-devices', [(fpath, url)])
-    except Exception:
-        pass
-    resp = PlotImagesResponse(images=[url], message="生成完成")
-    if payload.return_data_uri:
-        with open(fpath, 'rb') as f:
-            resp.images_data = ['data:image/png;base64,' + base64.b64encode(f.read()).decode('utf-8')]
+        length = int(request.headers.get('content-length') or 0)
+        if length > settings.CSV_MAX_MB * 1024 * 1024:
+            raise ingest.CSVError(f"文件超过 {settings.CSV_MAX_MB} MB 上限", status_code=413)
+        mapping = ingest.parse_column_map(columns)
+        reader = await ingest.read_csv(request.stream())
+    except ingest.CSVError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    params = {k: v for k, v in request.query_params.items() if k != 'columns'}
+    return await run_in_threadpool(_csv_request, exp, reader, mapping, params)
+
+
+def _csv_request(exp: Experiment, reader: ingest.ColumnReader, mapping, params) -> object:
+    try:
+        payload = exp.csv_payload(reader.columns, mapping, params)
+    except ingest.CSVError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    # 映射到实验字段的列含非数值单元格或中间空缺时直接报告具体位置；其余列（序号、备注等）忽略
+    for errors, status in ((reader.gaps, 422), (reader.invalid, 400)):
+        for field, message in ingest.invalid_fields(reader, mapping, errors).items():
+            used = field.split('.')[0] in exp.request_model.model_fields or (
+                exp.csv_payload is ingest.frank_hertz_payload and ingest.is_currents_field(field))
+            if used:
+                raise HTTPException(status_code=status, detail=message)
+    try:
+        payload = exp.request_model.model_validate(payload)
+    except ValidationError as e:
+        err = e.errors()[0]
+        field = '.'.join(str(x) for x in err['loc'])
+        raise HTTPException(status_code=400, detail=f"字段 {field} 缺失或格式错误：{err['msg']}")
+    _validate(exp, payload)
+    return payload
+
+
+_CSV_BODY = {"requestBody": {"required": True, "content": {"text/csv": {"schema": {"type": "string", "format": "binary"}}}}}
+
+
+def _add_plot_routes(exp: Experiment):
+    model = exp.request_model
+    slug = exp.name.replace('-', '_')
+
+    def plot(payload: model, user=Depends(get_current_user), ticket=Depends(render_admission), db: Session = Depends(get_db),
+             cohort: Optional[str] = Depends(get_cohort)):
+        _validate(exp, payload)
+        return ModelJSONResponse(pipeline.render(exp, user.user_id, payload, ticket, db, cohort))
+
+    def start(payload: model, user=Depends(get_current_user), idempotency_key: Optional[str] = Header(None),
+              cohort: Optional[str] = Depends(get_cohort)):
+        _validate(exp, payload)
+        return ModelJSONResponse(_start_task(user, exp.name, payload, idempotency_key,
+                                             lambda user_id, p, ticket, key: start_task(user_id, exp, p, ticket, key, cohort)))
+
+    async def upload(request: Request, columns: Optional[str] = None, user=Depends(get_current_user), db: Session = Depends(get_db),
+                     cohort: Optional[str] = Depends(get_cohort)):
+        # 先读完并校验文件再领取绘图配额，上传过程不占用配额
+        payload = await _csv_payload(exp, request, columns)
+        ticket = admit_render(user)
+        try:
+            return ModelJSONResponse(await run_in_threadpool(pipeline.render, exp, user.user_id, payload, ticket, db, cohort))
+        finally:
+            ticket.release()
+
+    def data(payload: model, user=Depends(get_current_user)):
+        _validate(exp, payload)
+        # 按需导入（依赖 numpy），API 进程启动时不加载；只做数值计算，不占用绘图配额
+        from . import results
+        return ModelJSONResponse(exp.data_model.model_validate(results.BUILDERS[exp.name](payload)))
+
+    app.add_api_route(f"/api/plots/{exp.name}", plot, methods=["POST"], response_model=PlotImagesResponse,
+                      response_class=ModelJSONResponse, name=f"api_plot_{slug}")
+    app.add_api_route(f"/api/plots/{exp.name}/csv", upload, methods=["POST"], response_model=PlotImagesResponse,
+                      response_class=ModelJSONResponse, openapi_extra=_CSV_BODY, name=f"api_plot_{slug}_csv")
+    app.add_api_route(f"/api/plots/{exp.name}/start", start, methods=["POST"], response_model=TaskStartResponse,
+                      response_class=ModelJSONResponse, name=f"api_plot_{slug}_start")
+    if exp.data_model is not None:
+        app.add_api_route(f"/api/plots/{exp.name}/data", data, methods=["POST"], response_model=exp.data_model,
+                          response_class=ModelJSONResponse, name=f"api_plot_{slug}_data")
+
+
+for _exp in EXPERIMENTS.values():
+    _add_plot_routes(_exp)
+
+
+def _task_status(t) -> TaskStatusResponse:
+    images = list(t.images)
+    resp = TaskStatusResponse(
+        status=t.status, images=images or None,
+        images_data=list(t.images_data) if t.images_data else None,
+        message=t.message, progress=len(t.figures), total=t.total,
+        uncertainty=t.parts[0].uncertainty if t.experiment != 'batch' and t.parts else None,
+    )
+    if t.experiment == 'batch':
+        resp.items = []
+        for part in t.parts:
+            part_urls, part_data, done = part_images(t, part)
+            resp.items.append(BatchItemStatus(
+                experiment=part.experiment, status=part.status, images=part_urls or None, images_data=part_data,
+                message=part.error, progress=done, total=part.count, uncertainty=part.uncertainty,
+            ))
     return resp
 
 
-@app.post("/api/plots/solar-cell", response_model=PlotImagesResponse)
-def api_plot_solar_cell(payload: SolarCellRequest, user=Depends(get_current_user), db: Session = Depends(get_db)):
-    # 基本校验
-    for name in [
-        'dark_voltage','dark_current','light_voltage','light_current','relative_intensity','light_power','short_circuit_current','open_circuit_voltage'
-    ]:
-        arr = getattr(payload, name, None)
-        if not arr:
-            raise HTTPException(status_code=400, detail=f"字段 {name} 不能为空")
-    results = plot_solar_cell(
-        user.user_id,
-        payload.dark_voltage, payload.dark_current,
-        payload.light_voltage, payload.light_current,
-        payload.relative_intensity, payload.light_power, payload.short_circuit_current, payload.open_circuit_voltage
-    )
-    try:
-        create_plot_records(db, user.user_id, 'solar-cell', results)
-    except Exception:
-        pass
-    images = [u for _, u in results]
-    resp = PlotImagesResponse(images=images, message=f"共生成{len(images)}张图像")
-    if payload.return_data_uri:
-        imgs = []
-        for fp, _ in results:
-            with open(fp, 'rb') as f:
-                imgs.append('data:image/png;base64,' + base64.b64encode(f.read()).decode('utf-8'))
-        resp.images_data = imgs
-    return resp
+# 绘图结果直接返回 ModelJSONResponse：跳过响应模型的二次校验，由 pydantic-core 一次编码（见 app/responses.py）
+@app.get("/api/plots/status/{task_id}", response_model=TaskStatusResponse, response_class=ModelJSONResponse)
+def api_plot_status(task_id: str, user=Depends(get_current_user)):
+    t = get_task_for_user(task_id, user.user_id)
+    if not t:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return ModelJSONResponse(_task_status(t))
 
 
-@app.post("/api/plots/ultrasound", response_model=PlotImagesResponse)
-def api_plot_ultrasound(payload: UltrasoundRequest, user=Depends(get_current_user), db: Session = Depends(get_db)):
-    # 校验必填数组非空
-    required_groups = [
-        't_free_fall','v_free_fall_1',
-        't1','v1_1','v1_2','v1_3','v1_4',
-        't2','v2_1','v2_2','v2_3','v2_4',
-        't3','v3_1','v3_2','v3_3','v3_4',
-        'm','a_measured'
-    ]
-    for name in required_groups:
-        arr = getattr(payload, name, None)
-        if not arr:
-            raise HTTPException(status_code=400, detail=f"字段 {name} 不能为空")
-    # 长度一致性：自由落体 1..4 组速度需与 t_free_fall 一致
-    n_free = len(payload.t_free_fall)
-    for vname in ['v_free_fall_1','v_free_fall_2','v_free_fall_3','v_free_fall_4']:
-        v = getattr(payload, vname, None)
-        if v is not None and len(v) != n_free:
-            raise HTTPException(status_code=400, detail=f"{vname} 长度需与 t_free_fall 一致")
-    # 三组匀变速：各组 4 次测量长度需与对应 t 数组一致
-    for tname, vnames in [
-        ('t1', ['v1_1','v1_2','v1_3','v1_4']),
-        ('t2', ['v2_1','v2_2','v2_3','v2_4']),
-        ('t3', ['v3_1','v3_2','v3_3','v3_4']),
-    ]:
-        n = len(getattr(payload, tname))
-        for vn in vnames:
-            v = getattr(payload, vn)
-            if len(v) != n:
-                raise HTTPException(status_code=400, detail=f"{vn} 长度需与 {tname} 一致")
-
-    results = plot_ultrasound(
-        user.user_id,
-        payload.t_free_fall, payload.v_free_fall_1, payload.v_free_fall_2, payload.v_free_fall_3, payload.v_free_fall_4,
-        payload.t1, payload.v1_1, payload.v1_2, payload.v1_3, payload.v1_4,
-        payload.t2, payload.v2_1, payload.v2_2, payload.v2_3, payload.v2_4,
-        payload.t3, payload.v3_1, payload.v3_2, payload.v3_3, payload.v3_4,
-        payload.m, payload.a_measured
-    )
-    try:
-        create_plot_records(db, user.user_id, 'ultrasound', results)
-    except Exception:
-        pass
-    images = [u for _, u in results]
-    resp = PlotImagesResponse(images=images, message=f"共生成{len(images)}张图像")
-    if payload.return_data_uri:
-        imgs = []
-        for fp, _ in results:
-            with open(fp, 'rb') as f:
-                imgs.append('data:image/png;base64,' + base64.b64encode(f.read()).decode('utf-8'))
-        resp.images_data = imgs
-    return resp
+@app.delete("/api/plots/status/{task_id}", response_model=TaskStatusResponse, response_class=ModelJSONResponse)
+def api_plot_cancel(task_id: str, user=Depends(get_current_user)):
+    t = get_task_for_user(task_id, user.user_id)
+    if not t:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return ModelJSONResponse(_task_status(cancel_task(t)))
 
 
-@app.post("/api/plots/millikan", response_model=PlotImagesResponse)
-def api_plot_millikan(payload: MillikanRequest, user=Depends(get_current_user)):
-    if not payload.ni or not payload.qi or len(payload.ni) != len(payload.qi):
-        raise HTTPException(status_code=400, detail="ni 与 qi 数组长度需一致且均非空")
-    fpath, url = plot_millikan(user.user_id, payload.ni, payload.qi)
-    images = [url]
-    resp = PlotImagesResponse(images=images, message="生成完成")
-    if payload.return_data_uri:
-        with open(fpath, 'rb') as f:
-            resp.images_data = ['data:image/png;base64,' + base64.b64encode(f.read()).decode('utf-8')]
-    return resp
+@app.post("/api/plots/batch", response_model=TaskStartResponse, response_class=ModelJSONResponse)
+def api_plot_batch_start(payload: BatchPlotRequest, user=Depends(get_current_user), idempotency_key: Optional[str] = Header(None),
+                         cohort: Optional[str] = Depends(get_cohort)):
+    """一次提交多个实验：逐项按对应实验的请求体校验（一次返回全部错误），所有图合并为一个任务调度。"""
+    items, errors = [], []
+    for idx, item in enumerate(payload.items, start=1):
+        exp = EXPERIMENTS[item.experiment]
+        try:
+            body = exp.request_model.model_validate(item.payload)
+            exp.validate(body)
+        except ValidationError as e:
+            err = e.errors()[0]
+            errors.append(f"第{idx}项（{item.experiment}）：字段 {'.'.join(str(x) for x in err['loc'])} 格式错误")
+        except PlotInputError as e:
+            errors.append(f"第{idx}项（{item.experiment}）：{e}")
+        else:
+            items.append((exp, body))
+    if errors:
+        raise HTTPException(status_code=400, detail="；".join(errors))
+    return ModelJSONResponse(_start_task(user, 'batch', payload, idempotency_key,
+                                         lambda user_id, p, ticket, key: start_batch_task(user_id, p, items, ticket, key, cohort)))
+
+
+@app.get("/api/admin/render-workers")
+def admin_render_workers(admin=Depends(get_current_admin_user)):
+    return dict(workers.stats(), experiments=pipeline.stats())
+
+
+@app.post("/api/admin/analysis/{experiment}", response_model=AnalysisResponse, response_class=ModelJSONResponse)
+def admin_batch_analysis(experiment: ExperimentName, payload: AnalysisRequest, admin=Depends(get_current_admin_user)):
+    """批量分析：一次计算多份数据集（如整个教学班）的拟合结果，不绘图；命令行见 python -m app.batch_analysis。"""
+    # 按需导入（依赖 numpy），API 进程启动时不加载
+    from . import batch_analysis
+    try:
+        result = batch_analysis.run(EXPERIMENTS[experiment], payload.datasets, payload.labels)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ModelJSONResponse(AnalysisResponse.model_validate(result))
 
 
-@app.post("/api/plots/mechanics", response_model=PlotImagesResponse)
-def api_plot_mechanics(payload: MechanicsRequest, user=Depends(get_current_user)):
-    # T2-M
-    if not (payload.t2m and payload.t2m.weights_g and payload.t2m.T10_avg_s):
-        raise HTTPException(status_code=400, detail="t2m 字段缺失或为空")
-    if len(payload.t2m.weights_g) != len(payload.t2m.T10_avg_s):
-        raise HTTPException(status_code=400, detail="weights_g 与 T10_avg_s 需长度一致")
-    fpath1, url1, k = plot_mech_t2_m(user.user_id, payload.t2m.m0_g, payload.t2m.weights_g, payload.t2m.T10_avg_s)
-
-    # v2-x2
-    if not (payload.v2x2 and payload.v2x2.x_cm and payload.v2x2.v_avg_cms):
-        raise HTTPException(status_code=400, detail="v2x2 字段缺失或为空")
-    if len(payload.v2x2.x_cm) != len(payload.v2x2.v_avg_cms):
-        raise HTTPException(status_code=400, detail="x_cm 与 v_avg_cms 需长度一致")
-    fpath2, url2, omega, T_calc = plot_mech_v2_x2(user.user_id, payload.v2x2.x_cm, payload.v2x2.v_avg_cms)
-
-    resp = PlotImagesResponse(images=[url1, url2], message="生成完成")
-    if payload.return_data_uri:
-        imgs = []
-        for fp in [fpath1, fpath2]:
-            with open(fp, 'rb') as f:
-                imgs.append('data:image/png;base64,' + base64.b64encode(f.read()).decode('utf-8'))
-        resp.images_data = imgs
-    return resp
+@app.get("/api/admin/class-stats/{experiment}", response_model=ClassStatsResponse)
+def admin_class_stats(experiment: ExperimentName, cohort: str = '', admin=Depends(get_current_admin_user), db: Session = Depends(get_db)):
+    """班级统计：读取增量维护的聚合（每个导出常数一行），耗时与提交数量无关；cohort 缺省为全部。"""
+    return ClassStatsResponse(experiment=experiment, cohort=cohort, quantities=class_stats.read(db, experiment, cohort))
 
-@app.post("/api/plots/mechanics/start", response_model=TaskStartResponse)
-def api_plot_mechanics_start(payload: MechanicsRequest, user=Depends(get_current_user)):
-    if not (payload.t2m and payload.t2m.weights_g and payload.t2m.T10_avg_s):
-        raise HTTPException(status_code=400, detail="t2m 字段缺失或为空")
-    if len(payload.t2m.weights_g) != len(payload.t2m.T10_avg_s):
-        raise HTTPException(status_code=400, detail="weights_g 与 T10_avg_s 需长度一致")
-    if not (payload.v2x2 and payload.v2x2.x_cm and payload.v2x2.v_avg_cms):
-        raise HTTPException(status_code=400, detail="v2x2 字段缺失或为空")
-    if len(payload.v2x2.x_cm) != len(payload.v2x2.v_avg_cms):
-        raise HTTPException(status_code=400, detail="x_cm 与 v_avg_cms 需长度一致")
-    tid = start_mechanics_task(user.user_id, payload)
-    return TaskStartResponse(task_id=tid, status='pending')
 
 @app.get("/api/admin/db-info")
 def admin_db_info(admin=Depends(get_current_admin_user)):
@@ -379,100 +338,3 @@ def admin_db_info(admin=Depends(get_current_admin_user)):
         "database": engine.url.database,
         "tables": insp.get_table_names(),
     }
-@app.post("/api/plots/fiber/start", response_model=TaskStartResponse)
-def api_plot_fiber_start(payload: FiberPlotRequest, user=Depends(get_current_user)):
-    if payload.plot_type == 'iu':
-        if not (payload.U and payload.I):
-            raise HTTPException(status_code=400, detail="I-U 图需提供 U 与 I 数组")
-    elif payload.plot_type == 'pi':
-        if not (payload.I and payload.P):
-            raise HTTPException(status_code=400, detail="P-I 图需提供 I 与 P 数组")
-    elif payload.plot_type == 'photodiode':
-        if not (payload.V and payload.I0 and payload.I1 and payload.I2):
-            raise HTTPException(status_code=400, detail="光电二极管图需提供 V、I0、I1、I2 数组")
-    else:
-        raise HTTPException(status_code=400, detail="未知的 plot_type")
-    tid = start_fiber_task(user.user_id, payload)
-    return TaskStartResponse(task_id=tid, status='pending')
-
-@app.get("/api/plots/status/{task_id}", response_model=TaskStatusResponse)
-def api_plot_status(task_id: str, user=Depends(get_current_user)):
-    t = get_task_for_user(task_id, user.user_id)
-    if not t:
-        raise HTTPException(status_code=404, detail="任务不存在")
-    return TaskStatusResponse(status=t.status, images=t.images or None, images_data=t.images_data, message=t.message)
-@app.post("/api/plots/frank-hertz/start", response_model=TaskStartResponse)
-def api_plot_frank_hertz_start(payload: FrankHertzRequest, user=Depends(get_current_user)):
-    if not payload.groups:
-        raise HTTPException(status_code=400, detail="请至少提供一组数据")
-    VG2K = payload.VG2K if payload.VG2K else [float(i) for i in range(1, 83)]
-    for g in payload.groups:
-        if not g.currents or len(g.currents) != len(VG2K):
-            raise HTTPException(status_code=400, detail="每组 currents 需与 VG2K 长度一致（默认 82 项）")
-    tid = start_frank_hertz_task(user.user_id, payload)
-    return TaskStartResponse(task_id=tid, status='pending')
-@app.post("/api/plots/thermal/start", response_model=TaskStartResponse)
-def api_plot_thermal_start(payload: ThermalRequest, user=Depends(get_current_user)):
-    temperatures = payload.temperatures if payload.temperatures else [55.0, 60.0, 65.0, 70.0, 75.0, 80.0]
-    if not (payload.pt100_resistance and payload.ntc_resistance):
-        raise HTTPException(status_code=400, detail="pt100_resistance / ntc_resistance 不能为空")
-    if not (len(temperatures) == len(payload.pt100_resistance) == len(payload.ntc_resistance)):
-        raise HTTPException(status_code=400, detail="三个数组长度需一致")
-    tid = start_thermal_task(user.user_id, payload)
-    return TaskStartResponse(task_id=tid, status='pending')
-@app.post("/api/plots/photo-devices/start", response_model=TaskStartResponse)
-def api_plot_photo_devices_start(payload: PhotoDevicesRequest, user=Depends(get_current_user)):
-    for name in [
-        'led_I','led_V','led_P','ld_I','ld_V','ld_P','pd_L','pd_I_L','pd_V','pd_I_V','pd_wl','pd_I_wl','pt_L','pt_I_L','pt_V','pt_I_V','pt_wl','pt_I_wl'
-    ]:
-        arr = getattr(payload, name, None)
-        if not arr:
-            raise HTTPException(status_code=400, detail=f"字段 {name} 不能为空")
-    tid = start_photo_devices_task(user.user_id, payload)
-    return TaskStartResponse(task_id=tid, status='pending')
-@app.post("/api/plots/solar-cell/start", response_model=TaskStartResponse)
-def api_plot_solar_cell_start(payload: SolarCellRequest, user=Depends(get_current_user)):
-    for name in [
-        'dark_voltage','dark_current','light_voltage','light_current','relative_intensity','light_power','short_circuit_current','open_circuit_voltage'
-    ]:
-        arr = getattr(payload, name, None)
-        if not arr:
-            raise HTTPException(status_code=400, detail=f"字段 {name} 不能为空")
-    tid = start_solar_cell_task(user.user_id, payload)
-    return TaskStartResponse(task_id=tid, status='pending')
-@app.post("/api/plots/ultrasound/start", response_model=TaskStartResponse)
-def api_plot_ultrasound_start(payload: UltrasoundRequest, user=Depends(get_current_user)):
-    required_groups = [
-        't_free_fall','v_free_fall_1',
-        't1','v1_1','v1_2','v1_3','v1_4',
-        't2','v2_1','v2_2','v2_3','v2_4',
-        't3','v3_1','v3_2','v3_3','v3_4',
-        'm','a_measured'
-    ]
-    for name in required_groups:
-        arr = getattr(payload, name, None)
-        if not arr:
-            raise HTTPException(status_code=400, detail=f"字段 {name} 不能为空")
-    n_free = len(payload.t_free_fall)
-    for vname in ['v_free_fall_1','v_free_fall_2','v_free_fall_3','v_free_fall_4']:
-        v = getattr(payload, vname, None)
-        if v is not None and len(v) != n_free:
-            raise HTTPException(status_code=400, detail=f"{vname} 长度需与 t_free_fall 一致")
-    for tname, vnames in [
-        ('t1', ['v1_1','v1_2','v1_3','v1_4']),
-        ('t2', ['v2_1','v2_2','v2_3','v2_4']),
-        ('t3', ['v3_1','v3_2','v3_3','v3_4']),
-    ]:
-        n = len(getattr(payload, tname))
-        for vn in vnames:
-            v = getattr(payload, vn)
-            if len(v) != n:
-                raise HTTPException(status_code=400, detail=f"{vn} 长度需与 {tname} 一致")
-    tid = start_ultrasound_task(user.user_id, payload)
-    return TaskStartResponse(task_id=tid, status='pending')
-@app.post("/api/plots/millikan/start", response_model=TaskStartResponse)
-def api_plot_millikan_start(payload: MillikanRequest, user=Depends(get_current_user)):
-    if not payload.ni or not payload.qi or len(payload.ni) != len(payload.qi):
-        raise HTTPException(status_code=400, detail="ni 与 qi 数组长度需一致且均非空")
-    tid = start_millikan_task(user.user_id, payload)
-    return TaskStartResponse(task_id=tid, status='pending')
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Float, Text, UniqueConstraint, ForeignKey
 from .database import Base
 
 
@@ -23,4 +23,40 @@ class PlotRecord(Base):
     experiment = Column(String(64), nullable=False)
     file_path = Column(String(255), nullable=False)
     url = Column(String(255), nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class AnalysisAggregate(Base):
+    # 班级统计：按 (实验, 班级, 导出常数) 增量维护的聚合量，见 app/class_stats.py；cohort 为空串表示全部
+    __tablename__ = "analysis_aggregates"
+    __table_args__ = (
+        UniqueConstraint("experiment", "cohort", "quantity", name="uq_aggregate_key"),
+    )
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    experiment = Column(String(64), nullable=False)
+    cohort = Column(String(64), nullable=False, default="")
+    quantity = Column(String(64), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    mean = Column(Float, nullable=False, default=0.0)
+    m2 = Column(Float, nullable=False, default=0.0)
+    min_value = Column(Float, nullable=True)
+    max_value = Column(Float, nullable=True)
+    histogram = Column(Text, nullable=False, default="{}")
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class AnalysisSample(Base):
+    # 班级统计中每个学生在每个实验的当前样本（最近一次提交的导出常数），重新提交时据此从聚合中撤销旧值，见 app/class_stats.py
+    __tablename__ = "analysis_samples"
+    __table_args__ = (
+        UniqueConstraint("experiment", "user_id", name="uq_sample_key"),
+    )
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    experiment = Column(String(64), nullable=False)
+    user_id = Column(Integer, ForeignKey("user_info.user_id"), nullable=False, index=True)
+    cohort = Column(String(64), nullable=False, default="")
+    # 请求体哈希：内容相同的重复提交不再重新计算
+    digest = Column(String(64), nullable=False, default="")
+    # {导出常数: 值}（JSON）
+    constants = Column(Text, nullable=False, default="{}")
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,112 @@
+"""
+统一绘图流水线：所有实验的同步、异步与批量请求共用。
+
+- 绘图：按实验注册表（app.experiments）拆分为单图任务，经 Ticket 提交（图级缓存、并行绘制、公平调度见 app.workers）；
+- 记录：新生成的图像写入 PlotRecord；命中图级缓存的图复用已有记录，不重复写入；
+- 统计：按实验累计请求数、失败数、图像数与耗时，见 /api/admin/render-workers 的 experiments 字段；
+- 班级统计：绘图成功后把该数据集的导出常数计入班级聚合，每个学生只保留最近一次提交（见 app.class_stats）；
+- 不确定度：请求体 uncertainty=true 时返回导出常数的 bootstrap 置信区间；
+- data URI：return_data_uri=true 时读取图像文件并编码。
+"""
+
+import base64
+import logging
+import threading
+import time
+from typing import Any, Collection, Dict, List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from . import class_stats, workers
+from .config import settings
+from .crud import create_plot_records
+from .database import SessionLocal
+from .experiments import Experiment
+from .schemas import PlotImagesResponse
+
+
+def data_uri(fpath: str) -> str:
+    with open(fpath, 'rb') as f:
+        return 'data:image/png;base64,' + base64.b64encode(f.read()).decode('utf-8')
+
+
+def record(user_id: int, experiment: str, results: Sequence[Sequence[Any]], db: Optional[Session] = None,
+           reused: Collection[str] = ()):
+    """写入绘图记录；results 为绘图函数返回值列表（前两项为 文件路径、URL）。记录失败不影响绘图结果。
+    reused 为命中图级缓存的文件路径（见 Ticket.reused），首次生成时已有记录，跳过。"""
+    results = [r for r in results if r[0] not in reused]
+    if not results:
+        return
+    own = db is None
+    if own:
+        db = SessionLocal()
+    try:
+        create_plot_records(db, user_id, experiment, [(r[0], r[1]) for r in results])
+    except Exception:
+        logging.exception(f"failed to record plots for {experiment}")
+    finally:
+        if own:
+            db.close()
+
+
+def uncertainty(exp: Experiment, payload, ticket) -> Optional[Dict[str, Any]]:
+    """请求体 uncertainty=true 时计算导出常数的 bootstrap 置信区间（见 app.batch_analysis.bootstrap）；
+    与绘图一样作为该请求的任务交给 worker 进程（app.plots.bootstrap_uncertainty），不在 API 进程中计算。
+    未请求、实验无导出常数或计算失败时返回 None，不影响绘图结果。"""
+    if not getattr(payload, 'uncertainty', False) or not exp.constants:
+        return None
+    try:
+        return workers.run('bootstrap_uncertainty', exp.name, payload, settings.BOOTSTRAP_RESAMPLES, settings.BOOTSTRAP_CONFIDENCE,
+                           owner=ticket.user_id, priority=ticket.priority)
+    except Exception:
+        logging.exception(f"failed to estimate uncertainty for {exp.name}")
+        return None
+
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, float]] = {}
+
+
+def observe(experiment: str, seconds: float, images: int, ok: bool):
+    with _stats_lock:
+        s = _stats.setdefault(experiment, {"requests": 0, "failed": 0, "images": 0, "seconds": 0.0, "max_seconds": 0.0})
+        s["requests"] += 1
+        s["failed"] += 0 if ok else 1
+        s["images"] += images
+        s["seconds"] += seconds
+        s["max_seconds"] = max(s["max_seconds"], seconds)
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """按实验的请求数、失败数、图像数、平均/最大耗时（秒，含排队）。"""
+    with _stats_lock:
+        return {
+            name: {
+                "requests": int(s["requests"]),
+                "failed": int(s["failed"]),
+                "images": int(s["images"]),
+                "avg_seconds": round(s["seconds"] / s["requests"], 3) if s["requests"] else 0.0,
+                "max_seconds": round(s["max_seconds"], 3),
+            }
+            for name, s in _stats.items()
+        }
+
+
+def render(exp: Experiment, user_id: int, payload, ticket, db: Optional[Session] = None,
+           cohort: Optional[str] = None) -> PlotImagesResponse:
+    """同步绘图：并行绘制该实验的全部图，记录并返回图像 URL（及 data URI）；cohort 为班级统计的班级。"""
+    t0 = time.perf_counter()
+    results: List[Any] = []
+    try:
+        results = ticket.map(exp.jobs(user_id, payload))
+    finally:
+        observe(exp.name, time.perf_counter() - t0, len(results), bool(results))
+    record(user_id, exp.name, results, db, reused=ticket.reused)
+    if any(r[0] not in ticket.reused for r in results):
+        # 全部图命中缓存说明同一学生重复提交了相同数据，不再计入班级统计
+        class_stats.observe(user_id, exp.name, payload, cohort)
+    resp = PlotImagesResponse(images=[r[1] for r in results], message=exp.completed_message(len(results)),
+                              uncertainty=uncertainty(exp, payload, ticket))
+    if payload.return_data_uri:
+        resp.images_data = [data_uri(r[0]) for r in results]
+    return resp
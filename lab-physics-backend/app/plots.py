@@ -2,32 +2,52 @@
 绘图服务模块：封装四个实验的绘图函数。
 
 注意：
-- 弗兰克-赫兹曲线采用 SciPy CubicSpline 进行三次样条拟合；
+- 弗兰克-赫兹曲线采用三次样条插值（app.analysis.cubic_spline，与 SciPy CubicSpline 默认边界一致），并标注峰谷与激发电位；
 - 输出目录统一为 data/plots/{user_id}/{experiment}/；
-- 返回可通过 /static 路径访问的相对 URL（例如 /static/plots/1/millikan/xxx.png）。
+- 返回可通过 /static 路径访问的相对 URL（例如 /static/plots/1/millikan/xxx.png）；
+- 多图实验按图拆分为单图函数（plot_solar_dark_iv 等），便于在多个 worker 中并行绘制；
+  原有的组合函数（plot_solar_cell 等）按顺序调用单图函数，返回值不变；
+- 光电器件的十个子图各自绘制并按数据哈希复用（plot_photo_panel），合并图由子图图片拼接；
+- 长序列（仪器高速采集）绘制前经 _display_points 降采样到 PLOT_MAX_POINTS 个点以内，拟合仍使用完整数据；
+- 拟合与导出常数（斜率、R²、劲度系数、阈值电流等）由 app.analysis 计算，本模块只负责绘制。
 """
 
+import functools
+import hashlib
+import io
 import os
+import time
 import uuid
-from typing import List, Tuple, Optional
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Tuple, Optional
 
 import numpy as np
 import matplotlib
 import matplotlib.pyplot as plt
 import matplotlib.font_manager as fm
+from PIL import Image
 import glob
-from scipy.interpolate import CubicSpline
-from scipy import optimize, stats
+
+from . import analysis
+from .figures import PHOTO_PANELS
+from .config import settings
 
 
 def _ensure_dir(path: str):
     os.makedirs(path, exist_ok=True)
 
 
+_FONT_CONFIGURED = False
+
+
 def _set_chinese_font():
     """尽量设置可用中文字体，保证中文标题/标签在不同环境下可读。
     优先使用 Noto Sans CJK / Source Han Sans（容器中通过 fonts-noto-cjk 安装），并在找不到时回退。
+    字体扫描与 addfont 开销较大，进程内只执行一次。
     """
+    global _FONT_CONFIGURED
+    if _FONT_CONFIGURED:
+        return
     try:
         # 主动加载系统中的 CJK 字体文件，避免 Matplotlib 未扫描到导致缺字
         candidate_files = []
@@ -72,6 +92,7 @@ def _set_chinese_font():
         matplotlib.rcParams['font.sans-serif'] = fonts
         matplotlib.rcParams['font.family'] = 'sans-serif'
         matplotlib.rcParams['axes.unicode_minus'] = False
+        _FONT_CONFIGURED = True
     except Exception:
         matplotlib.rcParams['font.sans-serif'] = ['DejaVu Sans', 'Arial', 'Liberation Sans']
         matplotlib.rcParams['font.family'] = 'sans-serif'
@@ -82,24 +103,124 @@ def _new_fig_size_cm(width_cm: float = 15.0, height_cm: float = 8.0) -> Tuple[fl
     return (width_cm / 2.54, height_cm / 2.54)
 
 
+def _display_points(x, y) -> Tuple[np.ndarray, np.ndarray]:
+    """显示降采样：点数超过 PLOT_MAX_POINTS 时按下标均分为 PLOT_MAX_POINTS/2 个桶，每桶保留 y 最小、最大的两个点
+    （连同首尾点，保持原顺序），曲线包络与峰谷不丢失。仅用于绘制，拟合始终使用完整数据。"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    limit = settings.PLOT_MAX_POINTS
+    if limit <= 0 or n <= limit or len(x) != n:
+        return x, y
+    size = -(-n // max(1, limit // 2))
+    buckets = -(-n // size)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(buckets, size)
+    base = np.arange(buckets) * size
+    idx = np.unique(np.concatenate([
+        [0, n - 1], base + np.nanargmin(padded, axis=1), base + np.nanargmax(padded, axis=1),
+    ]))
+    return x[idx], y[idx]
+
+
 def _save_fig(user_id: int, experiment: str, filename_prefix: str) -> Tuple[str, str]:
     """保存当前 plt 图像到标准目录，返回 (文件绝对路径, 访问URL)。"""
     base_dir = os.path.join('data', 'plots', str(user_id), experiment)
     _ensure_dir(base_dir)
     fname = f"{filename_prefix}_{uuid.uuid4().hex[:8]}.png"
     fpath = os.path.join(base_dir, fname)
-    plt.savefig(fpath, dpi=300, bbox_inches='tight')
-    plt.close()
-    url = f"/static/plots/{user_id}/{experiment}/{fname}"
-    return fpath, url
+    try:
+        plt.savefig(fpath, dpi=300, bbox_inches='tight')
+    finally:
+        plt.close()
+    return _notify((fpath, f"/static/plots/{user_id}/{experiment}/{fname}"))
+
+
+# 每保存一张图后调用 hook((文件路径, URL))：由 worker 设置，用于逐张上报进度；
+# hook 抛出的异常（如任务已取消）会中止当前绘图函数，剩余的图不再绘制
+figure_hook: ContextVar[Optional[Callable[[Tuple[str, str]], None]]] = ContextVar('figure_hook', default=None)
+
+
+def _notify(item: Tuple[str, str]) -> Tuple[str, str]:
+    """上报一张已保存的图 (路径, URL) 并原样返回。"""
+    hook = figure_hook.get()
+    if hook is not None:
+        hook(item)
+    return item
+
+
+def _release_figures(func):
+    """绘图函数装饰器：plt.subplots 与 _save_fig 之间任一步骤抛出异常时，关闭本次调用新建的图像，
+    避免 pyplot 长期持有未保存的 Figure 导致进程内存持续增长。"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        before = set(plt.get_fignums())
+        try:
+            return func(*args, **kwargs)
+        except BaseException:
+            for num in set(plt.get_fignums()) - before:
+                plt.close(num)
+            raise
+    return wrapper
+
+
+def open_figure_count() -> int:
+    """当前进程中 pyplot 仍持有的图像数量（用于 worker 监控）。"""
+    return len(plt.get_fignums())
+
+
+# 各实验使用的图幅版式：(名称, subplots 参数)
+_WARMUP_LAYOUTS = [
+    ('fiber/frank-hertz/millikan/mechanics', dict(figsize=_new_fig_size_cm(), dpi=300)),
+    ('thermal/solar-cell/ultrasound', dict(figsize=_new_fig_size_cm(20, 12))),
+    # 光电器件按子图绘制，见 PANEL_INCHES
+    ('photo-devices', dict(figsize=(4.0, 4.0))),
+]
+
+
+def warmup() -> Dict[str, float]:
+    """预热绘图栈：解析中文字体，并按各实验版式渲染一张丢弃图像（仅写入内存，不落盘）。
+    触发字体缓存构建、CJK 字体加载与 Agg 初始化，避免首个用户请求承担冷启动开销。
+    返回各步骤耗时（秒）。
+    """
+    timings: Dict[str, float] = {}
+    t0 = time.perf_counter()
+    _set_chinese_font()
+    timings['fonts'] = time.perf_counter() - t0
+    x = np.linspace(0.0, 1.0, 8)
+    for name, kwargs in _WARMUP_LAYOUTS:
+        t0 = time.perf_counter()
+        fig, axes = plt.subplots(**kwargs)
+        try:
+            for ax in np.atleast_1d(axes).ravel():
+                ax.scatter(x, x, label='实验数据')
+                ax.plot(x, x, label='拟合直线 R²')
+                ax.set_title('预热 I-U 曲线（°C, Ω, μA）', fontweight='bold')
+                ax.set_xlabel('电压 V (V)'); ax.set_ylabel('电流 I (mA)')
+                ax.legend(fontsize=10); ax.grid(True, alpha=0.3)
+            fig.tight_layout()
+            fig.savefig(io.BytesIO(), format='png', dpi=300, bbox_inches='tight')
+        finally:
+            plt.close(fig)
+        timings[name] = time.perf_counter() - t0
+    return timings
+
+
+def bootstrap_uncertainty(experiment: str, payload, resamples: int, level: float) -> Dict[str, Dict[str, Optional[float]]]:
+    """导出常数的 bootstrap 置信区间（见 app.batch_analysis.bootstrap）。不绘图，但与绘图一样经 app.workers 在 worker 进程中执行，
+    长序列的重抽样计算不占用 API 进程。"""
+    from .batch_analysis import bootstrap
+    from .experiments import EXPERIMENTS
+    return bootstrap(EXPERIMENTS[experiment], payload, resamples, level)
 
 
 # -------------------------- 光纤传感与通讯 --------------------------
+@_release_figures
 def plot_fiber_iu(user_id: int, U: List[float], I: List[float]) -> Tuple[str, str]:
     _set_chinese_font()
     fig, ax = plt.subplots(figsize=_new_fig_size_cm(), dpi=300)
-    U_arr = np.array(U, dtype=float)
-    I_arr = np.array(I, dtype=float)
+    U_arr, I_arr = _display_points(U, I)
     ax.scatter(U_arr, I_arr, color='red', s=50, label='测量数据点', zorder=5)
     ax.plot(U_arr, I_arr, color='blue', linewidth=1.5, alpha=0.7, label='趋势线')
     ax.set_title('半导体激光器伏安特性（I-U）图', fontsize=14, fontweight='bold', pad=15)
@@ -112,11 +233,11 @@ def plot_fiber_iu(user_id: int, U: List[float], I: List[float]) -> Tuple[str, st
     return fpath, url
 
 
+@_release_figures
 def plot_fiber_pi(user_id: int, I: List[float], P: List[float]) -> Tuple[str, str]:
     _set_chinese_font()
     fig, ax = plt.subplots(figsize=_new_fig_size_cm(), dpi=300)
-    I_arr = np.array(I, dtype=float)
-    P_arr = np.array(P, dtype=float)
+    I_arr, P_arr = _display_points(I, P)
     ax.scatter(I_arr, P_arr, color='darkorange', s=50, label='测量数据点', zorder=5)
     ax.plot(I_arr, P_arr, color='green', linewidth=1.5, alpha=0.7, label='趋势线')
     ax.set_title('半导体激光器输出特性（P-I）图', fontsize=14, fontweight='bold', pad=15)
@@ -129,19 +250,14 @@ def plot_fiber_pi(user_id: int, I: List[float], P: List[float]) -> Tuple[str, st
     return fpath, url
 
 
+@_release_figures
 def plot_photodiode_iv(user_id: int, V: List[float], I0: List[float], I1: List[float], I2: List[float]) -> Tuple[str, str]:
     _set_chinese_font()
     fig, ax = plt.subplots(figsize=_new_fig_size_cm(), dpi=300)
-    V_arr = np.array(V, dtype=float)
-    I0_arr = np.array(I0, dtype=float)
-    I1_arr = np.array(I1, dtype=float)
-    I2_arr = np.array(I2, dtype=float)
-    ax.scatter(V_arr, I0_arr, color='black', s=50, label='P=0 mW', zorder=5)
-    ax.plot(V_arr, I0_arr, color='black', linewidth=1.5, alpha=0.7)
-    ax.scatter(V_arr, I1_arr, color='blue', s=50, label='P=0.100 mW', zorder=5)
-    ax.plot(V_arr, I1_arr, color='blue', linewidth=1.5, alpha=0.7)
-    ax.scatter(V_arr, I2_arr, color='red', s=50, label='P=0.200 mW', zorder=5)
-    ax.plot(V_arr, I2_arr, color='red', linewidth=1.5, alpha=0.7)
+    for I_n, color, label in [(I0, 'black', 'P=0 mW'), (I1, 'blue', 'P=0.100 mW'), (I2, 'red', 'P=0.200 mW')]:
+        V_arr, I_arr = _display_points(V, I_n)
+        ax.scatter(V_arr, I_arr, color=color, s=50, label=label, zorder=5)
+        ax.plot(V_arr, I_arr, color=color, linewidth=1.5, alpha=0.7)
     ax.set_title('光电二极管伏安特性图', fontsize=14, fontweight='bold', pad=15)
     ax.set_xlabel('反向偏置电压 V (V)', fontsize=12)
     ax.set_ylabel('光电流 I (μA)', fontsize=12)
@@ -154,13 +270,11 @@ def plot_photodiode_iv(user_id: int, V: List[float], I0: List[float], I1: List[f
 
 # -------------------------- 弗兰克-赫兹 --------------------------
 def _r2_score(y_true: np.ndarray, y_pred: np.ndarray) -> float:
-    ss_res = np.sum((y_true - y_pred) ** 2)
-    ss_tot = np.sum((y_true - np.mean(y_true)) ** 2)
-    return float(1.0 - (ss_res / ss_tot)) if ss_tot > 0 else 0.0
+    return float(analysis.r2_score(y_true, y_pred))
 
 
 def _polyfit_smooth(x: np.ndarray, y: np.ndarray, deg: int = 5) -> Tuple[np.ndarray, np.ndarray]:
-    """保留旧方法（未使用），避免破坏已有导入；实际绘图改用 CubicSpline。"""
+    """保留旧方法（未使用），避免破坏已有导入；实际绘图改用三次样条。"""
     deg = max(1, min(deg, max(1, len(x) // 3)))
     coefs = np.polyfit(x, y, deg=deg)
     poly = np.poly1d(coefs)
@@ -170,44 +284,69 @@ def _polyfit_smooth(x: np.ndarray, y: np.ndarray, deg: int = 5) -> Tuple[np.ndar
     return x_fit, y_fit, y_pred_orig
 
 
-def plot_frank_hertz(user_id: int, VG2K: List[float], groups: List[Tuple[List[float], str]]) -> List[Tuple[str, str]]:
+@_release_figures
+def plot_frank_hertz_group(user_id: int, VG2K: List[float], currents: List[float], label: str, idx: int) -> Tuple[str, str]:
+    """弗兰克-赫兹第 idx 组数据的 I-VG2K 曲线（单张图）。"""
     _set_chinese_font()
-    results: List[Tuple[str, str]] = []
     x = np.array(VG2K, dtype=float)
-    for idx, (current_list, label) in enumerate(groups, start=1):
-        y = np.array(current_list, dtype=float)
-        fig, ax = plt.subplots(figsize=_new_fig_size_cm(), dpi=300)
-        ax.scatter(x, y, color='#1f77b4', s=30, alpha=0.7, label='实验数据')
-        # 三次样条拟合（与示例一致）
-        spline = CubicSpline(x, y)
-        x_fit = np.linspace(float(np.min(x)), float(np.max(x)), 200)
-        y_fit = spline(x_fit)
-        # 用原始点的拟合值计算 R²
-        y_pred_orig = spline(x)
-        r2 = _r2_score(y, y_pred_orig)
-        ax.plot(x_fit, y_fit, color='#ff7f0e', linewidth=2, label=f'三次样条拟合\nR²={r2:.4f}')
-        ax.set_title(f'第{idx}组参数 {label}\n弗兰克-赫兹实验 I-VG2K 曲线', fontsize=14, pad=15)
-        ax.set_xlabel('加速电压 VG2K (V)', fontsize=12)
-        ax.set_ylabel('板极电流 I (μA)', fontsize=12)
-        ax.legend(loc='center left', fontsize=10, framealpha=0.9, bbox_to_anchor=(0.02, 0.5))
-        ax.grid(True, color='#e0e0e0', linestyle='--', linewidth=0.5, alpha=0.7)
-        plt.tight_layout()
-        fpath, url = _save_fig(user_id, 'frank-hertz', f'frank_group{idx}')
-        results.append((fpath, url))
-    return results
+    y = np.array(currents, dtype=float)
+    fig, ax = plt.subplots(figsize=_new_fig_size_cm(), dpi=300)
+    ax.scatter(*_display_points(x, y), color='#1f77b4', s=30, alpha=0.7, label='实验数据')
+    # 三次样条拟合（与示例一致）
+    spline = analysis.cubic_spline(x, y)
+    x_fit = np.linspace(float(np.min(x)), float(np.max(x)), max(200, min(len(x), settings.PLOT_MAX_POINTS or len(x))))
+    y_fit = spline(x_fit)
+    # 用原始点的拟合值计算 R²
+    y_pred_orig = spline(x)
+    r2 = _r2_score(y, y_pred_orig)
+    ax.plot(x_fit, y_fit, color='#ff7f0e', linewidth=2, label=f'三次样条拟合\nR²={r2:.4f}')
+    # 峰谷与激发电位（与 /api/plots/frank-hertz/data 的结果一致）
+    result = analysis.frank_hertz_extrema(x, y)[0]
+    for points, marker, color, name in ((result['peaks'], 'v', '#d62728', '峰'), (result['valleys'], '^', '#2ca02c', '谷')):
+        if points:
+            px = [p['x'] for p in points]
+            py = [p['y'] for p in points]
+            ax.scatter(px, py, marker=marker, color=color, s=60, zorder=5, label=name)
+            for vx, vy in zip(px, py):
+                ax.annotate(f'{vx:.1f}', (vx, vy), textcoords='offset points', xytext=(0, 8 if name == '峰' else -14),
+                            ha='center', fontsize=8, color=color)
+    energy, energy_se = result['excitation_energy'], result['excitation_energy_se']
+    summary = None
+    if np.isfinite(energy):
+        summary = f'第一激发电位 ≈ {energy:.2f} V' + (f' ± {energy_se:.2f} V' if np.isfinite(energy_se) else '')
+        if result['peak_spacings']:
+            summary += '\n峰间距: ' + ', '.join(f'{d:.2f}' for d in result['peak_spacings'])
+    ax.set_title(f'第{idx}组参数 {label}\n弗兰克-赫兹实验 I-VG2K 曲线', fontsize=14, pad=15)
+    ax.set_xlabel('加速电压 VG2K (V)', fontsize=12)
+    ax.set_ylabel('板极电流 I (μA)', fontsize=12)
+    # 激发电位作为图例标题放在左上，并在数据上方留出空间，避免遮挡曲线
+    y_lo, y_hi = ax.get_ylim()
+    ax.set_ylim(y_lo, y_hi + 0.5 * (y_hi - y_lo))
+    ax.legend(loc='upper left', ncol=2, fontsize=8, framealpha=0.9, title=summary, title_fontsize=8)
+    ax.grid(True, color='#e0e0e0', linestyle='--', linewidth=0.5, alpha=0.7)
+    plt.tight_layout()
+    return _save_fig(user_id, 'frank-hertz', f'frank_group{idx}')
+
+
+def plot_frank_hertz(user_id: int, VG2K: List[float], groups: List[Tuple[List[float], str]]) -> List[Tuple[str, str]]:
+    return [plot_frank_hertz_group(user_id, VG2K, currents, label, idx) for idx, (currents, label) in enumerate(groups, start=1)]
 
 
 # -------------------------- 密里根油滴 --------------------------
-def plot_millikan(user_id: int, ni: List[float], qi: List[float]) -> Tuple[str, str]:
+@_release_figures
+def plot_millikan(user_id: int, ni: Optional[List[float]], qi: List[float],
+                  e_min: Optional[float] = None, e_max: Optional[float] = None) -> Tuple[str, str]:
     _set_chinese_font()
-    x = np.array(ni, dtype=float)
     y = np.array(qi, dtype=float)
+    inferred = ni is None
+    if inferred:
+        # 未提供 ni：网格搜索使 qi/e 最接近整数的 e，取 ni = round(qi/e)
+        _, x, rms = analysis.charge_quantum(y, e_min=e_min, e_max=e_max)
+    else:
+        x = np.array(ni, dtype=float)
     # 线性拟合（强制过原点）：最小二乘 k = sum(x*y)/sum(x^2)
-    denom = float(np.sum(x * x))
-    k = float(np.sum(x * y) / denom) if denom > 0 else 0.0
-    # R^2
-    y_pred = k * x
-    r2 = _r2_score(y, y_pred)
+    fit = analysis.proportional_fit(x, y)
+    k, r2 = float(fit.slope), float(fit.r2)
 
     fig, ax = plt.subplots(figsize=_new_fig_size_cm(), dpi=300)
     ax.scatter(x, y, color='darkred', s=60, marker='o', edgecolor='black', label='实验数据点')
@@ -222,6 +361,8 @@ def plot_millikan(user_id: int, ni: List[float], qi: List[float]) -> Tuple[str,
         f'R^2 = {r2:.4f}\n'
         '理论参考值 e理论 = 1.6022 x10^-19 C'
     )
+    if inferred:
+        text_str += f'\nni 由 qi 自动推断（qi/e 偏离整数均方根 {float(rms):.3f}）'
     ax.text(0.02, 0.98, text_str, transform=ax.transAxes, fontsize=11,
             verticalalignment='top', bbox=dict(boxstyle='round', facecolor='lightgray', alpha=0.85))
     ax.grid(True, linestyle='--', alpha=0.6, color='gray')
@@ -232,6 +373,7 @@ def plot_millikan(user_id: int, ni: List[float], qi: List[float]) -> Tuple[str,
 
 
 # -------------------------- 力学实验 --------------------------
+@_release_figures
 def plot_mech_t2_m(user_id: int, m0_g: float, weights_g: List[float], T10_avg_s: List[float]) -> Tuple[str, str, float]:
     _set_chinese_font()
     m0_g = float(m0_g)
@@ -240,11 +382,10 @@ def plot_mech_t2_m(user_id: int, m0_g: float, weights_g: List[float], T10_avg_s:
     M_kg = (m0_g + w) / 1000.0
     T_s = T10 / 10.0
     T2 = T_s ** 2
-    coef = np.polyfit(M_kg, T2, deg=1)
-    k_fit, b_fit = float(coef[0]), float(coef[1])
-    T2_fit = np.poly1d(coef)(M_kg)
-    r2 = _r2_score(T2, T2_fit)
-    k = 4 * (np.pi ** 2) / k_fit if k_fit != 0 else 0.0
+    fit = analysis.linear_fit(M_kg, T2)
+    k_fit, b_fit, r2 = float(fit.slope), float(fit.intercept), float(fit.r2)
+    T2_fit = fit.predict(M_kg)
+    k = float(analysis.spring_constant(k_fit))
     fig, ax = plt.subplots(figsize=_new_fig_size_cm(), dpi=300)
     ax.scatter(M_kg, T2, color='blue', s=50, label='实验数据', zorder=5)
     ax.plot(M_kg, T2_fit, color='red', linewidth=2, label=f'线性拟合：T²={k_fit:.2f}M + {b_fit:.4f}', zorder=3)
@@ -261,19 +402,19 @@ def plot_mech_t2_m(user_id: int, m0_g: float, weights_g: List[float], T10_avg_s:
     return fpath, url, k
 
 
+@_release_figures
 def plot_mech_v2_x2(user_id: int, x_cm: List[float], v_avg_cms: List[float]) -> Tuple[str, str, float, float]:
     _set_chinese_font()
     x_cm = np.array(x_cm, dtype=float)
     v_avg = np.array(v_avg_cms, dtype=float)
     x2 = x_cm ** 2
     v2 = v_avg ** 2
-    coef = np.polyfit(x2, v2, deg=1)
-    k_v, b_v = float(coef[0]), float(coef[1])
-    v2_fit = np.poly1d(coef)(x2)
-    r2 = _r2_score(v2, v2_fit)
+    fit = analysis.linear_fit(x2, v2)
+    k_v, b_v, r2 = float(fit.slope), float(fit.intercept), float(fit.r2)
+    v2_fit = fit.predict(x2)
     # ω = sqrt(-k_v)；若 k_v 为正则无法计算，取 0 以避免 NaN
-    omega = np.sqrt(abs(-k_v)) if k_v < 0 else 0.0
-    T_calc = (2 * np.pi / omega) if omega > 0 else 0.0
+    omega = float(analysis.angular_frequency(k_v))
+    T_calc = float(analysis.period(omega))
     fig, ax = plt.subplots(figsize=_new_fig_size_cm(), dpi=300)
     ax.scatter(x2, v2, color='green', marker='^', s=50, label='实验数据', zorder=5)
     ax.plot(x2, v2_fit, color='orange', linewidth=2, label=f'线性拟合：v²={k_v:.4f}x² + {b_v:.2f}', zorder=3)
@@ -291,282 +432,400 @@ def plot_mech_v2_x2(user_id: int, x_cm: List[float], v_avg_cms: List[float]) ->
 
 
 # -------------------------- 新增：热学综合实验 --------------------------
-def plot_thermal(user_id: int, temperatures: List[float], pt100_resistance: List[float], ntc_resistance: List[float]) -> List[Tuple[str, str]]:
-    """根据前端传入数据绘制 Pt100 与 NTC 两张曲线图。"""
+def _plot_resistance_curve(user_id: int, temperatures: List[float], resistance: List[float], style: str, label: str, title: str, prefix: str,
+                           fits: Optional[List[Tuple[np.ndarray, np.ndarray, str, str]]] = None) -> Tuple[str, str]:
+    """电阻-温度曲线；fits 为叠加的拟合曲线 (温度, 电阻, 线型, 图例)。"""
     _set_chinese_font()
-    results: List[Tuple[str, str]] = []
-
-    # Pt100 电阻-温度
     plt.figure(figsize=_new_fig_size_cm(20, 12))
     t_arr = np.array(temperatures, dtype=float)
-    pt_arr = np.array(pt100_resistance, dtype=float)
-    plt.plot(t_arr, pt_arr, 'b-o', linewidth=2, markersize=6, label='Pt100电阻')
+    r_arr = np.array(resistance, dtype=float)
+    plt.plot(t_arr, r_arr, style, linewidth=2, markersize=6, label=label)
+    for t_fit, r_fit, fit_style, fit_label in fits or []:
+        plt.plot(t_fit, r_fit, fit_style, linewidth=1.5, label=fit_label)
     # 使用更通用的温度符号，避免部分环境下 "℃" 显示缺失
     plt.xlabel('温度 (°C)')
     plt.ylabel('电阻 (Ω)')
-    plt.title('Pt100金属电阻随温度变化曲线', fontweight='bold')
+    plt.title(title, fontweight='bold')
     plt.grid(True, alpha=0.3, linestyle='--')
     plt.legend(fontsize=10)
     plt.xticks(t_arr)
     plt.tight_layout()
-    results.append(_save_fig(user_id, 'thermal', 'Pt100_电阻温度变化'))
+    return _save_fig(user_id, 'thermal', prefix)
+
+
+@_release_figures
+def plot_thermal_pt100(user_id: int, temperatures: List[float], pt100_resistance: List[float]) -> Tuple[str, str]:
+    """Pt100 电阻-温度曲线，叠加 Callendar–Van Dusen 拟合（analysis.callendar_van_dusen）。"""
+    fits = []
+    fit = analysis.callendar_van_dusen(temperatures, pt100_resistance)
+    if np.isfinite(fit.r0):
+        t_fit = np.linspace(min(temperatures), max(temperatures), 200)
+        fits.append((t_fit, fit.resistance(t_fit), 'k--',
+                     f'CVD拟合: R0 = {fit.r0:.3f} Ω, A = {fit.a:.4e}, B = {fit.b:.3e} (R² = {fit.r2:.5f})'))
+    return _plot_resistance_curve(user_id, temperatures, pt100_resistance, 'b-o', 'Pt100电阻', 'Pt100金属电阻随温度变化曲线', 'Pt100_电阻温度变化', fits)
+
+
+@_release_figures
+def plot_thermal_ntc(user_id: int, temperatures: List[float], ntc_resistance: List[float]) -> Tuple[str, str]:
+    """NTC 电阻-温度曲线，叠加 Beta 与 Steinhart–Hart 拟合（analysis.ntc_beta / steinhart_hart）。"""
+    fits = []
+    t_fit = np.linspace(min(temperatures), max(temperatures), 200)
+    beta = analysis.ntc_beta(temperatures, ntc_resistance)
+    if np.isfinite(beta.beta):
+        fits.append((t_fit, beta.resistance(t_fit), 'k--',
+                     f'Beta拟合: B = {beta.beta:.0f} K, R25 = {beta.r25:.0f} Ω (R² = {beta.r2:.5f})'))
+    sh = analysis.steinhart_hart(temperatures, ntc_resistance)
+    positive = [r for r in ntc_resistance if r > 0]
+    if np.isfinite(sh.a) and positive:
+        # Steinhart–Hart 对电阻显式：在电阻范围内取点计算温度
+        r_fit = np.geomspace(min(positive), max(positive), 200)
+        fits.append((sh.temperature(r_fit), r_fit, 'g:',
+                     f'Steinhart–Hart: a = {sh.a:.4e}, b = {sh.b:.4e}, c = {sh.c:.3e} (最大偏差 {sh.max_error:.3f} K)'))
+    return _plot_resistance_curve(user_id, temperatures, ntc_resistance, 'r-s', 'NTC热敏电阻', 'NTC热敏电阻随温度变化曲线', 'NTC_电阻温度变化', fits)
 
-    # NTC 电阻-温度
-    plt.figure(figsize=_new_fig_size_cm(20, 12))
-    ntc_arr = np.array(ntc_resistance, dtype=float)
-    plt.plot(t_arr, ntc_arr, 'r-s', linewidth=2, markersize=6, label='NTC热敏电阻')
-    # 使用更通用的温度符号，避免部分环境下 "℃" 显示缺失
-    plt.xlabel('温度 (°C)')
-    plt.ylabel('电阻 (Ω)')
-    plt.title('NTC热敏电阻随温度变化曲线', fontweight='bold')
-    plt.grid(True, alpha=0.3, linestyle='--')
-    plt.legend(fontsize=10)
-    plt.xticks(t_arr)
-    plt.tight_layout()
-    results.append(_save_fig(user_id, 'thermal', 'NTC_电阻温度变化'))
 
-    return results
+def plot_thermal(user_id: int, temperatures: List[float], pt100_resistance: List[float], ntc_resistance: List[float]) -> List[Tuple[str, str]]:
+    """根据前端传入数据绘制 Pt100 与 NTC 两张曲线图。"""
+    return [
+        plot_thermal_pt100(user_id, temperatures, pt100_resistance),
+        plot_thermal_ntc(user_id, temperatures, ntc_resistance),
+    ]
 
 
 # -------------------------- 新增：光电器件性能 --------------------------
+# 十个子图按 app.figures.PHOTO_PANELS 拆分，每个子图单独绘制成 PANEL_INCHES 见方的图片：
+# 文件名含参数哈希（同一用户、同一子图、相同数据得到同一文件），已存在即直接复用；
+# 合并图由各子图图片按 2×5 拼接（像素直接拼接，不重新栅格化），修改一组数据只重绘对应的子图。
+PANEL_INCHES = 4.0
+PANEL_DPI = 300
+# 子图绘制方式变化时递增，使旧文件不再命中
+PANEL_VERSION = 1
+_PANEL_COLUMNS = 5
+
+# 普通子图：名称 -> (颜色, x 轴标签, y 轴标签, 标题)；LD P-I 单独绘制（含阈值拟合）
+_PHOTO_CURVES = {
+    'ld_iv': ('orange', '电压V (V)', '电流I (mA)', 'LD I-V特性曲线'),
+    'led_pi': ('blue', '电流I (mA)', '功率P (μW)', 'LED P-I特性曲线'),
+    'led_iv': ('purple', '电压V (V)', '电流I (mA)', 'LED I-V特性曲线'),
+    'pd_light': ('teal', '照度L (Lx)', '电流I (μA)', '光敏二极管光照特性曲线 (U=5V)'),
+    'pd_iv': ('brown', '电压V (V)', '电流I (μA)', '光敏二极管伏安特性曲线'),
+    'pd_spectrum': ('pink', '波长λ (nm)', '电流I (μA)', '光敏二极管光谱特性曲线 (30Lx)'),
+    'pt_light': ('darkgreen', '照度L (Lx)', '电流I (mA)', '光敏三极管光照特性曲线 (U=5V)'),
+    'pt_iv': ('darkblue', '电压V (V)', '电流I (mA)', '光敏三极管伏安特性曲线'),
+    'pt_spectrum': ('gray', '波长λ (nm)', '电流I (mA)', '光敏三极管光谱特性曲线 (30Lx)'),
+}
+
+
+def _draw_ld_pi(ax, ld_I, ld_P, ld_linear_start_idx: Optional[int]):
+    """LD P-I 特性（ld_linear_start_idx 为 None 时自动确定激射区，见 analysis.laser_threshold）。"""
+    ld_I = np.array(ld_I, dtype=float); ld_P = np.array(ld_P, dtype=float)
+    ax.scatter(ld_I, ld_P, color='red', label='实验数据')
+    start = None if ld_linear_start_idx is None else max(0, min(int(ld_linear_start_idx), max(0, len(ld_I)-1)))
+    th = analysis.laser_threshold(ld_I, ld_P, start=start)
+    if np.isfinite(th.i_th):
+        k, b, I_th = float(th.slope), float(th.intercept), float(th.i_th)
+        I_fit = np.linspace(I_th, float(np.max(ld_I)) + 1, 50)
+        P_fit = k * I_fit + b
+        se = f'±{th.i_th_se:.2f}' if np.isfinite(th.i_th_se) else ''
+        ax.plot(I_fit, P_fit, 'k--', label=f'线性拟合: P={k:.2f}I+{b:.2f}')
+        ax.axvline(x=I_th, color='green', linestyle=':', label=f'阈值电流={I_th:.2f}{se}mA')
+    ax.set_xlabel('电流I (mA)'); ax.set_ylabel('功率P (μW)'); ax.set_title('LD P-I特性曲线'); ax.legend(); ax.grid(True, alpha=0.3)
+
+
+def _draw_photo_panel(ax, name: str, *args):
+    if name == 'ld_pi':
+        _draw_ld_pi(ax, *args)
+        return
+    color, xlabel, ylabel, title = _PHOTO_CURVES[name]
+    x, y = (np.array(a, dtype=float) for a in args)
+    ax.scatter(x, y, color=color, label='实验数据')
+    ax.plot(x, y, color, alpha=0.6)
+    ax.set_xlabel(xlabel); ax.set_ylabel(ylabel); ax.set_title(title); ax.legend(); ax.grid(True, alpha=0.3)
+
+
+def _panel_key(user_id: int, name: str, args: tuple) -> str:
+    h = hashlib.sha256(f'{PANEL_VERSION}|{user_id}|{name}'.encode('utf-8'))
+    for a in args:
+        h.update(b'|none' if a is None else np.asarray(a, dtype=float).tobytes() + str(np.shape(a)).encode())
+    return h.hexdigest()[:16]
+
+
+def _photo_panel_file(user_id: int, name: str, args: tuple) -> Tuple[str, str]:
+    """返回子图图片 (路径, URL)；同参数的文件已存在时直接复用，否则绘制（先写临时文件再改名，并发绘制同一子图也安全）。"""
+    base_dir = os.path.join('data', 'plots', str(user_id), 'photo-devices')
+    fname = f"光电器件_{name}_{_panel_key(user_id, name, args)}.png"
+    fpath = os.path.join(base_dir, fname)
+    if not os.path.exists(fpath):
+        _ensure_dir(base_dir)
+        _set_chinese_font()
+        fig, ax = plt.subplots(figsize=(PANEL_INCHES, PANEL_INCHES))
+        try:
+            _draw_photo_panel(ax, name, *args)
+            fig.tight_layout()
+            tmp = f"{fpath}.{uuid.uuid4().hex[:8]}.tmp"
+            # 固定图幅、不裁边：所有子图像素尺寸相同，便于直接拼接
+            fig.savefig(tmp, format='png', dpi=PANEL_DPI)
+            os.replace(tmp, fpath)
+        finally:
+            plt.close(fig)
+    return fpath, f"/static/plots/{user_id}/photo-devices/{fname}"
+
+
+@_release_figures
+def plot_photo_panel(user_id: int, name: str, *args) -> Tuple[str, str]:
+    """光电器件的单个子图（name 见 app.figures.PHOTO_PANELS，args 为该子图用到的字段）。"""
+    return _notify(_photo_panel_file(user_id, name, args))
+
+
+def _title_strip(width: int, title: str) -> Image.Image:
+    """合并图顶部的标题条，宽度与子图拼接后相同。"""
+    font_prop = fm.FontProperties(family=matplotlib.rcParams.get('font.sans-serif')[0])
+    fig = plt.figure(figsize=(width / PANEL_DPI, 0.6))
+    try:
+        fig.text(0.5, 0.5, title, ha='center', va='center', fontsize=16, fontweight='bold', fontproperties=font_prop)
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', dpi=PANEL_DPI)
+    finally:
+        plt.close(fig)
+    buf.seek(0)
+    return Image.open(buf)
+
+
+@_release_figures
 def plot_photo_devices(
     user_id: int,
     led_I: List[float], led_V: List[float], led_P: List[float],
-    ld_I: List[float], ld_V: List[float], ld_P: List[float], ld_linear_start_idx: int,
+    ld_I: List[float], ld_V: List[float], ld_P: List[float], ld_linear_start_idx: Optional[int],
     pd_L: List[float], pd_I_L: List[float], pd_V: List[float], pd_I_V: List[float], pd_wl: List[float], pd_I_wl: List[float],
     pt_L: List[float], pt_I_L: List[float], pt_V: List[float], pt_I_V: List[float], pt_wl: List[float], pt_I_wl: List[float]
 ) -> Tuple[str, str]:
-    """生成 2x5 的十张子图合并图。包含 LD 阈值线性拟合。"""
+    """十个子图按 2x5 拼接的合并图。包含 LD 阈值线性拟合（ld_linear_start_idx 为 None 时自动确定激射区）。
+    各子图复用已生成的子图图片（见 _photo_panel_file），只有数据变化的子图重新绘制。"""
+    fields = dict(locals())
     _set_chinese_font()
-    # 强制中文字体
-    font_prop = fm.FontProperties(family=matplotlib.rcParams.get('font.sans-serif')[0])
-    fig, axes = plt.subplots(2, 5, figsize=(20, 8))
-    fig.suptitle('光电器件性能测试实验曲线', fontsize=16, fontweight='bold', fontproperties=font_prop)
-
-    led_I = np.array(led_I, dtype=float); led_V = np.array(led_V, dtype=float); led_P = np.array(led_P, dtype=float)
-    ld_I = np.array(ld_I, dtype=float); ld_V = np.array(ld_V, dtype=float); ld_P = np.array(ld_P, dtype=float)
-    pd_L = np.array(pd_L, dtype=float); pd_I_L = np.array(pd_I_L, dtype=float)
-    pd_V = np.array(pd_V, dtype=float); pd_I_V = np.array(pd_I_V, dtype=float)
-    pd_wl = np.array(pd_wl, dtype=float); pd_I_wl = np.array(pd_I_wl, dtype=float)
-    pt_L = np.array(pt_L, dtype=float); pt_I_L = np.array(pt_I_L, dtype=float)
-    pt_V = np.array(pt_V, dtype=float); pt_I_V = np.array(pt_I_V, dtype=float)
-    pt_wl = np.array(pt_wl, dtype=float); pt_I_wl = np.array(pt_I_wl, dtype=float)
-
-    # 子图1：LD P-I（含阈值线性拟合）
-    axes[0,0].scatter(ld_I, ld_P, color='red', label='实验数据')
-    start = max(0, min(int(ld_linear_start_idx), max(0, len(ld_I)-1)))
-    ld_I_linear = ld_I[start:]
-    ld_P_linear = ld_P[start:]
-    if len(ld_I_linear) >= 2:
-        k, b = np.polyfit(ld_I_linear, ld_P_linear, 1)
-        I_th = float(-b / k) if k != 0 else 0.0
-        I_fit = np.linspace(I_th, float(np.max(ld_I)) + 1, 50)
-        P_fit = k * I_fit + b
-        axes[0,0].plot(I_fit, P_fit, 'k--', label=f'线性拟合: P={k:.2f}I+{b:.2f}')
-        axes[0,0].axvline(x=I_th, color='green', linestyle=':', label=f'阈值电流={I_th:.2f}mA')
-    axes[0,0].set_xlabel('电流I (mA)'); axes[0,0].set_ylabel('功率P (μW)'); axes[0,0].set_title('LD P-I特性曲线'); axes[0,0].legend(); axes[0,0].grid(True, alpha=0.3)
-
-    # 子图2：LD I-V
-    axes[0,1].scatter(ld_V, ld_I, color='orange', label='实验数据')
-    axes[0,1].plot(ld_V, ld_I, 'orange', alpha=0.6)
-    axes[0,1].set_xlabel('电压V (V)'); axes[0,1].set_ylabel('电流I (mA)'); axes[0,1].set_title('LD I-V特性曲线'); axes[0,1].legend(); axes[0,1].grid(True, alpha=0.3)
-
-    # 子图3：LED P-I
-    axes[0,2].scatter(led_I, led_P, color='blue', label='实验数据')
-    axes[0,2].plot(led_I, led_P, 'blue', alpha=0.6)
-    axes[0,2].set_xlabel('电流I (mA)'); axes[0,2].set_ylabel('功率P (μW)'); axes[0,2].set_title('LED P-I特性曲线'); axes[0,2].legend(); axes[0,2].grid(True, alpha=0.3)
-
-    # 子图4：LED I-V
-    axes[0,3].scatter(led_V, led_I, color='purple', label='实验数据')
-    axes[0,3].plot(led_V, led_I, 'purple', alpha=0.6)
-    axes[0,3].set_xlabel('电压V (V)'); axes[0,3].set_ylabel('电流I (mA)'); axes[0,3].set_title('LED I-V特性曲线'); axes[0,3].legend(); axes[0,3].grid(True, alpha=0.3)
-
-    # 子图5：光敏二极管 L-I
-    axes[0,4].scatter(pd_L, pd_I_L, color='teal', label='实验数据')
-    axes[0,4].plot(pd_L, pd_I_L, 'teal', alpha=0.6)
-    axes[0,4].set_xlabel('照度L (Lx)'); axes[0,4].set_ylabel('电流I (μA)'); axes[0,4].set_title('光敏二极管光照特性曲线 (U=5V)'); axes[0,4].legend(); axes[0,4].grid(True, alpha=0.3)
-
-    # 子图6：光敏二极管 V-I
-    axes[1,0].scatter(pd_V, pd_I_V, color='brown', label='实验数据')
-    axes[1,0].plot(pd_V, pd_I_V, 'brown', alpha=0.6)
-    axes[1,0].set_xlabel('电压V (V)'); axes[1,0].set_ylabel('电流I (μA)'); axes[1,0].set_title('光敏二极管伏安特性曲线'); axes[1,0].legend(); axes[1,0].grid(True, alpha=0.3)
-
-    # 子图7：光敏二极管 光谱
-    axes[1,1].scatter(pd_wl, pd_I_wl, color='pink', label='实验数据')
-    axes[1,1].plot(pd_wl, pd_I_wl, 'pink', alpha=0.6)
-    axes[1,1].set_xlabel('波长λ (nm)'); axes[1,1].set_ylabel('电流I (μA)'); axes[1,1].set_title('光敏二极管光谱特性曲线 (30Lx)'); axes[1,1].legend(); axes[1,1].grid(True, alpha=0.3)
-
-    # 子图8：光敏三极管 L-I
-    axes[1,2].scatter(pt_L, pt_I_L, color='darkgreen', label='实验数据')
-    axes[1,2].plot(pt_L, pt_I_L, 'darkgreen', alpha=0.6)
-    axes[1,2].set_xlabel('照度L (Lx)'); axes[1,2].set_ylabel('电流I (mA)'); axes[1,2].set_title('光敏三极管光照特性曲线 (U=5V)'); axes[1,2].legend(); axes[1,2].grid(True, alpha=0.3)
-
-    # 子图9：光敏三极管 V-I
-    axes[1,3].scatter(pt_V, pt_I_V, color='darkblue', label='实验数据')
-    axes[1,3].plot(pt_V, pt_I_V, 'darkblue', alpha=0.6)
-    axes[1,3].set_xlabel('电压V (V)'); axes[1,3].set_ylabel('电流I (mA)'); axes[1,3].set_title('光敏三极管伏安特性曲线'); axes[1,3].legend(); axes[1,3].grid(True, alpha=0.3)
-
-    # 子图10：光敏三极管 光谱
-    axes[1,4].scatter(pt_wl, pt_I_wl, color='gray', label='实验数据')
-    axes[1,4].plot(pt_wl, pt_I_wl, 'gray', alpha=0.6)
-    axes[1,4].set_xlabel('波长λ (nm)'); axes[1,4].set_ylabel('电流I (mA)'); axes[1,4].set_title('光敏三极管光谱特性曲线 (30Lx)'); axes[1,4].legend(); axes[1,4].grid(True, alpha=0.3)
-
-    plt.tight_layout()
-    fpath, url = _save_fig(user_id, 'photo-devices', '光电器件性能曲线')
-    return fpath, url
+    tiles = [
+        Image.open(_photo_panel_file(user_id, name, tuple(fields[f] for f in names))[0])
+        for name, names in PHOTO_PANELS.items()
+    ]
+    w, h = tiles[0].size
+    rows = -(-len(tiles) // _PANEL_COLUMNS)
+    title = _title_strip(w * _PANEL_COLUMNS, '光电器件性能测试实验曲线')
+    sheet = Image.new('RGB', (w * _PANEL_COLUMNS, title.height + h * rows), 'white')
+    sheet.paste(title.convert('RGB'), (0, 0))
+    for idx, tile in enumerate(tiles):
+        sheet.paste(tile.convert('RGB'), ((idx % _PANEL_COLUMNS) * w, title.height + (idx // _PANEL_COLUMNS) * h))
+        tile.close()
+    base_dir = os.path.join('data', 'plots', str(user_id), 'photo-devices')
+    _ensure_dir(base_dir)
+    fname = f"光电器件性能曲线_{uuid.uuid4().hex[:8]}.png"
+    fpath = os.path.join(base_dir, fname)
+    sheet.save(fpath, format='PNG')
+    return _notify((fpath, f"/static/plots/{user_id}/photo-devices/{fname}"))
 
 
 # -------------------------- 新增：太阳能电池特性 --------------------------
-def plot_solar_cell(
-    user_id: int,
-    dark_voltage: List[float], dark_current: List[float],
-    light_voltage: List[float], light_current: List[float],
-    relative_intensity: List[float], light_power: List[float], short_circuit_current: List[float], open_circuit_voltage: List[float]
-) -> List[Tuple[str, str]]:
+def _plot_solar_curve(user_id: int, x: List[float], y: List[float], style: str, label: str,
+                     xlabel: str, ylabel: str, title: str, prefix: str) -> Tuple[str, str]:
     _set_chinese_font()
-    results: List[Tuple[str, str]] = []
+    plt.figure(figsize=_new_fig_size_cm(20, 12))
+    plt.plot(*_display_points(x, y), style, linewidth=2, markersize=6, label=label)
+    plt.xlabel(xlabel); plt.ylabel(ylabel); plt.title(title, fontweight='bold')
+    plt.grid(True, alpha=0.3); plt.legend(fontsize=10); plt.tight_layout()
+    return _save_fig(user_id, 'solar-cell', prefix)
+
 
-    # 图1：全暗伏安特性
+@_release_figures
+def plot_solar_dark_iv(user_id: int, dark_voltage: List[float], dark_current: List[float]) -> Tuple[str, str]:
+    """图1：全暗伏安特性，叠加单二极管模型拟合曲线（analysis.diode_fit）。"""
+    _set_chinese_font()
+    V = np.asarray(dark_voltage, dtype=float)
+    I = np.asarray(dark_current, dtype=float)
+    fit = analysis.diode_fit(V, I)
     plt.figure(figsize=_new_fig_size_cm(20, 12))
-    dv = np.array(dark_voltage, dtype=float)
-    dc = np.array(dark_current, dtype=float)
-    plt.plot(dv, dc, 'b-o', linewidth=2, markersize=6, label='全暗伏安特性')
+    plt.plot(*_display_points(V, I), 'b-o', linewidth=2, markersize=6, label='全暗伏安特性')
+    if np.isfinite(fit.a) and (I > 0).any():
+        # 模型对电流显式：在正电流范围内取点计算电压
+        i_fit = np.geomspace(I[I > 0].min(), I.max(), 200)
+        plt.plot(fit.voltage(i_fit), i_fit, 'k--', linewidth=1.5,
+                 label=f'单二极管拟合: I0 = {fit.i0:.3g} mA, n = {fit.n:.2f}, Rs = {fit.rs:.3g} Ω (R² = {fit.r2:.4f})')
     plt.xlabel('外加偏压 (V)'); plt.ylabel('电流 (mA)'); plt.title('全暗情况下太阳能电池在外加偏压时的伏安特性曲线', fontweight='bold')
     plt.grid(True, alpha=0.3); plt.legend(fontsize=10); plt.tight_layout()
-    results.append(_save_fig(user_id, 'solar-cell', '图1_全暗伏安'))
+    return _save_fig(user_id, 'solar-cell', '图1_全暗伏安')
+
 
-    # 图2：光照时输出伏安特性
+@_release_figures
+def plot_solar_light_iv(user_id: int, light_voltage: List[float], light_current: List[float]) -> Tuple[str, str]:
+    """图2：光照时输出伏安特性，标注最大功率点、填充因子与串联/并联电阻（analysis.iv_parameters）。"""
+    _set_chinese_font()
+    V = np.asarray(light_voltage, dtype=float)
+    I = np.asarray(light_current, dtype=float)
+    p = analysis.iv_parameters(V, I)
     plt.figure(figsize=_new_fig_size_cm(20, 12))
-    lv = np.array(light_voltage, dtype=float)
-    lc = np.array(light_current, dtype=float)
-    plt.plot(lv, lc, 'r-o', linewidth=2, markersize=6, label='光照伏安特性')
+    plt.plot(*_display_points(V, I), 'r-o', linewidth=2, markersize=6, label='光照伏安特性')
+    if np.isfinite(p.pmax):
+        plt.fill_between([0, p.vmp], 0, p.imp, color='orange', alpha=0.15)
+        plt.plot([p.vmp], [p.imp], 'k*', markersize=14,
+                 label=f'最大功率点: Pmax = {p.pmax:.3g} mW (Vmp = {p.vmp:.3g} V, Imp = {p.imp:.3g} mA)')
+        plt.plot([], [], ' ', label=f'Isc = {p.isc:.3g} mA, Voc = {p.voc:.3g} V, FF = {p.ff:.3f}')
+        plt.plot([], [], ' ', label=f'Rs = {p.rs:.3g} Ω, Rsh = {p.rsh:.3g} Ω')
+        plt.xlim(left=0); plt.ylim(bottom=0)
     plt.xlabel('输出电压 (V)'); plt.ylabel('输出电流 (mA)'); plt.title('太阳能电池在光照时的输出伏安特性曲线', fontweight='bold')
-    plt.grid(True, alpha=0.3); plt.legend(fontsize=10); plt.tight_layout()
-    results.append(_save_fig(user_id, 'solar-cell', '图2_光照伏安'))
+    plt.grid(True, alpha=0.3); plt.legend(fontsize=10, loc='lower left'); plt.tight_layout()
+    return _save_fig(user_id, 'solar-cell', '图2_光照伏安')
 
-    # 共有数据
-    ri = np.array(relative_intensity, dtype=float)
-    lp = np.array(light_power, dtype=float)
-    sci = np.array(short_circuit_current, dtype=float)
-    ocv = np.array(open_circuit_voltage, dtype=float)
 
-    # 图3：短路电流-相对光强
-    plt.figure(figsize=_new_fig_size_cm(20, 12))
-    plt.plot(ri, sci, 'g-o', linewidth=2, markersize=6, label='短路电流-相对光强')
-    plt.xlabel('相对光强'); plt.ylabel('短路电流 (mA)'); plt.title('太阳能电池短路电流与相对光强的关系曲线', fontweight='bold')
-    plt.grid(True, alpha=0.3); plt.legend(fontsize=10); plt.tight_layout()
-    results.append(_save_fig(user_id, 'solar-cell', '图3_短路电流相对光强'))
+@_release_figures
+def plot_solar_isc_intensity(user_id: int, relative_intensity: List[float], short_circuit_current: List[float]) -> Tuple[str, str]:
+    """图3：短路电流-相对光强。"""
+    return _plot_solar_curve(user_id, relative_intensity, short_circuit_current, 'g-o', '短路电流-相对光强',
+                             '相对光强', '短路电流 (mA)', '太阳能电池短路电流与相对光强的关系曲线', '图3_短路电流相对光强')
 
-    # 图4：开路电压-相对光强
-    plt.figure(figsize=_new_fig_size_cm(20, 12))
-    plt.plot(ri, ocv, 'm-o', linewidth=2, markersize=6, label='开路电压-相对光强')
-    plt.xlabel('相对光强'); plt.ylabel('开路电压 (V)'); plt.title('太阳能电池开路电压与相对光强的关系曲线', fontweight='bold')
-    plt.grid(True, alpha=0.3); plt.legend(fontsize=10); plt.tight_layout()
-    results.append(_save_fig(user_id, 'solar-cell', '图4_开路电压相对光强'))
-
-    # 图5：短路电流-光功率（线性拟合）
-    def linear_func(x, a, b):
-        return a * x + b
-    params_i, _ = optimize.curve_fit(linear_func, lp, sci)
-    a_i, b_i = float(params_i[0]), float(params_i[1])
-    fit_i = linear_func(lp, a_i, b_i)
+
+@_release_figures
+def plot_solar_voc_intensity(user_id: int, relative_intensity: List[float], open_circuit_voltage: List[float]) -> Tuple[str, str]:
+    """图4：开路电压-相对光强。"""
+    return _plot_solar_curve(user_id, relative_intensity, open_circuit_voltage, 'm-o', '开路电压-相对光强',
+                             '相对光强', '开路电压 (V)', '太阳能电池开路电压与相对光强的关系曲线', '图4_开路电压相对光强')
+
+
+@_release_figures
+def plot_solar_isc_power(user_id: int, light_power: List[float], short_circuit_current: List[float]) -> Tuple[str, str]:
+    """图5：短路电流-光功率（线性拟合）。"""
+    _set_chinese_font()
+    lp = np.array(light_power, dtype=float)
+    sci = np.array(short_circuit_current, dtype=float)
+    fit = analysis.linear_fit(lp, sci)
+    a_i, b_i = float(fit.slope), float(fit.intercept)
+    fit_i = fit.predict(lp)
     plt.figure(figsize=_new_fig_size_cm(20, 12))
-    plt.scatter(lp, sci, c='blue', s=60, label='实验数据')
-    plt.plot(lp, fit_i, 'r-', linewidth=2, label=f'拟合曲线: I = {a_i:.1f}P + {b_i:.2f}')
+    plt.scatter(*_display_points(lp, sci), c='blue', s=60, label='实验数据')
+    plt.plot(*_display_points(lp, fit_i), 'r-', linewidth=2, label=f'拟合曲线: I = {a_i:.1f}P + {b_i:.2f}')
     plt.xlabel('光功率 (mW)'); plt.ylabel('短路电流 (mA)'); plt.title('太阳能电池短路电流与光功率的关系曲线（含拟合）', fontweight='bold')
     plt.grid(True, alpha=0.3); plt.legend(fontsize=10); plt.tight_layout()
-    results.append(_save_fig(user_id, 'solar-cell', '图5_短路电流光功率'))
-
-    # 图6：开路电压-光功率（对数拟合）
-    def log_func(x, a, b):
-        return a * np.log(x) + b
-    params_v, _ = optimize.curve_fit(log_func, lp, ocv)
-    a_v, b_v = float(params_v[0]), float(params_v[1])
-    fit_v = log_func(lp, a_v, b_v)
+    return _save_fig(user_id, 'solar-cell', '图5_短路电流光功率')
+
+
+@_release_figures
+def plot_solar_voc_power(user_id: int, light_power: List[float], open_circuit_voltage: List[float]) -> Tuple[str, str]:
+    """图6：开路电压-光功率（对数拟合）。"""
+    _set_chinese_font()
+    lp = np.array(light_power, dtype=float)
+    ocv = np.array(open_circuit_voltage, dtype=float)
+    fit = analysis.log_fit(lp, ocv)
+    a_v, b_v = float(fit.slope), float(fit.intercept)
+    fit_v = a_v * np.log(lp) + b_v
     plt.figure(figsize=_new_fig_size_cm(20, 12))
-    plt.scatter(lp, ocv, c='green', s=60, label='实验数据')
-    plt.plot(lp, fit_v, 'orange', linewidth=2, label=f'拟合曲线: V = {a_v:.2f}ln(P) + {b_v:.2f}')
+    plt.scatter(*_display_points(lp, ocv), c='green', s=60, label='实验数据')
+    plt.plot(*_display_points(lp, fit_v), 'orange', linewidth=2, label=f'拟合曲线: V = {a_v:.2f}ln(P) + {b_v:.2f}')
     plt.xlabel('光功率 (mW)'); plt.ylabel('开路电压 (V)'); plt.title('太阳能电池开路电压与光功率的关系曲线（含拟合）', fontweight='bold')
     plt.grid(True, alpha=0.3); plt.legend(fontsize=10); plt.tight_layout()
-    results.append(_save_fig(user_id, 'solar-cell', '图6_开路电压光功率'))
-
-    return results
+    return _save_fig(user_id, 'solar-cell', '图6_开路电压光功率')
 
 
-# -------------------------- 新增：超声波实验（含自由落体/匀变速/牛顿第二定律） --------------------------
-def plot_ultrasound(
+def plot_solar_cell(
     user_id: int,
-    t_free_fall: List[float], v_free_fall_1: List[float], v_free_fall_2: Optional[List[float]], v_free_fall_3: Optional[List[float]], v_free_fall_4: Optional[List[float]],
-    t1: List[float], v1_1: List[float], v1_2: List[float], v1_3: List[float], v1_4: List[float],
-    t2: List[float], v2_1: List[float], v2_2: List[float], v2_3: List[float], v2_4: List[float],
-    t3: List[float], v3_1: List[float], v3_2: List[float], v3_3: List[float], v3_4: List[float],
-    m: List[float], a_measured: List[float]
+    dark_voltage: List[float], dark_current: List[float],
+    light_voltage: List[float], light_current: List[float],
+    relative_intensity: List[float], light_power: List[float], short_circuit_current: List[float], open_circuit_voltage: List[float]
 ) -> List[Tuple[str, str]]:
-    _set_chinese_font()
-    results: List[Tuple[str, str]] = []
+    return [
+        plot_solar_dark_iv(user_id, dark_voltage, dark_current),
+        plot_solar_light_iv(user_id, light_voltage, light_current),
+        plot_solar_isc_intensity(user_id, relative_intensity, short_circuit_current),
+        plot_solar_voc_intensity(user_id, relative_intensity, open_circuit_voltage),
+        plot_solar_isc_power(user_id, light_power, short_circuit_current),
+        plot_solar_voc_power(user_id, light_power, open_circuit_voltage),
+    ]
+
+
+# -------------------------- 新增：超声波实验（含自由落体/匀变速/牛顿第二定律） --------------------------
+def _linear_fit(x, y) -> Tuple[float, float, float]:
+    fit = analysis.linear_fit(x, y)
+    return float(fit.slope), float(fit.intercept), float(fit.r2)
 
-    def linear_fit(x, y):
-        slope, intercept, r_value, p_value, std_err = stats.linregress(x, y)
-        return float(slope), float(intercept), float(r_value**2)
 
-    # 自由落体：使用可用的 1..4 组速度的平均值
+@_release_figures
+def plot_ultrasound_free_fall(user_id: int, t_free_fall: List[float], v_free_fall_1: List[float], v_free_fall_2: Optional[List[float]],
+                              v_free_fall_3: Optional[List[float]], v_free_fall_4: Optional[List[float]]) -> Tuple[str, str]:
+    """自由落体：使用可用的 1..4 组速度的平均值拟合 g。"""
+    _set_chinese_font()
     t_free = np.array(t_free_fall, dtype=float)
     v_groups = [np.array(v_free_fall_1, dtype=float)]
     for vg in [v_free_fall_2, v_free_fall_3, v_free_fall_4]:
         if vg is not None and len(vg) == len(t_free):
             v_groups.append(np.array(vg, dtype=float))
     v_avg = np.mean(np.stack(v_groups, axis=0), axis=0) if v_groups else np.array([], dtype=float)
-    slope, intercept, r2 = linear_fit(t_free, v_avg)
+    slope, intercept, r2 = _linear_fit(t_free, v_avg)
     t_fit = np.linspace(float(np.min(t_free)), float(np.max(t_free)), 100)
     v_fit = slope * t_fit + intercept
     fig1, ax1 = plt.subplots(figsize=_new_fig_size_cm(20, 12))
     colors = ['blue','red','green','orange']
     for idx, vg in enumerate(v_groups):
-        ax1.scatter(t_free, vg, label=f'第{idx+1}组数据', s=60, alpha=0.7, color=colors[idx % len(colors)])
+        ax1.scatter(*_display_points(t_free, vg), label=f'第{idx+1}组数据', s=60, alpha=0.7, color=colors[idx % len(colors)])
     ax1.plot(t_fit, v_fit, 'k-', linewidth=2, label=f'拟合直线 (g={slope:.4f} m/s²)')
     ax1.set_xlabel('时间 t (s)'); ax1.set_ylabel('速度 v (m/s)'); ax1.set_title('自由落体运动速度-时间关系图', fontweight='bold')
     ax1.legend(fontsize=10, loc='lower right'); ax1.grid(True, alpha=0.3)
     ax1.text(0.05, 0.95, f'拟合方程: v = {slope:.4f}t + {intercept:.4f}\nR² = {r2:.6f}', transform=ax1.transAxes,
              fontsize=10, verticalalignment='top', bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
     plt.tight_layout()
-    results.append(_save_fig(user_id, 'ultrasound', '自由落体运动拟合图'))
-
-    # 匀变速第1组
-    def plot_uniform_group(t_arr, vs_arrs, group_idx: int):
-        fig, ax = plt.subplots(figsize=_new_fig_size_cm(20, 12))
-        colors = ['blue','red','green','orange']
-        for i, v_arr in enumerate(vs_arrs):
-            ax.scatter(t_arr, v_arr, label=f'第{i+1}次测量', s=50, alpha=0.7, color=colors[i % len(colors)])
-        v_avg = np.mean(np.stack(vs_arrs, axis=0), axis=0)
-        slope, intercept, r2 = linear_fit(t_arr, v_avg)
-        t_fit = np.linspace(float(np.min(t_arr)), float(np.max(t_arr)), 100)
-        v_fit = slope * t_fit + intercept
-        ax.plot(t_fit, v_fit, 'k-', linewidth=2, label=f'拟合直线 (a={slope:.4f} m/s²)')
-        ax.set_xlabel('时间 t (s)'); ax.set_ylabel('速度 v (m/s)'); ax.set_title(f'匀变速运动第{group_idx}组速度-时间关系图', fontweight='bold')
-        ax.legend(fontsize=10, loc='lower right'); ax.grid(True, alpha=0.3)
-        ax.text(0.05, 0.95, f'拟合方程: v = {slope:.4f}t + {intercept:.4f}\nR² = {r2:.6f}', transform=ax.transAxes,
-                fontsize=10, verticalalignment='top', bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
-        plt.tight_layout()
-        return _save_fig(user_id, 'ultrasound', f'匀变速第{group_idx}组拟合图')
-
-    results.append(plot_uniform_group(np.array(t1, dtype=float), [np.array(v1_1, dtype=float), np.array(v1_2, dtype=float), np.array(v1_3, dtype=float), np.array(v1_4, dtype=float)], 1))
-    results.append(plot_uniform_group(np.array(t2, dtype=float), [np.array(v2_1, dtype=float), np.array(v2_2, dtype=float), np.array(v2_3, dtype=float), np.array(v2_4, dtype=float)], 2))
-    results.append(plot_uniform_group(np.array(t3, dtype=float), [np.array(v3_1, dtype=float), np.array(v3_2, dtype=float), np.array(v3_3, dtype=float), np.array(v3_4, dtype=float)], 3))
-
-    # 牛顿第二定律验证图
+    return _save_fig(user_id, 'ultrasound', '自由落体运动拟合图')
+
+
+@_release_figures
+def plot_ultrasound_uniform(user_id: int, t: List[float], vs: List[List[float]], group_idx: int) -> Tuple[str, str]:
+    """匀变速第 group_idx 组：四次测量取平均后拟合加速度。"""
+    _set_chinese_font()
+    t_arr = np.array(t, dtype=float)
+    vs_arrs = [np.array(v, dtype=float) for v in vs]
+    fig, ax = plt.subplots(figsize=_new_fig_size_cm(20, 12))
+    colors = ['blue','red','green','orange']
+    for i, v_arr in enumerate(vs_arrs):
+        ax.scatter(*_display_points(t_arr, v_arr), label=f'第{i+1}次测量', s=50, alpha=0.7, color=colors[i % len(colors)])
+    v_avg = np.mean(np.stack(vs_arrs, axis=0), axis=0)
+    slope, intercept, r2 = _linear_fit(t_arr, v_avg)
+    t_fit = np.linspace(float(np.min(t_arr)), float(np.max(t_arr)), 100)
+    v_fit = slope * t_fit + intercept
+    ax.plot(t_fit, v_fit, 'k-', linewidth=2, label=f'拟合直线 (a={slope:.4f} m/s²)')
+    ax.set_xlabel('时间 t (s)'); ax.set_ylabel('速度 v (m/s)'); ax.set_title(f'匀变速运动第{group_idx}组速度-时间关系图', fontweight='bold')
+    ax.legend(fontsize=10, loc='lower right'); ax.grid(True, alpha=0.3)
+    ax.text(0.05, 0.95, f'拟合方程: v = {slope:.4f}t + {intercept:.4f}\nR² = {r2:.6f}', transform=ax.transAxes,
+            fontsize=10, verticalalignment='top', bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
+    plt.tight_layout()
+    return _save_fig(user_id, 'ultrasound', f'匀变速第{group_idx}组拟合图')
+
+
+@_release_figures
+def plot_ultrasound_newton(user_id: int, m: List[float], a_measured: List[float]) -> Tuple[str, str]:
+    """牛顿第二定律验证图（a - m 关系）。"""
+    _set_chinese_font()
     fig5, ax5 = plt.subplots(figsize=_new_fig_size_cm(20, 12))
     m_arr = np.array(m, dtype=float)
     a_arr = np.array(a_measured, dtype=float)
-    slope_g, intercept_g, r2_g = linear_fit(m_arr, a_arr)
+    slope_g, intercept_g, r2_g = _linear_fit(m_arr, a_arr)
     m_fit = np.linspace(float(np.min(m_arr)), float(np.max(m_arr)), 100)
     a_fit = slope_g * m_fit + intercept_g
-    ax5.scatter(m_arr, a_arr, s=100, color='red', alpha=0.8, label='实验数据点')
+    ax5.scatter(*_display_points(m_arr, a_arr), s=100, color='red', alpha=0.8, label='实验数据点')
     ax5.plot(m_fit, a_fit, 'b-', linewidth=2, label=f'拟合直线 (斜率={slope_g:.2f})')
     ax5.set_xlabel('砝码质量 m (kg)'); ax5.set_ylabel('加速度 a (m/s²)'); ax5.set_title('牛顿第二定律验证图 (a - m 关系)', fontweight='bold')
     ax5.legend(fontsize=10, loc='lower right'); ax5.grid(True, alpha=0.3)
     ax5.text(0.05, 0.95, f'拟合方程: a = {slope_g:.2f}m + {intercept_g:.4f}\nR² = {r2_g:.6f}\n理论斜率 g = 9.8 m/s²', transform=ax5.transAxes,
              fontsize=10, verticalalignment='top', bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
     plt.tight_layout()
-    results.append(_save_fig(user_id, 'ultrasound', '牛顿第二定律验证图'))
+    return _save_fig(user_id, 'ultrasound', '牛顿第二定律验证图')
 
-    return results
+
+def plot_ultrasound(
+    user_id: int,
+    t_free_fall: List[float], v_free_fall_1: List[float], v_free_fall_2: Optional[List[float]], v_free_fall_3: Optional[List[float]], v_free_fall_4: Optional[List[float]],
+    t1: List[float], v1_1: List[float], v1_2: List[float], v1_3: List[float], v1_4: List[float],
+    t2: List[float], v2_1: List[float], v2_2: List[float], v2_3: List[float], v2_4: List[float],
+    t3: List[float], v3_1: List[float], v3_2: List[float], v3_3: List[float], v3_4: List[float],
+    m: List[float], a_measured: List[float]
+) -> List[Tuple[str, str]]:
+    return [
+        plot_ultrasound_free_fall(user_id, t_free_fall, v_free_fall_1, v_free_fall_2, v_free_fall_3, v_free_fall_4),
+        plot_ultrasound_uniform(user_id, t1, [v1_1, v1_2, v1_3, v1_4], 1),
+        plot_ultrasound_uniform(user_id, t2, [v2_1, v2_2, v2_3, v2_4], 2),
+        plot_ultrasound_uniform(user_id, t3, [v3_1, v3_2, v3_3, v3_4], 3),
+        plot_ultrasound_newton(user_id, m, a_measured),
+    ]
@@ -0,0 +1,63 @@
+"""
+图级结果缓存：同一用户以相同参数再次绘制同一张图时，直接复用已生成的文件。
+
+每个绘图任务 (函数名, 参数) 只包含这张图用到的请求字段（见 app.figures，参数中含 user_id），
+缓存键即这组字段的哈希：学生修正某个测量值后重新提交，只有依赖该字段的图重绘，其余图命中缓存。
+命中时会确认文件仍然存在；按最近使用淘汰，条目数上限为 FIGURE_CACHE_SIZE（0 表示关闭）。
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class FigureCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def _encode(value: Any) -> Any:
+        # 数组参数（NumPy）按 dtype + 内容哈希，与请求使用 JSON 数组还是二进制编码无关
+        if hasattr(value, 'tobytes') and hasattr(value, 'dtype'):
+            return [str(value.dtype), hashlib.sha256(value.tobytes()).hexdigest()]
+        return str(value)
+
+    @staticmethod
+    def key(func_name: str, args: tuple) -> str:
+        raw = json.dumps([func_name, args], ensure_ascii=False, separators=(',', ':'), default=FigureCache._encode)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """返回缓存的绘图结果（首项为文件路径）；未命中或文件已删除时返回 None。"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None and os.path.exists(value[0]):
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return value
+            if value is not None:
+                del self._entries[key]
+            self._misses += 1
+            return None
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self._hits, "misses": self._misses}
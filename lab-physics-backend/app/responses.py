@@ -0,0 +1,22 @@
+"""
+绘图相关接口的 JSON 响应。
+
+绘图结果（PlotImagesResponse / TaskStatusResponse）在接口内构造，字段已满足模型约束；
+默认流程会先 model_dump 成 dict、按 response_model 再校验一遍、转成可 JSON 化对象，最后由 json.dumps 编码，
+images_data 中数 MB 的 base64 字符串会被复制多次。
+ModelJSONResponse 直接用 pydantic-core 的序列化器（Rust 实现）把模型一次编码为 bytes，跳过上述步骤。
+接口仍声明 response_model，OpenAPI 文档不变。
+"""
+
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+
+class ModelJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content)
+        return to_json(content)
@@ -0,0 +1,80 @@
+"""
+数据接口：POST /api/plots/<name>/data 与绘图接口使用相同的请求体，只返回计算结果（峰谷、激发电位等），不绘图、不占用绘图配额。
+
+各实验的结果与图中标注使用同一套计算（app.analysis），可直接用于前端表格或后续处理。
+本模块在首次使用时才导入（依赖 numpy），API 进程启动时不加载。
+"""
+
+import math
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from . import analysis, figures
+
+
+def _number(value) -> Optional[float]:
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def frank_hertz(payload) -> Dict[str, Any]:
+    """所有组一次插值并求峰谷（analysis.frank_hertz_extrema），返回每组的峰谷、间距与激发电位。"""
+    currents = np.stack([np.asarray(g.currents, dtype=float) for g in payload.groups])
+    groups = []
+    for g, r in zip(payload.groups, analysis.frank_hertz_extrema(figures.vg2k(payload), currents)):
+        groups.append(dict(
+            r, label=g.label,
+            excitation_energy=_number(r['excitation_energy']),
+            excitation_energy_se=_number(r['excitation_energy_se']),
+            excitation_energy_peaks=_number(r['excitation_energy_peaks']),
+            excitation_energy_valleys=_number(r['excitation_energy_valleys']),
+        ))
+    energies = [g['excitation_energy'] for g in groups if g['excitation_energy'] is not None]
+    return {'groups': groups, 'excitation_energy': sum(energies) / len(energies) if energies else None}
+
+
+def solar_cell(payload) -> Dict[str, Any]:
+    """光照曲线的最大功率点、填充因子与串联/并联电阻，全暗曲线的单二极管模型参数。"""
+    iv = analysis.iv_parameters(payload.light_voltage, payload.light_current)
+    diode = analysis.diode_fit(payload.dark_voltage, payload.dark_current)
+    result = {name: _number(getattr(iv, name)) for name in ('pmax', 'vmp', 'imp', 'isc', 'voc', 'rs', 'rsh')}
+    result['fill_factor'] = _number(iv.ff)
+    result.update({f'diode_{name}': _number(getattr(diode, name)) for name in ('i0', 'n', 'rs', 'r2')})
+    return result
+
+
+def thermal(payload) -> Dict[str, Any]:
+    """Pt100 的 Callendar–Van Dusen 系数，NTC 的 Beta 与 Steinhart–Hart 系数。"""
+    temps = figures.temperatures(payload)
+    cvd = analysis.callendar_van_dusen(temps, payload.pt100_resistance)
+    beta = analysis.ntc_beta(temps, payload.ntc_resistance)
+    sh = analysis.steinhart_hart(temps, payload.ntc_resistance)
+    return {
+        'cvd_R0': _number(cvd.r0), 'cvd_A': _number(cvd.a), 'cvd_B': _number(cvd.b),
+        'cvd_alpha': _number(cvd.alpha), 'cvd_r2': _number(cvd.r2),
+        'ntc_beta': _number(beta.beta), 'ntc_beta_se': _number(beta.beta_se),
+        'ntc_R25': _number(beta.r25), 'ntc_beta_r2': _number(beta.r2),
+        'sh_a': _number(sh.a), 'sh_b': _number(sh.b), 'sh_c': _number(sh.c), 'sh_max_error': _number(sh.max_error),
+    }
+
+
+def photo_devices(payload) -> Dict[str, Any]:
+    """LD 阈值电流及其标准误差、激射区直线（与绘图相同的分段方式）。"""
+    start = payload.ld_linear_start_idx
+    if start is not None:
+        start = max(0, min(start, max(0, len(payload.ld_I) - 1)))
+    th = analysis.laser_threshold(payload.ld_I, payload.ld_P, start=start)
+    return {
+        'I_th': _number(th.i_th), 'I_th_se': _number(th.i_th_se),
+        'ld_slope': _number(th.slope), 'ld_intercept': _number(th.intercept), 'ld_r2': _number(th.r2),
+        'ld_start_current': _number(th.start), 'ld_below': int(th.below), 'ld_auto': start is None,
+    }
+
+
+BUILDERS: Dict[str, Callable[[Any], Dict[str, Any]]] = {
+    'frank-hertz': frank_hertz,
+    'photo-devices': photo_devices,
+    'solar-cell': solar_cell,
+    'thermal': thermal,
+}
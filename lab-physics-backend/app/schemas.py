@@ -1,6 +1,8 @@
-from pydantic import BaseModel, Field
+import base64
+import binascii
+from pydantic import BaseModel, Field, PlainSerializer, PlainValidator, WithJsonSchema
 from datetime import datetime
-from typing import Optional, List, Literal
+from typing import Annotated, Any, Dict, Optional, List, Literal
 
 
 class UserOut(BaseModel):
@@ -28,149 +30,382 @@ class UsersOut(BaseModel):
 
 # -------------------------- 绘图接口 Schemas --------------------------
 
+# 数值数组：JSON 数组，或 {"dtype": "float32"|"float64", "data": "<小端字节的 base64>"}（数据记录仪导出的长序列）。
+# 二进制形式直接由 np.frombuffer 解码（不逐元素解析/校验）；两种形式都解码为一维 NumPy 数组，并整体校验为有限值。
+# numpy 在首次校验时才导入，API 进程启动时不加载（见 doc/README.md“启动耗时与按需导入”）。
+_ARRAY_DTYPES = {'float32': '<f4', 'float64': '<f8'}
+
+
+def _decode_float_array(value: Any):
+    import numpy as np
+    if isinstance(value, np.ndarray):
+        arr = value
+    elif isinstance(value, dict):
+        if value.get('dtype') not in _ARRAY_DTYPES:
+            raise ValueError("dtype 仅支持 float32 / float64")
+        dtype = np.dtype(_ARRAY_DTYPES[value['dtype']])
+        data = value.get('data')
+        if not isinstance(data, str):
+            raise ValueError("data 需为 base64 字符串")
+        try:
+            buf = base64.b64decode(data, validate=True)
+        except (binascii.Error, ValueError):
+            raise ValueError("data 不是有效的 base64")
+        if len(buf) % dtype.itemsize:
+            raise ValueError(f"data 字节数需为 {dtype.itemsize} 的整数倍")
+        arr = np.frombuffer(buf, dtype=dtype)
+    elif isinstance(value, (list, tuple)):
+        try:
+            arr = np.asarray(value, dtype=np.float64)
+        except (TypeError, ValueError):
+            raise ValueError("数组元素需为数值")
+    else:
+        raise ValueError("需为数值数组或 {dtype, data} 二进制数组")
+    if arr.ndim != 1:
+        raise ValueError("需为一维数组")
+    if arr.dtype.kind != 'f':
+        arr = arr.astype(np.float64)
+    if not np.isfinite(arr).all():
+        raise ValueError("数组中含有 NaN 或无穷大")
+    return arr
+
+
+def _encode_float_array(arr) -> Dict[str, str]:
+    # JSON 序列化（如任务去重键）统一输出二进制形式：与输入编码无关，且不随长度逐元素展开
+    dtype = 'float32' if arr.dtype.itemsize == 4 else 'float64'
+    return {'dtype': dtype, 'data': base64.b64encode(arr.astype(_ARRAY_DTYPES[dtype], copy=False).tobytes()).decode('ascii')}
+
+
+FloatArray = Annotated[
+    Any,
+    PlainValidator(_decode_float_array),
+    PlainSerializer(_encode_float_array, when_used='json'),
+    WithJsonSchema({
+        'anyOf': [
+            {'type': 'array', 'items': {'type': 'number'}},
+            {
+                'type': 'object',
+                'properties': {
+                    'dtype': {'type': 'string', 'enum': list(_ARRAY_DTYPES)},
+                    'data': {'type': 'string', 'description': '小端字节序的 base64'},
+                },
+                'required': ['dtype', 'data'],
+            },
+        ],
+    }),
+]
+
+
 # 光纤传感与通讯：根据 plot_type 选择不同的字段
 class FiberPlotRequest(BaseModel):
     plot_type: Literal['iu', 'pi', 'photodiode'] = Field(..., description="绘图类型：iu|pi|photodiode")
     # iu
-    U: Optional[List[float]] = Field(None, description="I-U 图：电压数组")
-    I: Optional[List[float]] = Field(None, description="I-U/P-I 图：电流数组 或 输出特性电流")
+    U: Optional[FloatArray] = Field(None, description="I-U 图：电压数组")
+    I: Optional[FloatArray] = Field(None, description="I-U/P-I 图：电流数组 或 输出特性电流")
     # pi
-    P: Optional[List[float]] = Field(None, description="P-I 图：光功率数组")
+    P: Optional[FloatArray] = Field(None, description="P-I 图：光功率数组")
     # photodiode
-    V: Optional[List[float]] = Field(None, description="光电二极管：反向偏置电压数组")
-    I0: Optional[List[float]] = Field(None, description="光电二极管：P=0 mW 光电流")
-    I1: Optional[List[float]] = Field(None, description="光电二极管：P=0.100 mW 光电流")
-    I2: Optional[List[float]] = Field(None, description="光电二极管：P=0.200 mW 光电流")
+    V: Optional[FloatArray] = Field(None, description="光电二极管：反向偏置电压数组")
+    I0: Optional[FloatArray] = Field(None, description="光电二极管：P=0 mW 光电流")
+    I1: Optional[FloatArray] = Field(None, description="光电二极管：P=0.100 mW 光电流")
+    I2: Optional[FloatArray] = Field(None, description="光电二极管：P=0.200 mW 光电流")
     # 是否返回 data URI（用于云托管下图片外网不可直接访问的场景）
     return_data_uri: Optional[bool] = Field(False, description="是否返回 data URI 以便前端直接显示")
 
 
 class FrankHertzGroup(BaseModel):
-    currents: List[float]
+    currents: FloatArray
     label: str
 
 
 class FrankHertzRequest(BaseModel):
     # 若未提供，则在接口层默认使用 1..82 的序列
-    VG2K: Optional[List[float]] = None
+    VG2K: Optional[FloatArray] = None
     groups: List[FrankHertzGroup]
     return_data_uri: Optional[bool] = Field(False, description="是否返回 data URI 以便前端直接显示")
+    uncertainty: Optional[bool] = Field(False, description="是否返回导出常数的 bootstrap 置信区间")
+
+
+class CurvePoint(BaseModel):
+    x: float
+    y: float
+
+
+class FrankHertzGroupResult(BaseModel):
+    label: str
+    # 过滤测量抖动后的峰、谷（样条导数的根），按电压递增
+    peaks: List[CurvePoint]
+    valleys: List[CurvePoint]
+    peak_spacings: List[float]
+    valley_spacings: List[float]
+    # 第一激发电位（V，即激发能 eV）：峰位对序号直线拟合的斜率，峰不足两个时改用谷；无法估计时为 null
+    excitation_energy: Optional[float] = None
+    excitation_energy_se: Optional[float] = None
+    excitation_energy_peaks: Optional[float] = None
+    excitation_energy_valleys: Optional[float] = None
+
+
+class FrankHertzDataResponse(BaseModel):
+    groups: List[FrankHertzGroupResult]
+    # 各组激发电位的平均值
+    excitation_energy: Optional[float] = None
+
+
+class SolarCellDataResponse(BaseModel):
+    # 光照伏安曲线（app.analysis.iv_parameters）：电流 mA、电压 V、功率 mW、电阻 Ω；
+    # 测量未到达 V=0 / I=0 时 isc、voc 为端点附近直线的外推值
+    pmax: Optional[float] = None
+    vmp: Optional[float] = None
+    imp: Optional[float] = None
+    isc: Optional[float] = None
+    voc: Optional[float] = None
+    fill_factor: Optional[float] = None
+    rs: Optional[float] = None
+    rsh: Optional[float] = None
+    # 全暗伏安曲线的单二极管模型 I = I0·(exp((V - I·Rs)/(n·kT/q)) - 1)（app.analysis.diode_fit）；
+    # n 为理想因子与串联片数之积，diode_r2 为电压的决定系数
+    diode_i0: Optional[float] = None
+    diode_n: Optional[float] = None
+    diode_rs: Optional[float] = None
+    diode_r2: Optional[float] = None
+
+
+class ThermalDataResponse(BaseModel):
+    # Pt100：Callendar–Van Dusen R = R0·(1 + A·t + B·t²)（t 为 °C，app.analysis.callendar_van_dusen）；cvd_alpha = A + 100·B
+    cvd_R0: Optional[float] = None
+    cvd_A: Optional[float] = None
+    cvd_B: Optional[float] = None
+    cvd_alpha: Optional[float] = None
+    cvd_r2: Optional[float] = None
+    # NTC：Beta 模型 R = R25·exp(beta·(1/T - 1/298.15))（T 为 K）；ntc_beta_r2 为 ln R 的决定系数
+    ntc_beta: Optional[float] = None
+    ntc_beta_se: Optional[float] = None
+    ntc_R25: Optional[float] = None
+    ntc_beta_r2: Optional[float] = None
+    # NTC：Steinhart–Hart 1/T = a + b·ln R + c·(ln R)³；sh_max_error 为拟合温度的最大偏差（K）
+    sh_a: Optional[float] = None
+    sh_b: Optional[float] = None
+    sh_c: Optional[float] = None
+    sh_max_error: Optional[float] = None
+
+
+class PhotoDevicesDataResponse(BaseModel):
+    # LD 阈值电流（mA）及其标准误差：激射区直线与 P=0 的交点（app.analysis.laser_threshold）
+    I_th: Optional[float] = None
+    I_th_se: Optional[float] = None
+    # 激射区直线 P = ld_slope·I + ld_intercept（μW/mA、μW）与决定系数
+    ld_slope: Optional[float] = None
+    ld_intercept: Optional[float] = None
+    ld_r2: Optional[float] = None
+    # 激射区第一个点的电流（mA）与阈值以下的点数；ld_auto 表示激射区由自动分段确定
+    ld_start_current: Optional[float] = None
+    ld_below: Optional[int] = None
+    ld_auto: bool
 
 
 class MillikanRequest(BaseModel):
-    ni: List[float]
-    qi: List[float]
+    # 不传 ni 时由 qi 自动推断倍数：在 [e_min, e_max] 内网格搜索使 qi/e 最接近整数的 e（见 app.analysis.charge_quantum）
+    ni: Optional[FloatArray] = Field(None, description="倍数估计 ni；不传则由 qi 自动推断")
+    qi: FloatArray = Field(..., description="油滴电荷量 (×10⁻¹⁹ C)")
+    e_min: Optional[float] = Field(None, gt=0, description="自动推断时元电荷的搜索下限 (×10⁻¹⁹ C)，默认 1.2")
+    e_max: Optional[float] = Field(None, gt=0, description="自动推断时元电荷的搜索上限 (×10⁻¹⁹ C)，默认 2.2")
     return_data_uri: Optional[bool] = Field(False, description="是否返回 data URI 以便前端直接显示")
+    uncertainty: Optional[bool] = Field(False, description="是否返回导出常数的 bootstrap 置信区间")
 
 
 class MechanicsT2M(BaseModel):
     m0_g: float
-    weights_g: List[float]
-    T10_avg_s: List[float]
+    weights_g: FloatArray
+    T10_avg_s: FloatArray
 
 
 class MechanicsV2X2(BaseModel):
-    x_cm: List[float]
-    v_avg_cms: List[float]
+    x_cm: FloatArray
+    v_avg_cms: FloatArray
 
 
 class MechanicsRequest(BaseModel):
     t2m: MechanicsT2M
     v2x2: MechanicsV2X2
     return_data_uri: Optional[bool] = Field(False, description="是否返回 data URI 以便前端直接显示")
+    uncertainty: Optional[bool] = Field(False, description="是否返回导出常数的 bootstrap 置信区间")
 
 
+class ConstantEstimate(BaseModel):
+    value: Optional[float] = None
+    # bootstrap 百分位置信区间（置信水平见 BOOTSTRAP_CONFIDENCE）与重抽样标准差
+    ci_low: Optional[float] = None
+    ci_high: Optional[float] = None
+    se: Optional[float] = None
+
 class PlotImagesResponse(BaseModel):
     images: List[str]
     images_data: Optional[List[str]] = None
     message: Optional[str] = None
+    # 仅请求体 uncertainty=true 时：导出常数 -> 估计值与置信区间
+    uncertainty: Optional[Dict[str, ConstantEstimate]] = None
 
 class TaskStartResponse(BaseModel):
     task_id: str
-    status: Literal['pending']
+    # 重复提交命中已有任务时返回该任务的当前状态
+    status: Literal['pending', 'completed']
+
+class BatchItemStatus(BaseModel):
+    experiment: str
+    status: Literal['pending','completed','failed','cancelled']
+    images: Optional[List[str]] = None
+    images_data: Optional[List[str]] = None
+    message: Optional[str] = None
+    progress: int = 0
+    total: int = 0
+    uncertainty: Optional[Dict[str, ConstantEstimate]] = None
 
 class TaskStatusResponse(BaseModel):
-    status: Literal['pending','completed','failed']
+    status: Literal['pending','completed','failed','cancelled']
+    # pending 时为已完成的图像（逐张追加），completed 时为全部图像
     images: Optional[List[str]] = None
     images_data: Optional[List[str]] = None
     message: Optional[str] = None
+    progress: int = Field(0, description="已生成的图像数量")
+    total: Optional[int] = Field(None, description="预计生成的图像数量")
+    # 单实验任务且请求体 uncertainty=true 时，完成后给出导出常数的置信区间
+    uncertainty: Optional[Dict[str, ConstantEstimate]] = None
+    # 仅批量任务：按提交顺序给出每个实验的状态与图像
+    items: Optional[List[BatchItemStatus]] = None
+
+ExperimentName = Literal['fiber', 'frank-hertz', 'millikan', 'mechanics', 'thermal', 'photo-devices', 'solar-cell', 'ultrasound']
+
+class BatchPlotItem(BaseModel):
+    experiment: ExperimentName
+    # 与对应实验单独提交时的请求体相同
+    payload: Dict[str, Any]
+
+class BatchPlotRequest(BaseModel):
+    items: List[BatchPlotItem] = Field(..., min_length=1, max_length=8, description="实验列表（1~8 项）")
+    return_data_uri: Optional[bool] = Field(False, description="是否返回 data URI 以便前端直接显示")
+
+class AnalysisRequest(BaseModel):
+    # 每项与对应实验单独提交时的请求体相同
+    datasets: List[Dict[str, Any]] = Field(..., min_length=1, max_length=2000, description="数据集列表（1~2000 项）")
+    labels: Optional[List[str]] = Field(None, description="各数据集的标识（如学号），与 datasets 一一对应")
+
+class AnalysisRow(BaseModel):
+    label: str
+    # 该数据集校验失败时的原因，此时 values 全为 null
+    error: Optional[str] = None
+    values: List[Optional[float]]
+
+class AnalysisResponse(BaseModel):
+    experiment: str
+    columns: List[str]
+    rows: List[AnalysisRow]
+
+class HistogramBucket(BaseModel):
+    lo: float
+    hi: float
+    count: int
+
+class QuantityStats(BaseModel):
+    count: int
+    mean: float
+    # 样本标准差，count < 2 时为 null
+    std: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    histogram: List[HistogramBucket]
+
+class ClassStatsResponse(BaseModel):
+    experiment: str
+    # 空串表示全部班级
+    cohort: str
+    quantities: Dict[str, QuantityStats]
 
 # -------------------------- 新增：四个实验的输入 Schemas --------------------------
 
 class ThermalRequest(BaseModel):
     # 温度允许不传，后端默认使用 55,60,65,70,75,80
-    temperatures: Optional[List[float]] = Field(None, description="温度数组（°C），不传则使用默认 [55,60,65,70,75,80]")
-    pt100_resistance: List[float] = Field(..., description="Pt100 电阻数组（Ω）")
-    ntc_resistance: List[float] = Field(..., description="NTC 热敏电阻数组（Ω）")
+    temperatures: Optional[FloatArray] = Field(None, description="温度数组（°C），不传则使用默认 [55,60,65,70,75,80]")
+    pt100_resistance: FloatArray = Field(..., description="Pt100 电阻数组（Ω）")
+    ntc_resistance: FloatArray = Field(..., description="NTC 热敏电阻数组（Ω）")
     return_data_uri: Optional[bool] = Field(False, description="是否返回 data URI 以便前端直接显示")
+    uncertainty: Optional[bool] = Field(False, description="是否返回导出常数的 bootstrap 置信区间")
+
+
+PhotoPanel = Literal['ld_pi', 'ld_iv', 'led_pi', 'led_iv', 'pd_light', 'pd_iv', 'pd_spectrum', 'pt_light', 'pt_iv', 'pt_spectrum']
 
 
 class PhotoDevicesRequest(BaseModel):
     # LED
-    led_I: List[float] = Field(..., description="LED 电流 (mA)")
-    led_V: List[float] = Field(..., description="LED 电压 (V)")
-    led_P: List[float] = Field(..., description="LED 光功率 (μW)")
+    led_I: FloatArray = Field(..., description="LED 电流 (mA)")
+    led_V: FloatArray = Field(..., description="LED 电压 (V)")
+    led_P: FloatArray = Field(..., description="LED 光功率 (μW)")
     # LD
-    ld_I: List[float] = Field(..., description="LD 电流 (mA)")
-    ld_V: List[float] = Field(..., description="LD 电压 (V)")
-    ld_P: List[float] = Field(..., description="LD 光功率 (μW)")
-    ld_linear_start_idx: Optional[int] = Field(4, description="LD P-I 线性拟合起始索引（默认4）")
+    ld_I: FloatArray = Field(..., description="LD 电流 (mA)")
+    ld_V: FloatArray = Field(..., description="LD 电压 (V)")
+    ld_P: FloatArray = Field(..., description="LD 光功率 (μW)")
+    # 不传时自动分段确定激射区（app.analysis.laser_threshold）；传入则从该下标起拟合激射区直线
+    ld_linear_start_idx: Optional[int] = Field(None, ge=0, description="LD P-I 线性拟合起始索引；不传则自动确定")
     # 光敏二极管
-    pd_L: List[float] = Field(..., description="照度 (Lx)")
-    pd_I_L: List[float] = Field(..., description="光敏二极管电流 (μA) - 光照特性")
-    pd_V: List[float] = Field(..., description="电压 (V) - 伏安特性")
-    pd_I_V: List[float] = Field(..., description="电流 (μA) - 伏安特性")
-    pd_wl: List[float] = Field(..., description="波长 (nm) - 光谱特性")
-    pd_I_wl: List[float] = Field(..., description="电流 (μA) - 光谱特性")
+    pd_L: FloatArray = Field(..., description="照度 (Lx)")
+    pd_I_L: FloatArray = Field(..., description="光敏二极管电流 (μA) - 光照特性")
+    pd_V: FloatArray = Field(..., description="电压 (V) - 伏安特性")
+    pd_I_V: FloatArray = Field(..., description="电流 (μA) - 伏安特性")
+    pd_wl: FloatArray = Field(..., description="波长 (nm) - 光谱特性")
+    pd_I_wl: FloatArray = Field(..., description="电流 (μA) - 光谱特性")
     # 光敏三极管
-    pt_L: List[float] = Field(..., description="照度 (Lx)")
-    pt_I_L: List[float] = Field(..., description="电流 (mA) - 光照特性")
-    pt_V: List[float] = Field(..., description="电压 (V) - 伏安特性")
-    pt_I_V: List[float] = Field(..., description="电流 (mA) - 伏安特性")
-    pt_wl: List[float] = Field(..., description="波长 (nm) - 光谱特性")
-    pt_I_wl: List[float] = Field(..., description="电流 (mA) - 光谱特性")
+    pt_L: FloatArray = Field(..., description="照度 (Lx)")
+    pt_I_L: FloatArray = Field(..., description="电流 (mA) - 光照特性")
+    pt_V: FloatArray = Field(..., description="电压 (V) - 伏安特性")
+    pt_I_V: FloatArray = Field(..., description="电流 (mA) - 伏安特性")
+    pt_wl: FloatArray = Field(..., description="波长 (nm) - 光谱特性")
+    pt_I_wl: FloatArray = Field(..., description="电流 (mA) - 光谱特性")
+    # 只返回选中的子图（每个子图一张图像，按给定顺序）；不传则返回十个子图的合并图。名称见 app.figures.PHOTO_PANELS
+    panels: Optional[List[PhotoPanel]] = Field(None, min_length=1, description="只绘制的子图；不传则返回合并图")
     return_data_uri: Optional[bool] = Field(False, description="是否返回 data URI 以便前端直接显示")
+    uncertainty: Optional[bool] = Field(False, description="是否返回导出常数的 bootstrap 置信区间")
 
 
 class SolarCellRequest(BaseModel):
     # 图1：全暗伏安特性
-    dark_voltage: List[float] = Field(..., description="外加偏压 (V)")
-    dark_current: List[float] = Field(..., description="电流 (mA)")
+    dark_voltage: FloatArray = Field(..., description="外加偏压 (V)")
+    dark_current: FloatArray = Field(..., description="电流 (mA)")
     # 图2：光照输出伏安特性
-    light_voltage: List[float] = Field(..., description="输出电压 (V)")
-    light_current: List[float] = Field(..., description="输出电流 (mA)")
+    light_voltage: FloatArray = Field(..., description="输出电压 (V)")
+    light_current: FloatArray = Field(..., description="输出电流 (mA)")
     # 图3/图4/图5/图6：光照特性
-    relative_intensity: List[float] = Field(..., description="相对光强")
-    light_power: List[float] = Field(..., description="光功率 (mW)")
-    short_circuit_current: List[float] = Field(..., description="短路电流 (mA)")
-    open_circuit_voltage: List[float] = Field(..., description="开路电压 (V)")
+    relative_intensity: FloatArray = Field(..., description="相对光强")
+    light_power: FloatArray = Field(..., description="光功率 (mW)")
+    short_circuit_current: FloatArray = Field(..., description="短路电流 (mA)")
+    open_circuit_voltage: FloatArray = Field(..., description="开路电压 (V)")
     return_data_uri: Optional[bool] = Field(False, description="是否返回 data URI 以便前端直接显示")
+    uncertainty: Optional[bool] = Field(False, description="是否返回导出常数的 bootstrap 置信区间")
 
 
 class UltrasoundRequest(BaseModel):
     # 自由落体（至少 1 组速度，最多 4 组）
-    t_free_fall: List[float] = Field(..., description="时间数组 (s)")
-    v_free_fall_1: List[float] = Field(..., description="第1组速度 (m/s)")
-    v_free_fall_2: Optional[List[float]] = Field(None, description="第2组速度 (m/s)")
-    v_free_fall_3: Optional[List[float]] = Field(None, description="第3组速度 (m/s)")
-    v_free_fall_4: Optional[List[float]] = Field(None, description="第4组速度 (m/s)")
+    t_free_fall: FloatArray = Field(..., description="时间数组 (s)")
+    v_free_fall_1: FloatArray = Field(..., description="第1组速度 (m/s)")
+    v_free_fall_2: Optional[FloatArray] = Field(None, description="第2组速度 (m/s)")
+    v_free_fall_3: Optional[FloatArray] = Field(None, description="第3组速度 (m/s)")
+    v_free_fall_4: Optional[FloatArray] = Field(None, description="第4组速度 (m/s)")
     # 匀变速运动（3组，每组 1..4 次测量）
-    t1: List[float] = Field(..., description="第1组时间 (s)")
-    v1_1: List[float] = Field(..., description="第1组第1次速度 (m/s)")
-    v1_2: List[float] = Field(..., description="第1组第2次速度 (m/s)")
-    v1_3: List[float] = Field(..., description="第1组第3次速度 (m/s)")
-    v1_4: List[float] = Field(..., description="第1组第4次速度 (m/s)")
-    t2: List[float] = Field(..., description="第2组时间 (s)")
-    v2_1: List[float] = Field(..., description="第2组第1次速度 (m/s)")
-    v2_2: List[float] = Field(..., description="第2组第2次速度 (m/s)")
-    v2_3: List[float] = Field(..., description="第2组第3次速度 (m/s)")
-    v2_4: List[float] = Field(..., description="第2组第4次速度 (m/s)")
-    t3: List[float] = Field(..., description="第3组时间 (s)")
-    v3_1: List[float] = Field(..., description="第3组第1次速度 (m/s)")
-    v3_2: List[float] = Field(..., description="第3组第2次速度 (m/s)")
-    v3_3: List[float] = Field(..., description="第3组第3次速度 (m/s)")
-    v3_4: List[float] = Field(..., description="第3组第4次速度 (m/s)")
+    t1: FloatArray = Field(..., description="第1组时间 (s)")
+    v1_1: FloatArray = Field(..., description="第1组第1次速度 (m/s)")
+    v1_2: FloatArray = Field(..., description="第1组第2次速度 (m/s)")
+    v1_3: FloatArray = Field(..., description="第1组第3次速度 (m/s)")
+    v1_4: FloatArray = Field(..., description="第1组第4次速度 (m/s)")
+    t2: FloatArray = Field(..., description="第2组时间 (s)")
+    v2_1: FloatArray = Field(..., description="第2组第1次速度 (m/s)")
+    v2_2: FloatArray = Field(..., description="第2组第2次速度 (m/s)")
+    v2_3: FloatArray = Field(..., description="第2组第3次速度 (m/s)")
+    v2_4: FloatArray = Field(..., description="第2组第4次速度 (m/s)")
+    t3: FloatArray = Field(..., description="第3组时间 (s)")
+    v3_1: FloatArray = Field(..., description="第3组第1次速度 (m/s)")
+    v3_2: FloatArray = Field(..., description="第3组第2次速度 (m/s)")
+    v3_3: FloatArray = Field(..., description="第3组第3次速度 (m/s)")
+    v3_4: FloatArray = Field(..., description="第3组第4次速度 (m/s)")
     # 牛顿第二定律验证
-    m: List[float] = Field(..., description="砝码质量 (kg)")
-    a_measured: List[float] = Field(..., description="测量加速度 (m/s²)")
+    m: FloatArray = Field(..., description="砝码质量 (kg)")
+    a_measured: FloatArray = Field(..., description="测量加速度 (m/s²)")
     return_data_uri: Optional[bool] = Field(False, description="是否返回 data URI 以便前端直接显示")
+    uncertainty: Optional[bool] = Field(False, description="是否返回导出常数的 bootstrap 置信区间")
@@ -1,13 +1,13 @@
 from typing import Dict, Optional, List, Tuple
+from concurrent.futures import CancelledError, wait
+import functools
+import hashlib
+import time
 import uuid
-from threading import Thread, Lock
-import base64
-from .plots import (
-    plot_fiber_iu, plot_fiber_pi, plot_photodiode_iv,
-    plot_frank_hertz, plot_millikan,
-    plot_mech_t2_m, plot_mech_v2_x2,
-    plot_thermal, plot_photo_devices, plot_solar_cell, plot_ultrasound,
-)
+from threading import Event, Thread, Lock
+from .config import settings
+from . import class_stats, figures, pipeline, workers
+from .experiments import Experiment
 
 class PlotTask:
     def __init__(self, user_id: int, experiment: str):
@@ -19,52 +19,197 @@ class PlotTask:
         self.images_data: Optional[List[str]] = None
         self.message: Optional[str] = None
         self.error: Optional[str] = None
+        self.key: Optional[str] = None
+        self.created_at = time.monotonic()
+        # 任务结束（完成/失败/取消）的时间，超过去重窗口后从 TASKS 中清除
+        self.finished_at: Optional[float] = None
+        # 预计生成的图像数量；figures 为已完成的图：图序 -> (URL, data URI, 文件路径)
+        self.total: Optional[int] = None
+        self.figures: Dict[int, Tuple[str, Optional[str], str]] = {}
+        self.parts: List['TaskPart'] = []
+        # 班级统计的班级（X-Cohort），见 app/class_stats.py
+        self.cohort: Optional[str] = None
+        self.cancel_event = Event()
 
 TASKS: Dict[str, PlotTask] = {}
+# 去重键 -> task_id
+TASK_KEYS: Dict[str, str] = {}
 _lock = Lock()
 
-def _save(task: PlotTask):
+def task_key(user_id: int, experiment: str, payload, idempotency_key: Optional[str] = None) -> str:
+    """任务去重键：优先使用客户端提供的 Idempotency-Key，否则取请求体规范化 JSON 的哈希。"""
+    raw = idempotency_key if idempotency_key else payload.model_dump_json()
+    source = 'key' if idempotency_key else 'body'
+    return hashlib.sha256(f"{user_id}:{experiment}:{source}:{raw}".encode('utf-8')).hexdigest()
+
+def _find_by_key_locked(user_id: int, key: str) -> Optional[PlotTask]:
+    t = TASKS.get(TASK_KEYS.get(key, ''))
+    if t is None or t.user_id != user_id:
+        return None
+    # 失败/已取消的任务不复用，允许重新提交；过期的键视为新的提交
+    if t.status in ('failed', 'cancelled') or time.monotonic() - t.created_at > settings.IDEMPOTENCY_WINDOW_SECONDS:
+        return None
+    return t
+
+def find_task_by_key(user_id: int, key: str) -> Optional[PlotTask]:
+    with _lock:
+        return _find_by_key_locked(user_id, key)
+
+def _evict_locked():
+    """清除结束超过去重窗口的任务及过期的去重键，TASKS/TASK_KEYS 不随提交次数无限增长。"""
+    now = time.monotonic()
+    window = settings.IDEMPOTENCY_WINDOW_SECONDS
+    for tid in [tid for tid, t in TASKS.items() if t.finished_at is not None and now - t.finished_at > window]:
+        del TASKS[tid]
+    for k in [k for k, tid in TASK_KEYS.items() if tid not in TASKS or now - TASKS[tid].created_at > window]:
+        del TASK_KEYS[k]
+
+def _register(user_id: int, experiment: str, key: Optional[str]) -> Tuple[PlotTask, bool]:
+    """创建并登记任务；同一去重键已有进行中/已完成任务时返回 (已有任务, False)。"""
     with _lock:
+        if key:
+            existing = _find_by_key_locked(user_id, key)
+            if existing is not None:
+                return existing, False
+        # 顺带清理已过期的任务和去重键
+        _evict_locked()
+        task = PlotTask(user_id, experiment)
+        task.key = key
         TASKS[task.task_id] = task
+        if key:
+            TASK_KEYS[key] = task.task_id
+        return task, True
+
+class TaskPart:
+    """任务中的一个实验，对应 task.figures 中图序 [offset, offset + count) 的图；批量任务包含多个。"""
+    def __init__(self, experiment: str, offset: int, count: int):
+        self.experiment = experiment
+        self.offset = offset
+        self.count = count
+        self.status = 'pending'
+        self.error: Optional[str] = None
+        # 导出常数的置信区间（请求体 uncertainty=true 且绘制成功时）
+        self.uncertainty: Optional[dict] = None
 
-def start_fiber_task(user_id: int, payload) -> str:
-    task = PlotTask(user_id, 'fiber')
-    _save(task)
+def _launch(task: PlotTask, ticket: workers.Ticket, items: List[Tuple[Experiment, object]], return_data_uri: bool) -> str:
+    """在后台线程中绘制 items = [(实验, 请求体), ...]，全部图同时提交、并行绘制（见 app.figures）。
+    每张图完成后立即登记；task.images 为按图序连续完成的部分，状态查询可先看到前面的图像；
+    某个实验失败只取消该实验剩余的图；task.cancel_event 置位后剩余的图不再绘制，任务以 cancelled 结束。
+    每个实验结束时写入绘图记录与耗时统计（见 app.pipeline），成功且有新绘制图像的实验计入班级统计（见 app.class_stats）。"""
+    jobs: List[figures.FigureJob] = []
+    try:
+        for exp, payload in items:
+            part_jobs = exp.jobs(task.user_id, payload)
+            task.parts.append(TaskPart(exp.name, len(jobs), len(part_jobs)))
+            jobs.extend(part_jobs)
+    except Exception as e:
+        # 尚未交给后台线程：标记失败（同一去重键可重新提交），配额由调用方释放
+        with _lock:
+            task.status, task.error, task.message = 'failed', str(e), '生成失败'
+            task.finished_at = time.monotonic()
+        raise
+    task.total = len(jobs)
+    started = time.perf_counter()
+    def on_figure(idx: int, item: Tuple[str, str]):
+        fpath, url = item
+        data = pipeline.data_uri(fpath) if return_data_uri else None
+        with _lock:
+            task.figures[idx] = (url, data, fpath)
+            _sync_images_locked(task)
+    def finish_part(part: TaskPart, payload):
+        with _lock:
+            done = [(task.figures[i][2], task.figures[i][0]) for i in range(part.offset, part.offset + part.count) if i in task.figures]
+        pipeline.observe(part.experiment, time.perf_counter() - started, len(done), part.status == 'completed')
+        pipeline.record(task.user_id, part.experiment, done, reused=ticket.reused)
+        if part.status == 'completed' and any(fpath not in ticket.reused for fpath, _ in done):
+            class_stats.observe(task.user_id, part.experiment, payload, task.cohort)
     def run():
+        futures = []
         try:
-            imgs: List[str] = []
-            imgs_data: List[str] = []
-            if payload.plot_type == 'iu':
-                fpath, url = plot_fiber_iu(user_id, payload.U, payload.I)
-                imgs.append(url)
-                if payload.return_data_uri:
-                    with open(fpath, 'rb') as f:
-                        imgs_data.append('data:image/png;base64,' + base64.b64encode(f.read()).decode('utf-8'))
-            elif payload.plot_type == 'pi':
-                fpath, url = plot_fiber_pi(user_id, payload.I, payload.P)
-                imgs.append(url)
-                if payload.return_data_uri:
-                    with open(fpath, 'rb') as f:
-                        imgs_data.append('data:image/png;base64,' + base64.b64encode(f.read()).decode('utf-8'))
-            elif payload.plot_type == 'photodiode':
-                fpath, url = plot_photodiode_iv(user_id, payload.V, payload.I0, payload.I1, payload.I2)
-                imgs.append(url)
-                if payload.return_data_uri:
-                    with open(fpath, 'rb') as f:
-                        imgs_data.append('data:image/png;base64,' + base64.b64encode(f.read()).decode('utf-8'))
-            task.images = imgs
-            task.images_data = imgs_data if imgs_data else None
-            task.status = 'completed'
-            task.message = '生成完成'
+            futures = [
+                ticket.submit(func_name, *args, on_figure=functools.partial(on_figure, idx), cancel=task.cancel_event)
+                for idx, (func_name, args) in enumerate(jobs)
+            ]
+            for part, (exp, payload) in zip(task.parts, items):
+                part_futures = futures[part.offset:part.offset + part.count]
+                try:
+                    for f in part_futures:
+                        f.result()
+                    # 在任务标记完成前算好，状态查询看到 completed 时即包含置信区间
+                    part.uncertainty = pipeline.uncertainty(exp, payload, ticket)
+                    part.status = 'completed'
+                except (workers.RenderCancelled, CancelledError):
+                    part.status = 'cancelled'
+                except Exception as e:
+                    part.status, part.error = 'failed', str(e)
+                    for f in part_futures:
+                        f.cancel()
+            # 等待仍在执行的图结束，之后不再有 on_figure 回调
+            wait(futures)
         except Exception as e:
-            task.status = 'failed'
-            task.error = str(e)
-            task.message = '生成失败'
+            for part in task.parts:
+                if part.status == 'pending':
+                    part.status, part.error = 'failed', str(e)
         finally:
-            _save(task)
+            with _lock:
+                failed = [p for p in task.parts if p.status == 'failed']
+                if task.cancel_event.is_set():
+                    # 已取消的任务保持 cancelled（取消请求已如实告知客户端）
+                    status = 'cancelled'
+                elif any(p.status == 'completed' for p in task.parts):
+                    status = 'completed'
+                else:
+                    status = 'failed'
+                task.status = status
+                task.error = failed[0].error if failed else None
+                # 结束后返回全部已完成的图像（按图序）
+                _sync_images_locked(task, contiguous=False)
+                if status == 'completed':
+                    task.message = items[0][0].completed_message(len(task.images)) if len(items) == 1 else f'共生成{len(task.images)}张图像'
+                    if failed:
+                        task.message += f'，{len(failed)}项生成失败'
+                elif status == 'cancelled':
+                    task.message = f'已取消，已生成{len(task.images)}张图像'
+                else:
+                    task.message = '生成失败'
+                task.finished_at = time.monotonic()
+            for part, (_, payload) in zip(task.parts, items):
+                finish_part(part, payload)
+            ticket.release()
+    ticket.handoff()
     Thread(target=run, daemon=True).start()
     return task.task_id
 
+def _completed_order(task: PlotTask, start: int, stop: int, contiguous: bool) -> List[int]:
+    order = [i for i in range(start, stop) if i in task.figures]
+    if contiguous:
+        order = [i for n, i in enumerate(order, start=start) if i == n]
+    return order
+
+def _sync_images_locked(task: PlotTask, contiguous: bool = True):
+    """由 task.figures 重建 images/images_data；contiguous 时只取从第 1 张起连续完成的部分，保证前端可按序追加。"""
+    order = _completed_order(task, 0, task.total or 0, contiguous)
+    task.images = [task.figures[i][0] for i in order]
+    data = [task.figures[i][1] for i in order if task.figures[i][1] is not None]
+    task.images_data = data or None
+
+def part_images(task: PlotTask, part: TaskPart) -> Tuple[List[str], Optional[List[str]], int]:
+    """批量任务中某个实验的 (图像 URL, data URI, 已完成数)；进行中时只返回连续完成的部分。"""
+    with _lock:
+        done = [i for i in range(part.offset, part.offset + part.count) if i in task.figures]
+        order = _completed_order(task, part.offset, part.offset + part.count, part.status == 'pending')
+        data = [task.figures[i][1] for i in order if task.figures[i][1] is not None]
+        return [task.figures[i][0] for i in order], data or None, len(done)
+
+def cancel_task(task: PlotTask) -> PlotTask:
+    """协作式取消：正在绘制的图完成后停止，尚未开始的图不再绘制；已结束的任务不受影响。"""
+    with _lock:
+        if task.status == 'pending':
+            task.cancel_event.set()
+            task.status = 'cancelled'
+            task.message = f'已取消，已生成{len(task.images)}张图像'
+    return task
+
 def get_task_for_user(task_id: str, user_id: int) -> Optional[PlotTask]:
     with _lock:
         t = TASKS.get(task_id)
@@ -74,195 +219,22 @@ def get_task_for_user(task_id: str, user_id: int) -> Optional[PlotTask]:
             return None
         return t
 
-def start_frank_hertz_task(user_id: int, payload) -> str:
-    task = PlotTask(user_id, 'frank-hertz')
-    _save(task)
-    def run():
-        try:
-            results = plot_frank_hertz(user_id, payload.VG2K if payload.VG2K else [float(i) for i in range(1, 83)], [(g.currents, g.label) for g in payload.groups])
-            imgs = [u for _, u in results]
-            imgs_data: List[str] = []
-            if payload.return_data_uri:
-                for fp, _ in results:
-                    with open(fp, 'rb') as f:
-                        imgs_data.append('data:image/png;base64,' + base64.b64encode(f.read()).decode('utf-8'))
-            task.images = imgs
-            task.images_data = imgs_data if imgs_data else None
-            task.status = 'completed'
-            task.message = f'共生成{len(imgs)}张图像'
-        except Exception as e:
-            task.status = 'failed'
-            task.error = str(e)
-            task.message = '生成失败'
-        finally:
-            _save(task)
-    Thread(target=run, daemon=True).start()
-    return task.task_id
-
-def start_thermal_task(user_id: int, payload) -> str:
-    task = PlotTask(user_id, 'thermal')
-    _save(task)
-    def run():
-        try:
-            temperatures = payload.temperatures if payload.temperatures else [55.0, 60.0, 65.0, 70.0, 75.0, 80.0]
-            results = plot_thermal(user_id, temperatures, payload.pt100_resistance, payload.ntc_resistance)
-            imgs = [u for _, u in results]
-            imgs_data: List[str] = []
-            if payload.return_data_uri:
-                for fp, _ in results:
-                    with open(fp, 'rb') as f:
-                        imgs_data.append('data:image/png;base64,' + base64.b64encode(f.read()).decode('utf-8'))
-            task.images = imgs
-            task.images_data = imgs_data if imgs_data else None
-            task.status = 'completed'
-            task.message = f'共生成{len(imgs)}张图像'
-        except Exception as e:
-            task.status = 'failed'
-            task.error = str(e)
-            task.message = '生成失败'
-        finally:
-            _save(task)
-    Thread(target=run, daemon=True).start()
-    return task.task_id
-
-def start_photo_devices_task(user_id: int, payload) -> str:
-    task = PlotTask(user_id, 'photo-devices')
-    _save(task)
-    def run():
-        try:
-            fpath, url = plot_photo_devices(
-                user_id,
-                payload.led_I, payload.led_V, payload.led_P,
-                payload.ld_I, payload.ld_V, payload.ld_P, payload.ld_linear_start_idx or 4,
-                payload.pd_L, payload.pd_I_L, payload.pd_V, payload.pd_I_V, payload.pd_wl, payload.pd_I_wl,
-                payload.pt_L, payload.pt_I_L, payload.pt_V, payload.pt_I_V, payload.pt_wl, payload.pt_I_wl
-            )
-            imgs = [url]
-            imgs_data: List[str] = []
-            if payload.return_data_uri:
-                with open(fpath, 'rb') as f:
-                    imgs_data.append('data:image/png;base64,' + base64.b64encode(f.read()).decode('utf-8'))
-            task.images = imgs
-            task.images_data = imgs_data if imgs_data else None
-            task.status = 'completed'
-            task.message = '生成完成'
-        except Exception as e:
-            task.status = 'failed'
-            task.error = str(e)
-            task.message = '生成失败'
-        finally:
-            _save(task)
-    Thread(target=run, daemon=True).start()
-    return task.task_id
-
-def start_solar_cell_task(user_id: int, payload) -> str:
-    task = PlotTask(user_id, 'solar-cell')
-    _save(task)
-    def run():
-        try:
-            results = plot_solar_cell(
-                user_id,
-                payload.dark_voltage, payload.dark_current,
-                payload.light_voltage, payload.light_current,
-                payload.relative_intensity, payload.light_power, payload.short_circuit_current, payload.open_circuit_voltage
-            )
-            imgs = [u for _, u in results]
-            imgs_data: List[str] = []
-            if payload.return_data_uri:
-                for fp, _ in results:
-                    with open(fp, 'rb') as f:
-                        imgs_data.append('data:image/png;base64,' + base64.b64encode(f.read()).decode('utf-8'))
-            task.images = imgs
-            task.images_data = imgs_data if imgs_data else None
-            task.status = 'completed'
-            task.message = f'共生成{len(imgs)}张图像'
-        except Exception as e:
-            task.status = 'failed'
-            task.error = str(e)
-            task.message = '生成失败'
-        finally:
-            _save(task)
-    Thread(target=run, daemon=True).start()
-    return task.task_id
+def start_task(user_id: int, exp: Experiment, payload, ticket: workers.Ticket, key: Optional[str] = None,
+               cohort: Optional[str] = None) -> str:
+    """异步绘图任务（任意已登记实验）；同一去重键已有任务时复用并释放配额。"""
+    task, created = _register(user_id, exp.name, key)
+    if not created:
+        ticket.release()
+        return task.task_id
+    task.cohort = cohort
+    return _launch(task, ticket, [(exp, payload)], bool(payload.return_data_uri))
 
-def start_ultrasound_task(user_id: int, payload) -> str:
-    task = PlotTask(user_id, 'ultrasound')
-    _save(task)
-    def run():
-        try:
-            results = plot_ultrasound(
-                user_id,
-                payload.t_free_fall, payload.v_free_fall_1, payload.v_free_fall_2, payload.v_free_fall_3, payload.v_free_fall_4,
-                payload.t1, payload.v1_1, payload.v1_2, payload.v1_3, payload.v1_4,
-                payload.t2, payload.v2_1, payload.v2_2, payload.v2_3, payload.v2_4,
-                payload.t3, payload.v3_1, payload.v3_2, payload.v3_3, payload.v3_4,
-                payload.m, payload.a_measured
-            )
-            imgs = [u for _, u in results]
-            imgs_data: List[str] = []
-            if payload.return_data_uri:
-                for fp, _ in results:
-                    with open(fp, 'rb') as f:
-                        imgs_data.append('data:image/png;base64,' + base64.b64encode(f.read()).decode('utf-8'))
-            task.images = imgs
-            task.images_data = imgs_data if imgs_data else None
-            task.status = 'completed'
-            task.message = f'共生成{len(imgs)}张图像'
-        except Exception as e:
-            task.status = 'failed'
-            task.error = str(e)
-            task.message = '生成失败'
-        finally:
-            _save(task)
-    Thread(target=run, daemon=True).start()
-    return task.task_id
-
-def start_millikan_task(user_id: int, payload) -> str:
-    task = PlotTask(user_id, 'millikan')
-    _save(task)
-    def run():
-        try:
-            fpath, url = plot_millikan(user_id, payload.ni, payload.qi)
-            imgs = [url]
-            imgs_data: List[str] = []
-            if payload.return_data_uri:
-                with open(fpath, 'rb') as f:
-                    imgs_data.append('data:image/png;base64,' + base64.b64encode(f.read()).decode('utf-8'))
-            task.images = imgs
-            task.images_data = imgs_data if imgs_data else None
-            task.status = 'completed'
-            task.message = '生成完成'
-        except Exception as e:
-            task.status = 'failed'
-            task.error = str(e)
-            task.message = '生成失败'
-        finally:
-            _save(task)
-    Thread(target=run, daemon=True).start()
-    return task.task_id
-
-def start_mechanics_task(user_id: int, payload) -> str:
-    task = PlotTask(user_id, 'mechanics')
-    _save(task)
-    def run():
-        try:
-            fpath1, url1, _k = plot_mech_t2_m(user_id, payload.t2m.m0_g, payload.t2m.weights_g, payload.t2m.T10_avg_s)
-            fpath2, url2, _omega, _T_calc = plot_mech_v2_x2(user_id, payload.v2x2.x_cm, payload.v2x2.v_avg_cms)
-            imgs = [url1, url2]
-            imgs_data: List[str] = []
-            if payload.return_data_uri:
-                for fp in [fpath1, fpath2]:
-                    with open(fp, 'rb') as f:
-                        imgs_data.append('data:image/png;base64,' + base64.b64encode(f.read()).decode('utf-8'))
-            task.images = imgs
-            task.images_data = imgs_data if imgs_data else None
-            task.status = 'completed'
-            task.message = '生成完成'
-        except Exception as e:
-            task.status = 'failed'
-            task.error = str(e)
-            task.message = '生成失败'
-        finally:
-            _save(task)
-    Thread(target=run, daemon=True).start()
-    return task.task_id
+def start_batch_task(user_id: int, payload, items: List[Tuple[Experiment, object]], ticket: workers.Ticket, key: Optional[str] = None,
+                     cohort: Optional[str] = None) -> str:
+    """批量任务：items 为已校验的 [(实验, 请求体), ...]，所有实验的图一起提交调度。"""
+    task, created = _register(user_id, 'batch', key)
+    if not created:
+        ticket.release()
+        return task.task_id
+    task.cohort = cohort
+    return _launch(task, ticket, items, bool(payload.return_data_uri))
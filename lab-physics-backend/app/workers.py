@@ -0,0 +1,587 @@
+"""
+绘图 worker 进程池：在独立进程中执行 app.plots 中的绘图函数。
+
+说明：
+- API 进程只负责调度，不导入 matplotlib/scipy；worker 进程启动时立即导入绘图栈（WARMUP_ON_STARTUP=1 时同时预热）；
+- 每个 worker 执行 RENDER_MAX_TASKS 个任务或 RSS 超过 RENDER_MAX_RSS_MB 后主动退出，由新进程替换；
+- 每个任务结束后 worker 关闭所有遗留图像，并上报 RSS、遗留图像数，供 /api/admin/render-workers 监控；
+- RENDER_WORKERS=0 时在调用线程内直接绘图（便于开发调试）；
+- 公平调度：排队任务按用户轮转出队，每个用户同时执行的任务数不超过 RENDER_USER_CONCURRENCY，
+  RENDER_PRIORITY_ROLES 中的角色（默认 admin）优先出队；
+- 准入控制：每个绘图请求（同步或异步任务）先通过 admit() 领取配额，全局与单用户的排队+执行数量各有上限，
+  超出时抛出 RenderBusy（接口层转换为 429 + Retry-After），避免渲染请求占满线程池拖慢其他接口；
+- 逐图进度与取消：worker 每保存一张图即回传 ("figure", (路径, URL)) 并等待 API 进程答复 go/cancel，
+  提交时传入的 on_figure 回调逐张收到结果；cancel 事件置位后，剩余的图不再绘制，任务以 RenderCancelled 结束；
+- 多图实验按图拆分（见 app.figures），Ticket.map 同时提交各图，由空闲 worker 并行绘制后按顺序返回；
+- 图级缓存：经 Ticket 提交的绘图先查 app.render_cache，输入字段未变化的图直接复用已生成文件，不再进入队列。
+"""
+
+import functools
+import logging
+import math
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, wait
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from .config import settings
+from .render_cache import FigureCache
+
+
+# spawn：子进程不继承 API 进程的线程与连接池状态
+_mp = multiprocessing.get_context("spawn")
+
+
+def _rss_bytes() -> int:
+    """当前进程常驻内存（字节）。优先读取 /proc，其他平台回退到峰值 RSS。"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class RenderCancelled(Exception):
+    """绘图任务已被取消（排队中被跳过，或在两张图之间被中止）。"""
+
+
+def _worker_main(conn, max_tasks: int, max_rss_bytes: int, warmup: bool):
+    """worker 进程主循环：接收 (函数名, args)，返回 (状态, 结果/异常, 统计)。
+    执行期间每保存一张图发送一次 ("figure", (路径, URL))，收到 "cancel" 时中止当前函数。"""
+    from . import plots
+    import matplotlib.pyplot as plt
+
+    def on_figure(item):
+        conn.send(("figure", item))
+        if conn.recv() == "cancel":
+            raise RenderCancelled()
+
+    plots.figure_hook.set(on_figure)
+    timings = plots.warmup() if warmup else {}
+    conn.send(("ready", timings, {"pid": os.getpid(), "tasks": 0, "rss": _rss_bytes(), "open_figures": 0}))
+    tasks = 0
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            break
+        if msg is None:
+            break
+        func_name, args = msg
+        try:
+            reply = ("ok", getattr(plots, func_name)(*args))
+        except Exception as e:
+            reply = ("error", e)
+        # 任务边界兜底：统计并关闭仍被 pyplot 持有的图像
+        leaked = plots.open_figure_count()
+        if leaked:
+            plt.close("all")
+        tasks += 1
+        rss = _rss_bytes()
+        stats = {
+            "pid": os.getpid(),
+            "tasks": tasks,
+            "rss": rss,
+            "open_figures": leaked,
+            "retire": tasks >= max_tasks or rss > max_rss_bytes,
+        }
+        try:
+            conn.send(reply + (stats,))
+        except Exception:
+            # 异常对象无法序列化时退化为 RuntimeError
+            conn.send(("error", RuntimeError(str(reply[1])), stats))
+        if stats["retire"]:
+            break
+    conn.close()
+
+
+class _Job:
+    __slots__ = ("func_name", "args", "owner", "priority", "on_figure", "cancel", "future")
+
+    def __init__(self, func_name: str, args: tuple, owner: Any, priority: int,
+                 on_figure: Optional[Callable] = None, cancel: Optional[threading.Event] = None):
+        self.func_name = func_name
+        self.args = args
+        self.owner = owner
+        self.priority = priority
+        self.on_figure = on_figure
+        self.cancel = cancel
+        self.future: Future = Future()
+
+    def cancelled(self) -> bool:
+        return self.cancel is not None and self.cancel.is_set()
+
+    def figure_done(self, item) -> bool:
+        """转发一张已完成的图；返回是否继续绘制剩余的图。"""
+        if self.on_figure is not None:
+            try:
+                self.on_figure(item)
+            except Exception:
+                logging.exception("render progress callback failed")
+        return not self.cancelled()
+
+
+class _FairQueue:
+    """按用户公平出队的任务队列。
+
+    - 每个 owner（用户）一个 FIFO，owner 之间轮转，单个用户连续提交的大量任务不会阻塞其他用户；
+    - 同一 owner 正在执行的任务数达到 per_owner_limit 时暂不出队（0 表示不限）；
+    - 可出队的 owner 中，队首任务 priority 更高者优先，同优先级按轮转顺序。
+    """
+
+    def __init__(self, per_owner_limit: int):
+        self.per_owner_limit = per_owner_limit
+        self._cond = threading.Condition()
+        self._queues: Dict[Any, deque] = {}
+        self._ring: List[Any] = []
+        self._running: Dict[Any, int] = {}
+        self._size = 0
+        self._stops = 0
+
+    def put(self, job: _Job):
+        with self._cond:
+            q = self._queues.get(job.owner)
+            if q is None:
+                q = self._queues[job.owner] = deque()
+                self._ring.append(job.owner)
+            q.append(job)
+            self._size += 1
+            self._cond.notify()
+
+    def stop(self, count: int):
+        with self._cond:
+            self._stops += count
+            self._cond.notify_all()
+
+    def _pick(self) -> Optional[_Job]:
+        best = -1
+        for idx, owner in enumerate(self._ring):
+            if self.per_owner_limit > 0 and self._running.get(owner, 0) >= self.per_owner_limit:
+                continue
+            if best < 0 or self._queues[owner][0].priority > self._queues[self._ring[best]][0].priority:
+                best = idx
+        if best < 0:
+            return None
+        owner = self._ring.pop(best)
+        q = self._queues[owner]
+        job = q.popleft()
+        if q:
+            self._ring.append(owner)
+        else:
+            del self._queues[owner]
+        self._size -= 1
+        self._running[owner] = self._running.get(owner, 0) + 1
+        return job
+
+    def get(self) -> Optional[_Job]:
+        """阻塞直到有可执行任务；收到停止信号时返回 None。"""
+        with self._cond:
+            while True:
+                if self._stops:
+                    self._stops -= 1
+                    return None
+                job = self._pick()
+                if job is not None:
+                    return job
+                self._cond.wait()
+
+    def done(self, job: _Job):
+        with self._cond:
+            left = self._running.get(job.owner, 1) - 1
+            if left > 0:
+                self._running[job.owner] = left
+            else:
+                self._running.pop(job.owner, None)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {"queued": self._size, "queued_users": len(self._queues), "running_users": len(self._running)}
+
+
+class _Slot(threading.Thread):
+    """一个 worker 进程对应一个调度线程：从队列取任务、发送给进程并等待结果，必要时替换进程。"""
+
+    def __init__(self, pool: "RenderPool", index: int):
+        super().__init__(name=f"render-slot-{index}", daemon=True)
+        self.pool = pool
+        self.index = index
+        self.proc = None
+        self.conn = None
+        self.info: Dict[str, Any] = {"pid": None, "tasks": 0, "rss": 0, "open_figures": 0, "leaked_figures": 0}
+        self.ready = threading.Event()
+
+    def _spawn(self):
+        parent_conn, child_conn = _mp.Pipe()
+        proc = _mp.Process(
+            target=_worker_main,
+            args=(child_conn, settings.RENDER_MAX_TASKS, settings.RENDER_MAX_RSS_MB * 1024 * 1024, settings.WARMUP_ON_STARTUP),
+            name=f"render-worker-{self.index}",
+            daemon=True,
+        )
+        proc.start()
+        child_conn.close()
+        self.proc, self.conn = proc, parent_conn
+        _, timings, info = parent_conn.recv()
+        self.info.update(info, leaked_figures=0)
+        self.pool._on_ready(timings)
+        self.ready.set()
+
+    def _retire(self):
+        self.ready.clear()
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+        if self.proc is not None:
+            self.proc.join(timeout=5)
+            if self.proc.is_alive():
+                self.proc.kill()
+        self.proc = self.conn = None
+
+    def run(self):
+        while True:
+            if self.proc is None:
+                try:
+                    self._spawn()
+                except Exception:
+                    logging.exception("render worker spawn failed")
+                    self._retire()
+                    time.sleep(1.0)
+                    continue
+            job = self.pool._queue.get()
+            if job is None:
+                break
+            try:
+                self._execute(job)
+            finally:
+                self.pool._queue.done(job)
+        try:
+            if self.conn is not None:
+                self.conn.send(None)
+        except Exception:
+            pass
+        self._retire()
+
+    def _execute(self, job: _Job):
+        if not job.future.set_running_or_notify_cancel():
+            return
+        if job.cancelled():
+            # 排队期间已取消：不再发送给 worker
+            job.future.set_exception(RenderCancelled())
+            self.pool._count("cancelled")
+            return
+        try:
+            self.conn.send((job.func_name, job.args))
+            while True:
+                msg = self.conn.recv()
+                if msg[0] != "figure":
+                    break
+                self.conn.send("go" if job.figure_done(msg[1]) else "cancel")
+            status, value, info = msg
+        except (EOFError, OSError) as e:
+            # 进程异常退出（如被 OOM kill），当前任务失败，替换进程后继续
+            job.future.set_exception(RuntimeError(f"绘图进程异常退出: {e}"))
+            self.pool._count("crashed")
+            self._retire()
+            return
+        leaked = self.info["leaked_figures"] + info["open_figures"]
+        self.info.update(info, leaked_figures=leaked)
+        if status == "ok":
+            self.pool._count("completed")
+            job.future.set_result(value)
+        else:
+            self.pool._count("cancelled" if isinstance(value, RenderCancelled) else "failed")
+            job.future.set_exception(value)
+        if info.get("retire"):
+            logging.info(f"recycling render worker pid={info['pid']} tasks={info['tasks']} rss={info['rss'] // (1024 * 1024)}MB")
+            self.pool._count("recycled")
+            self._retire()
+
+
+class RenderPool:
+    def __init__(self, size: int, per_user_limit: int):
+        self.size = size
+        self._queue = _FairQueue(per_user_limit)
+        self._slots: List[_Slot] = []
+        self._lock = threading.Lock()
+        self._counters = {"completed": 0, "failed": 0, "cancelled": 0, "crashed": 0, "recycled": 0}
+        self.warmup_timings: Dict[str, float] = {}
+
+    def _count(self, key: str):
+        with self._lock:
+            self._counters[key] += 1
+
+    def _on_ready(self, timings: Dict[str, float]):
+        if timings:
+            with self._lock:
+                self.warmup_timings = timings
+
+    def start(self, wait: bool = False, timeout: float = 120.0):
+        with self._lock:
+            if not self._slots:
+                self._slots = [_Slot(self, i) for i in range(self.size)]
+                for slot in self._slots:
+                    slot.start()
+            slots = list(self._slots)
+        if wait:
+            deadline = time.monotonic() + timeout
+            for slot in slots:
+                slot.ready.wait(max(0.0, deadline - time.monotonic()))
+
+    def submit(self, func_name: str, args: tuple, owner: Any, priority: int,
+               on_figure: Optional[Callable] = None, cancel: Optional[threading.Event] = None) -> Future:
+        self.start()
+        job = _Job(func_name, args, owner, priority, on_figure, cancel)
+        self._queue.put(job)
+        return job.future
+
+    def shutdown(self):
+        with self._lock:
+            slots, self._slots = self._slots, []
+        self._queue.stop(len(slots))
+        for slot in slots:
+            slot.join(timeout=10)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            data: Dict[str, Any] = dict(self._counters)
+            slots = list(self._slots)
+        data["mode"] = "process"
+        data.update(self._queue.stats())
+        data["workers"] = [
+            {
+                "pid": s.info["pid"],
+                "ready": s.ready.is_set(),
+                "tasks": s.info["tasks"],
+                "rss_mb": round(s.info["rss"] / (1024 * 1024), 1),
+                "leaked_figures": s.info["leaked_figures"],
+            }
+            for s in slots
+        ]
+        return data
+
+
+class RenderBusy(Exception):
+    """绘图配额已满。retry_after 为建议的重试等待秒数。"""
+
+    def __init__(self, retry_after: int, per_user: bool):
+        super().__init__(f"render capacity exhausted (retry after {retry_after}s)")
+        self.retry_after = retry_after
+        self.per_user = per_user
+
+
+class Ticket:
+    """一次绘图请求占用的配额；该请求的所有绘图都通过 ticket.submit()/run() 提交，以便按用户公平调度。
+    release() 可重复调用；异步任务调用 handoff() 后，由任务线程在结束时释放。
+    reused 为本次请求中命中图级缓存、直接复用的图像文件路径（不再写入绘图记录）。"""
+
+    def __init__(self, admission: "_Admission", user_id: int, priority: int = 0):
+        self._admission = admission
+        self.user_id = user_id
+        self.priority = priority
+        self.handed_off = False
+        self._started = time.monotonic()
+        self._released = False
+        self.reused: Set[str] = set()
+
+    def handoff(self) -> "Ticket":
+        self.handed_off = True
+        return self
+
+    def submit(self, func_name: str, *args, on_figure: Optional[Callable] = None,
+               cancel: Optional[threading.Event] = None) -> Future:
+        if not _figure_cache.enabled:
+            return submit(func_name, *args, owner=self.user_id, priority=self.priority, on_figure=on_figure, cancel=cancel)
+        key = _figure_cache.key(func_name, args)
+        cached = _figure_cache.get(key)
+        if cached is not None:
+            # 输入未变化：复用上次生成的图，不占用 worker
+            future: Future = Future()
+            future.set_result(cached)
+            self.reused.add(cached[0])
+            if on_figure is not None:
+                on_figure(tuple(cached[:2]))
+            return future
+        future = submit(func_name, *args, owner=self.user_id, priority=self.priority, on_figure=on_figure, cancel=cancel)
+
+        def remember(f: Future):
+            if not f.cancelled() and f.exception() is None:
+                _figure_cache.put(key, f.result())
+
+        future.add_done_callback(remember)
+        return future
+
+    def run(self, func_name: str, *args, on_figure: Optional[Callable] = None, cancel: Optional[threading.Event] = None):
+        return self.submit(func_name, *args, on_figure=on_figure, cancel=cancel).result()
+
+    def map(self, jobs: List[tuple], on_figure: Optional[Callable] = None,
+            cancel: Optional[threading.Event] = None) -> List[Any]:
+        """同时提交多个相互独立的绘图 [(函数名, args), ...]，由多个 worker 并行执行，结果按提交顺序返回。
+        on_figure(序号, (路径, URL)) 在每张图完成时调用；任一绘图失败时取消其余尚未开始的绘图，
+        等待正在执行的绘图结束后抛出异常。"""
+        futures = [
+            self.submit(func_name, *args, cancel=cancel,
+                        on_figure=functools.partial(on_figure, idx) if on_figure is not None else None)
+            for idx, (func_name, args) in enumerate(jobs)
+        ]
+        try:
+            return [f.result() for f in futures]
+        except BaseException:
+            for f in futures:
+                f.cancel()
+            # 等待已在执行的绘图结束，保证返回后不再有 on_figure 回调
+            wait(futures)
+            raise
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        self._admission._release(self, time.monotonic() - self._started)
+
+    def __enter__(self) -> "Ticket":
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class _Admission:
+    def __init__(self, max_pending: int, max_pending_per_user: int, workers: int):
+        self.max_pending = max_pending
+        self.max_pending_per_user = max_pending_per_user
+        self.workers = max(1, workers)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._by_user: Dict[int, int] = {}
+        self._rejected = 0
+        # 单个绘图请求耗时的指数滑动平均（秒），用于估算 Retry-After
+        self._avg_seconds = 2.0
+
+    def _retry_after(self, excess: int) -> int:
+        return max(1, math.ceil(self._avg_seconds * max(1, excess) / self.workers))
+
+    def admit(self, user_id: int, priority: int = 0) -> Ticket:
+        with self._lock:
+            mine = self._by_user.get(user_id, 0)
+            if self.max_pending_per_user > 0 and mine >= self.max_pending_per_user:
+                self._rejected += 1
+                # 本用户需等待自己的一个请求完成
+                raise RenderBusy(max(1, math.ceil(self._avg_seconds)), per_user=True)
+            if self.max_pending > 0 and self._pending >= self.max_pending:
+                self._rejected += 1
+                raise RenderBusy(self._retry_after(self._pending - self.max_pending + 1), per_user=False)
+            self._pending += 1
+            self._by_user[user_id] = mine + 1
+        return Ticket(self, user_id, priority)
+
+    def _release(self, ticket: Ticket, elapsed: float):
+        with self._lock:
+            self._pending -= 1
+            left = self._by_user.get(ticket.user_id, 1) - 1
+            if left > 0:
+                self._by_user[ticket.user_id] = left
+            else:
+                self._by_user.pop(ticket.user_id, None)
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "max_pending_per_user": self.max_pending_per_user,
+                "users": len(self._by_user),
+                "rejected": self._rejected,
+                "avg_render_seconds": round(self._avg_seconds, 2),
+            }
+
+
+_admission = _Admission(settings.RENDER_MAX_PENDING, settings.RENDER_MAX_PENDING_PER_USER, settings.RENDER_WORKERS)
+_priority_roles = {r.strip() for r in settings.RENDER_PRIORITY_ROLES.split(",") if r.strip()}
+_pool: Optional[RenderPool] = RenderPool(settings.RENDER_WORKERS, settings.RENDER_USER_CONCURRENCY) if settings.RENDER_WORKERS > 0 else None
+_inline_counters = {"completed": 0, "failed": 0, "cancelled": 0}
+_figure_cache = FigureCache(settings.FIGURE_CACHE_SIZE)
+_inline_lock = threading.Lock()
+
+
+def admit(user_id: int, role: Optional[str] = None) -> Ticket:
+    """为一次绘图请求领取配额；全局或该用户的排队+执行数量已达上限时抛出 RenderBusy。
+    role 属于 RENDER_PRIORITY_ROLES 时，该请求的绘图任务优先出队。"""
+    return _admission.admit(user_id, 1 if role in _priority_roles else 0)
+
+
+def submit(func_name: str, *args, owner: Any = None, priority: int = 0,
+           on_figure: Optional[Callable] = None, cancel: Optional[threading.Event] = None) -> Future:
+    """提交一次绘图（app.plots 中的函数名 + 参数），返回 Future。owner/priority 用于公平调度；
+    on_figure 在每张图保存后被调用，cancel 置位后剩余的图不再绘制（Future 以 RenderCancelled 结束）。"""
+    if _pool is not None:
+        return _pool.submit(func_name, args, owner, priority, on_figure, cancel)
+    # 进程内模式：在调用线程中同步执行
+    from . import plots
+    job = _Job(func_name, args, owner, priority, on_figure, cancel)
+    future = job.future
+
+    def hook(item):
+        if not job.figure_done(item):
+            raise RenderCancelled()
+
+    token = plots.figure_hook.set(hook)
+    try:
+        if job.cancelled():
+            raise RenderCancelled()
+        future.set_result(getattr(plots, func_name)(*args))
+        key = "completed"
+    except Exception as e:
+        future.set_exception(e)
+        key = "cancelled" if isinstance(e, RenderCancelled) else "failed"
+    finally:
+        plots.figure_hook.reset(token)
+    with _inline_lock:
+        _inline_counters[key] += 1
+    return future
+
+
+def run(func_name: str, *args, owner: Any = None, priority: int = 0,
+        on_figure: Optional[Callable] = None, cancel: Optional[threading.Event] = None):
+    """提交并等待绘图结果；绘图函数抛出的异常原样抛出。"""
+    return submit(func_name, *args, owner=owner, priority=priority, on_figure=on_figure, cancel=cancel).result()
+
+
+def warmup() -> Dict[str, float]:
+    """启动 worker（进程内模式下直接预热当前进程），等待全部就绪，返回预热耗时。"""
+    if _pool is None:
+        from . import plots
+        return plots.warmup()
+    _pool.start(wait=True)
+    return dict(_pool.warmup_timings)
+
+
+def shutdown():
+    if _pool is not None:
+        _pool.shutdown()
+
+
+def stats() -> Dict[str, Any]:
+    """worker 监控数据：完成/失败/取消/崩溃/回收次数、准入配额、图级缓存命中，以及每个 worker 的任务数、RSS 与遗留图像数。"""
+    if _pool is not None:
+        return dict(_pool.stats(), admission=_admission.stats(), figure_cache=_figure_cache.stats())
+    with _inline_lock:
+        data: Dict[str, Any] = dict(_inline_counters, mode="inline", queued=0, admission=_admission.stats(),
+                                    figure_cache=_figure_cache.stats())
+    plots = sys.modules.get(f"{__package__}.plots")
+    data["workers"] = [{
+        "pid": os.getpid(),
+        "ready": plots is not None,
+        "tasks": data["completed"] + data["failed"],
+        "rss_mb": round(_rss_bytes() / (1024 * 1024), 1),
+        "open_figures": plots.open_figure_count() if plots is not None else 0,
+    }]
+    return data
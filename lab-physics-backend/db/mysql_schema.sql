@@ -20,4 +20,21 @@ CREATE TABLE IF NOT EXISTS `plot_records` (
   `created_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
   PRIMARY KEY (`id`),
   KEY `idx_plot_user` (`user_id`)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
\ No newline at end of file
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 班级统计：按 (实验, 班级, 导出常数) 增量维护的聚合量（样本数、均值、离差平方和、最值、直方图 JSON）
+CREATE TABLE IF NOT EXISTS `analysis_aggregates` (
+  `id` INT NOT NULL AUTO_INCREMENT COMMENT '主键ID',
+  `experiment` VARCHAR(64) NOT NULL COMMENT '实验类型标识',
+  `cohort` VARCHAR(64) NOT NULL DEFAULT '' COMMENT '班级标识，空串表示全部',
+  `quantity` VARCHAR(64) NOT NULL COMMENT '导出常数，如 g/e/I_th',
+  `count` INT NOT NULL DEFAULT 0 COMMENT '样本数',
+  `mean` DOUBLE NOT NULL DEFAULT 0 COMMENT '均值',
+  `m2` DOUBLE NOT NULL DEFAULT 0 COMMENT '离差平方和（Welford）',
+  `min_value` DOUBLE NULL COMMENT '最小值',
+  `max_value` DOUBLE NULL COMMENT '最大值',
+  `histogram` TEXT NOT NULL COMMENT '直方图 JSON：桶编号 -> 计数',
+  `updated_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '更新时间',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_aggregate_key` (`experiment`, `cohort`, `quantity`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,49 @@
+"""绘图准入（app.workers._Admission）：超出全局或单用户上限时拒绝，接口层返回 429 与 Retry-After。"""
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app import deps, workers
+
+
+def test_per_user_limit():
+    admission = workers._Admission(max_pending=10, max_pending_per_user=2, workers=1)
+    tickets = [admission.admit(1), admission.admit(1)]
+    with pytest.raises(workers.RenderBusy) as busy:
+        admission.admit(1)
+    assert busy.value.per_user and busy.value.retry_after >= 1
+    # 其他用户不受影响
+    admission.admit(2).release()
+    tickets[0].release()
+    admission.admit(1).release()
+    assert admission.stats()["rejected"] == 1
+
+
+def test_global_limit_and_release():
+    admission = workers._Admission(max_pending=2, max_pending_per_user=0, workers=1)
+    first, second = admission.admit(1), admission.admit(2)
+    with pytest.raises(workers.RenderBusy) as busy:
+        admission.admit(3)
+    assert not busy.value.per_user
+    first.release()
+    # release 可重复调用，不会多释放配额
+    first.release()
+    third = admission.admit(3)
+    assert admission.stats()["pending"] == 2
+    second.release()
+    third.release()
+    assert admission.stats()["pending"] == 0 and admission.stats()["users"] == 0
+
+
+def test_busy_returns_429(monkeypatch):
+    monkeypatch.setattr(workers, "_admission", workers._Admission(max_pending=1, max_pending_per_user=0, workers=1))
+    user = SimpleNamespace(user_id=1, role="normal")
+    ticket = deps.admit_render(user)
+    try:
+        with pytest.raises(HTTPException) as exc:
+            deps.admit_render(SimpleNamespace(user_id=2, role="normal"))
+        assert exc.value.status_code == 429
+        assert int(exc.value.headers["Retry-After"]) >= 1
+    finally:
+        ticket.release()
@@ -0,0 +1,213 @@
+"""app.analysis 的拟合与导出常数：用解析已知的合成数据检验结果。"""
+import numpy as np
+import pytest
+
+from app import analysis
+
+
+# -------------------------- 直线拟合 --------------------------
+
+def test_linear_fit_exact_line():
+    x = np.arange(6.0)
+    fit = analysis.linear_fit(x, 2.5 * x - 1.0)
+    assert fit.slope == pytest.approx(2.5)
+    assert fit.intercept == pytest.approx(-1.0)
+    assert fit.r2 == pytest.approx(1.0)
+    assert fit.slope_se == pytest.approx(0.0, abs=1e-12)
+    assert fit.n == 6
+
+
+def test_linear_fit_rows_with_padding_mask():
+    # 长度不同的两条数据补齐后按行一次拟合；填充位为任意值也不影响结果
+    values, mask = analysis.pad([[0, 1, 2, 3], [0, 1, 2]], fill=np.nan)
+    y = np.where(mask > 0, np.array([[3.0], [-2.0]]) * values + 1.0, 1e9)
+    fit = analysis.linear_fit(values, y, mask)
+    assert fit.slope == pytest.approx([3.0, -2.0])
+    assert fit.intercept == pytest.approx([1.0, 1.0])
+    assert fit.n.tolist() == [4.0, 3.0]
+
+
+def test_linear_fit_standard_error():
+    # 与 numpy.polyfit 对照；斜率标准误差 se = sqrt(SSE/(n-2)/Sxx)
+    x = np.arange(6.0)
+    y = 0.5 * x + np.array([1, -1, 1, -1, 1, -1]) * 1.0
+    fit = analysis.linear_fit(x, y)
+    ref = np.polyfit(x, y, 1)
+    assert (fit.slope, fit.intercept) == pytest.approx(tuple(ref))
+    resid = y - (fit.slope * x + fit.intercept)
+    sxx = ((x - x.mean()) ** 2).sum()
+    assert fit.slope_se == pytest.approx(np.sqrt((resid ** 2).sum() / 4 / sxx))
+
+
+def test_degenerate_x_gives_nan():
+    fit = analysis.linear_fit([2.0, 2.0, 2.0], [1.0, 2.0, 3.0])
+    assert np.isnan(fit.slope)
+
+
+def test_proportional_and_log_fit():
+    x = np.array([1.0, 2.0, 4.0, 8.0])
+    assert analysis.proportional_fit(x, 3.0 * x).slope == pytest.approx(3.0)
+    fit = analysis.log_fit(x, 2.0 * np.log(x) + 0.5)
+    assert (fit.slope, fit.intercept) == pytest.approx((2.0, 0.5))
+    with pytest.raises(ValueError):
+        analysis.log_fit([0.0, 1.0, 2.0], [1.0, 2.0, 3.0])
+
+
+def test_derived_constants():
+    # T² = (4π²/k)·M：斜率 4π²/k；v² = ω²(A² - x²)：斜率 -ω²
+    assert analysis.spring_constant(4 * np.pi ** 2 / 2.0) == pytest.approx(2.0)
+    assert analysis.angular_frequency(-4.0) == pytest.approx(2.0)
+    assert analysis.period(2.0) == pytest.approx(np.pi)
+    assert analysis.x_intercept(analysis.linear_fit([1.0, 2.0, 3.0], [1.0, 3.0, 5.0])) == pytest.approx(0.5)
+
+
+# -------------------------- 密立根：元电荷 --------------------------
+
+def test_charge_quantum_exact_multiples():
+    n = np.array([1, 3, 2, 5, 4, 7, 2])
+    e, ni, rms = analysis.charge_quantum(1.602 * n)
+    assert e == pytest.approx(1.602, abs=1e-4)
+    assert ni.tolist() == n.tolist()
+    assert rms == pytest.approx(0.0, abs=1e-3)
+
+
+def test_charge_quantum_rows_with_noise_and_mask():
+    rng = np.random.default_rng(3)
+    n = np.array([[2, 3, 4, 5, 6, 3], [1, 4, 2, 6, 3, 0]])
+    mask = (n > 0).astype(float)
+    q = np.array([[1.59], [1.62]]) * n * (1 + rng.normal(0, 0.002, n.shape))
+    e, ni, _ = analysis.charge_quantum(q, mask)
+    assert e == pytest.approx([1.59, 1.62], abs=0.01)
+    assert (ni[mask > 0] == n[mask > 0]).all()
+
+
+def test_millikan_range_must_exclude_half_and_double():
+    from app.experiments import EXPERIMENTS, PlotInputError
+    exp = EXPERIMENTS['millikan']
+    qi = [3.2, 4.8, 6.4]
+    exp.validate(exp.request_model.model_validate(dict(qi=qi)))
+    with pytest.raises(PlotInputError):
+        exp.validate(exp.request_model.model_validate(dict(qi=qi, e_min=0.8, e_max=2.0)))
+    with pytest.raises(PlotInputError):
+        exp.validate(exp.request_model.model_validate(dict(qi=[-1.0, 3.2])))
+
+
+# -------------------------- 弗兰克-赫兹：样条与峰谷 --------------------------
+
+def test_cubic_spline_reproduces_cubic():
+    # not-a-knot 样条对三次多项式是精确的
+    x = np.array([0.0, 0.4, 1.0, 1.7, 2.5, 3.0])
+    f = lambda t: t ** 3 - 2 * t + 1
+    spline = analysis.cubic_spline(x, np.stack([f(x), 2 * f(x)]))
+    xs = np.linspace(0, 3, 37)
+    assert spline(xs) == pytest.approx(np.stack([f(xs), 2 * f(xs)]))
+    with pytest.raises(ValueError):
+        analysis.cubic_spline([0.0, 0.0, 1.0], [1.0, 2.0, 3.0])
+
+
+def test_spline_extrema_of_sine():
+    x = np.linspace(0, 4 * np.pi, 81)
+    rows, xs, ys, peaks = analysis.spline_extrema(analysis.cubic_spline(x, np.sin(x)))
+    assert rows.tolist() == [0, 0, 0, 0]
+    assert xs == pytest.approx(np.pi * np.array([0.5, 1.5, 2.5, 3.5]), abs=1e-3)
+    assert ys == pytest.approx([1, -1, 1, -1], abs=1e-4)
+    assert peaks.tolist() == [True, False, True, False]
+
+
+def test_frank_hertz_extrema_spacing():
+    # I = 0.1·V + A·sin(2πV/11.6)：导数为零的位置严格以 11.6 V 为周期，两组振幅不同
+    v = np.arange(0, 80.5, 0.5)
+    currents = np.stack([0.1 * v + a * np.sin(2 * np.pi * v / 11.6) for a in (1.0, 2.0)])
+    results = analysis.frank_hertz_extrema(v, currents)
+    assert len(results) == 2
+    for result in results:
+        assert len(result['peaks']) == 7 and len(result['valleys']) == 7
+        assert result['excitation_energy'] == pytest.approx(11.6, abs=0.01)
+        assert result['peak_spacings'] == pytest.approx([11.6] * 6, abs=0.02)
+        assert result['excitation_energy_valleys'] == pytest.approx(11.6, abs=0.01)
+
+
+# -------------------------- 太阳能电池 --------------------------
+
+def test_iv_parameters_linear_curve():
+    # I = 10 - 2V（mA）：Isc = 10 mA、Voc = 5 V，功率在 V = 2.5 V 处取最大 12.5 mW（位于两测量点之间）
+    v = np.array([0.0, 0.4, 0.8, 1.2, 1.6, 2.0, 2.4, 2.8, 3.2, 3.6, 4.0, 4.4, 4.8])
+    params = analysis.iv_parameters(v[::-1], 10 - 2 * v[::-1])
+    assert params.isc == pytest.approx(10.0)
+    assert params.voc == pytest.approx(5.0)
+    assert (params.pmax, params.vmp, params.imp) == pytest.approx((12.5, 2.5, 5.0))
+    assert params.ff == pytest.approx(0.25)
+    assert (params.rs, params.rsh) == pytest.approx((500.0, 500.0))
+
+
+def test_diode_fit_recovers_model():
+    i0, a, rs = 2e-6, 0.08, 5.0
+    current = np.logspace(-3, 1, 15)
+    voltage = a * np.log(current / i0) + current * rs / 1000.0
+    fit = analysis.diode_fit(voltage, current)
+    assert fit.i0 == pytest.approx(i0, rel=1e-6)
+    assert (fit.a, fit.rs) == pytest.approx((a, rs), rel=1e-6)
+    assert fit.n == pytest.approx(a / analysis.THERMAL_VOLTAGE)
+    assert fit.r2 == pytest.approx(1.0)
+    # 非正电流的点不参与拟合
+    fit2 = analysis.diode_fit(np.append(voltage, 0.0), np.append(current, 0.0))
+    assert fit2.i0 == pytest.approx(i0, rel=1e-6)
+
+
+# -------------------------- 热敏电阻 --------------------------
+
+def test_callendar_van_dusen_coefficients():
+    t = np.arange(20.0, 101.0, 10.0)
+    r = 100.0 * (1 + 3.9083e-3 * t - 5.775e-7 * t * t)
+    fit = analysis.callendar_van_dusen(t, r)
+    assert (fit.r0, fit.a, fit.b) == pytest.approx((100.0, 3.9083e-3, -5.775e-7), rel=1e-8)
+    assert fit.alpha == pytest.approx(3.9083e-3 - 5.775e-5)
+
+
+def test_ntc_beta_and_steinhart_hart():
+    t = np.arange(20.0, 81.0, 5.0)
+    r = 10000.0 * np.exp(3950.0 * (1 / (t + 273.15) - 1 / 298.15))
+    beta = analysis.ntc_beta(t, r)
+    assert (beta.beta, beta.r25) == pytest.approx((3950.0, 10000.0))
+    assert beta.r2 == pytest.approx(1.0)
+    # 由已知系数生成数据，再拟合回来
+    a, b, c = 1.129e-3, 2.341e-4, 8.775e-8
+    log_r = np.log(np.linspace(1e3, 3e4, 12))
+    temps = 1 / (a + b * log_r + c * log_r ** 3) - 273.15
+    sh = analysis.steinhart_hart(temps, np.exp(log_r))
+    assert (sh.a, sh.b, sh.c) == pytest.approx((a, b, c), rel=1e-5)
+    assert sh.max_error < 1e-6
+    assert sh.temperature(np.exp(log_r)) == pytest.approx(temps)
+
+
+# -------------------------- 激光二极管阈值 --------------------------
+
+def _two_segment():
+    # 阈值以下 P = 0.01·I；I ≥ 10 mA 为激射区 P = 0.5·(I - 10) + 0.2，与 P=0 交于 I_th = 9.6 mA
+    current = np.arange(0.0, 30.0)
+    power = np.where(current < 10, 0.01 * current, 0.5 * (current - 10) + 0.2)
+    return current, power
+
+
+def test_laser_threshold_auto_split():
+    current, power = _two_segment()
+    th = analysis.laser_threshold(current, power)
+    assert th.i_th == pytest.approx(9.6)
+    assert th.slope == pytest.approx(0.5)
+    assert (th.start, th.below) == (10.0, 10)
+    assert th.r2 == pytest.approx(1.0)
+    # 测量顺序打乱不影响分段
+    order = np.random.default_rng(0).permutation(current.size)
+    assert analysis.laser_threshold(current[order], power[order]).i_th == pytest.approx(9.6)
+
+
+def test_laser_threshold_manual_start_and_rows():
+    current, power = _two_segment()
+    # 手动起点：原始顺序下标 ≥ start 的点为激射区；起点取在阈值以下时直线被拉偏
+    assert analysis.laser_threshold(current, power, start=10).i_th == pytest.approx(9.6)
+    assert analysis.laser_threshold(current, power, start=4).i_th != pytest.approx(9.6)
+    # 两条曲线按行一次完成，第二条阈值更高
+    rows = np.stack([power, np.where(current < 15, 0.01 * current, 0.4 * (current - 15) + 0.2)])
+    th = analysis.laser_threshold(current, rows)
+    assert th.i_th == pytest.approx([9.6, 14.5])
+    assert th.below.tolist() == [10, 15]
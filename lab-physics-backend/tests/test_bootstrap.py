@@ -0,0 +1,45 @@
+"""bootstrap 置信区间（app.batch_analysis.bootstrap）：重抽样权重、分批计算与固定种子。"""
+import numpy as np
+import pytest
+
+from app import analysis, batch_analysis
+from app.experiments import EXPERIMENTS
+
+
+def _millikan(**extra):
+    exp = EXPERIMENTS['millikan']
+    ni = [1, 2, 3, 4, 5, 6, 7, 8]
+    qi = [1.602 * n * (1 + 0.01 * (-1) ** n) for n in ni]
+    return exp, exp.request_model.model_validate(dict(ni=ni, qi=qi, **extra))
+
+
+def test_resample_weights_counts():
+    rng = np.random.default_rng(0)
+    mask = np.array([1.0, 1.0, 0.0, 1.0, 1.0])
+    w = analysis.resample_weights(mask, 50, rng)
+    assert w.shape == (50, 5)
+    # 每次重抽样抽取的点数等于有效点数，被屏蔽的位置从不抽中
+    assert (w.sum(axis=1) == 4).all()
+    assert (w[:, 2] == 0).all()
+    assert analysis.resample_weights(np.zeros(3), 4, rng).tolist() == [[0.0] * 3] * 4
+
+
+def test_interval_contains_value_and_is_reproducible():
+    exp, payload = _millikan()
+    first = batch_analysis.bootstrap(exp, payload, resamples=500)
+    assert first == batch_analysis.bootstrap(exp, payload, resamples=500)
+    e = first['e']
+    assert e['value'] == pytest.approx(1.602, rel=0.01)
+    assert e['ci_low'] < e['value'] < e['ci_high']
+    assert e['se'] > 0
+
+
+def test_chunked_resamples(monkeypatch):
+    # 每批只容纳 3 次重抽样：与一次算完的结果同分布，区间仍包含拟合值
+    exp, payload = _millikan()
+    whole = batch_analysis.bootstrap(exp, payload, resamples=400)['e']
+    monkeypatch.setattr(batch_analysis, 'BOOTSTRAP_CHUNK_ELEMENTS', 3 * len(payload.qi))
+    e = batch_analysis.bootstrap(exp, payload, resamples=400)['e']
+    assert e['value'] == whole['value']
+    assert e['ci_low'] < e['value'] < e['ci_high']
+    assert e['se'] == pytest.approx(whole['se'], rel=0.3)
@@ -0,0 +1,52 @@
+"""班级统计（app.class_stats）：每个学生每个实验只计最近一次提交，重新提交替换旧样本。"""
+import statistics
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import class_stats
+from app.database import Base
+
+
+@pytest.fixture()
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _e(db, cohort=''):
+    return class_stats.read(db, 'millikan', cohort).get('e')
+
+
+def test_resubmission_replaces_previous_sample(db):
+    class_stats.update(db, 'millikan', 1, 'A', {'e': 1.0})
+    class_stats.update(db, 'millikan', 2, 'A', {'e': 2.0})
+    class_stats.update(db, 'millikan', 2, 'A', {'e': 2.0})
+    class_stats.update(db, 'millikan', 3, 'A', {'e': 4.0})
+    # 学生 1 修正数据：撤销原最小值 1.0，最小值按其余样本重算
+    class_stats.update(db, 'millikan', 1, 'A', {'e': 3.0})
+    stats = _e(db)
+    assert stats['count'] == 3
+    assert stats['mean'] == pytest.approx(3.0)
+    assert stats['std'] == pytest.approx(statistics.stdev([3.0, 2.0, 4.0]))
+    assert (stats['min'], stats['max']) == (2.0, 4.0)
+    assert sum(b['count'] for b in stats['histogram']) == 3
+    assert _e(db, 'A')['count'] == 3
+
+
+def test_changing_cohort_moves_the_sample(db):
+    class_stats.update(db, 'millikan', 1, 'A', {'e': 1.6})
+    class_stats.update(db, 'millikan', 1, 'B', {'e': 1.7})
+    assert _e(db, 'A') is None
+    assert _e(db, 'B')['count'] == 1 and _e(db, 'B')['mean'] == pytest.approx(1.7)
+    assert _e(db)['count'] == 1
+
+
+def test_non_finite_values_are_skipped(db):
+    class_stats.update(db, 'millikan', 1, None, {'e': float('nan')})
+    assert _e(db) is None
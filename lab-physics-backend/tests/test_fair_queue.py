@@ -0,0 +1,55 @@
+"""按用户公平出队（app.workers._FairQueue）：用户之间轮转、单用户并发上限与优先级。"""
+from app import workers
+
+
+def _job(owner, name, priority=0):
+    return workers._Job(name, (), owner, priority)
+
+
+def _drain(queue, count):
+    names = []
+    for _ in range(count):
+        job = queue.get()
+        names.append(job.func_name)
+        queue.done(job)
+    return names
+
+
+def test_round_robin_between_users():
+    queue = workers._FairQueue(per_owner_limit=0)
+    for name in ("a1", "a2", "a3"):
+        queue.put(_job("a", name))
+    queue.put(_job("b", "b1"))
+    queue.put(_job("c", "c1"))
+    queue.put(_job("b", "b2"))
+    # a 先提交了 3 个任务，但 b、c 不必等 a 全部完成
+    assert _drain(queue, 6) == ["a1", "b1", "c1", "a2", "b2", "a3"]
+    assert queue.stats() == {"queued": 0, "queued_users": 0, "running_users": 0}
+
+
+def test_per_owner_limit_skips_busy_user():
+    queue = workers._FairQueue(per_owner_limit=1)
+    queue.put(_job("a", "a1"))
+    queue.put(_job("a", "a2"))
+    queue.put(_job("b", "b1"))
+    first = queue.get()
+    assert first.func_name == "a1"
+    # a 已有一个任务在执行，a2 暂不出队
+    second = queue.get()
+    assert second.func_name == "b1"
+    queue.done(first)
+    assert queue.get().func_name == "a2"
+
+
+def test_priority_before_round_robin():
+    queue = workers._FairQueue(per_owner_limit=0)
+    queue.put(_job("a", "a1"))
+    queue.put(_job("b", "b1"))
+    queue.put(_job("t", "t1", priority=1))
+    assert _drain(queue, 3) == ["t1", "a1", "b1"]
+
+
+def test_stop_returns_none():
+    queue = workers._FairQueue(per_owner_limit=0)
+    queue.stop(1)
+    assert queue.get() is None
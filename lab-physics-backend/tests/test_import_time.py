@@ -0,0 +1,58 @@
+"""API 进程启动导入检查：`import app.main` 不得加载绘图/数值栈，且 app 自身模块的导入耗时在预算内。
+
+fastapi/starlette/pydantic 等第三方依赖的耗时不计入预算，只统计 `app.*` 模块的 self 时间。
+预算见 doc/README.md（约 0.5 秒）；机器较慢时可用环境变量 IMPORT_TIME_BUDGET（秒）放宽。
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+BUDGET_SECONDS = float(os.getenv("IMPORT_TIME_BUDGET", "0.5"))
+# 这些顶层包只允许在 worker 进程中加载
+FORBIDDEN = ("numpy", "matplotlib", "PIL", "pandas", "scipy")
+RUNS = 3
+
+
+def _run(*args):
+    return subprocess.run(
+        [sys.executable, *args], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+
+
+def _app_self_time():
+    """在干净的子进程中导入 app.main，返回 app.* 模块 self 耗时之和（秒）。"""
+    proc = _run("-X", "importtime", "-c", "import app.main")
+    total = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|", 2)
+        name = name.strip()
+        if name != "app" and not name.startswith("app."):
+            continue
+        total += int(self_us)
+    return total / 1e6
+
+
+def test_import_app_main_skips_heavy_modules():
+    proc = _run("-c", (
+        "import sys, app.main; "
+        "print(' '.join(sorted({m.split('.')[0] for m in sys.modules})))"
+    ))
+    loaded = set(proc.stdout.split())
+    heavy = [name for name in FORBIDDEN if name in loaded]
+    assert not heavy, f"import app.main 加载了 {heavy}"
+
+
+def test_import_app_main_own_time():
+    # 取多次中的最快一次，排除磁盘缓存等偶发抖动
+    best = min(_app_self_time() for _ in range(RUNS))
+    assert best <= BUDGET_SECONDS, f"app.* 导入耗时 {best:.2f}s，超出预算 {BUDGET_SECONDS}s"
+
+
+if __name__ == "__main__":
+    test_import_app_main_skips_heavy_modules()
+    test_import_app_main_own_time()
+    print("ok")
@@ -0,0 +1,51 @@
+"""CSV 流式解析（app.ingest.ColumnReader）：分块边界、列长不等、空缺与非数值列、大小上限。"""
+import pytest
+
+from app import ingest
+
+
+def _read(data: bytes, chunk: int = 7, max_bytes: int = 0):
+    reader = ingest.ColumnReader(max_bytes)
+    for start in range(0, len(data), chunk):
+        reader.feed(data[start:start + chunk])
+    return reader, reader.close()
+
+
+def test_columns_across_chunk_boundaries():
+    data = "﻿# 仪器导出\ndark_voltage (V),dark_current (mA)\n0.5,0.01\n1.0,0.02\r\n1.5,0.04\n".encode("utf-8")
+    reader, columns = _read(data)
+    assert reader.headers == ["dark_voltage (V)", "dark_current (mA)"]
+    assert columns["dark_voltage (V)"].tolist() == [0.5, 1.0, 1.5]
+    assert columns["dark_current (mA)"].tolist() == [0.01, 0.02, 0.04]
+    assert ingest.column_field("dark_voltage (V)") == "dark_voltage"
+
+
+def test_trailing_blanks_end_a_shorter_column():
+    reader, columns = _read(b"a;b\n1;10\n2;20\n3;\n;\n")
+    assert columns["a"].tolist() == [1.0, 2.0, 3.0]
+    assert columns["b"].tolist() == [10.0, 20.0]
+    assert not reader.gaps and not reader.invalid
+
+
+def test_gap_and_text_columns_are_reported_not_shifted():
+    reader, columns = _read(b"a,b,c,note\n1,,5,x\n2,20,6,y\n3,30,oops,z\n")
+    # b 中间空缺、c 含文本：不补值也不跳过，整列剔除并记录原因
+    assert list(columns) == ["a"]
+    assert columns["a"].tolist() == [1.0, 2.0, 3.0]
+    assert set(reader.gaps) == {"b"} and "第2行" in reader.gaps["b"]
+    assert set(reader.invalid) == {"c", "note"}
+    assert ingest.invalid_fields(reader, {"c": "light_current"}) == {"light_current": reader.invalid["c"], "note": reader.invalid["note"]}
+
+
+def test_size_limit():
+    reader = ingest.ColumnReader(max_bytes=16)
+    reader.feed(b"a,b\n1,2\n")
+    with pytest.raises(ingest.CSVError) as exc:
+        reader.feed(b"3,4\n5,6\n7,8\n")
+    assert exc.value.status_code == 413
+
+
+def test_column_map():
+    assert ingest.parse_column_map("U (V):light_voltage, I:light_current") == {"U (V)": "light_voltage", "I": "light_current"}
+    with pytest.raises(ingest.CSVError):
+        ingest.parse_column_map("light_voltage")
@@ -2,6 +2,30 @@ export function clearPolling(ctx) {
   if (ctx.pollTimer) { clearInterval(ctx.pollTimer); ctx.pollTimer = null }
 }
 
+// 离开页面时取消仍在生成的任务，后端不再绘制剩余的图
+export function cancelGeneration(ctx, apiRequest) {
+  const tid = ctx.taskId
+  clearPolling(ctx)
+  if (tid && ctx.generating) {
+    apiRequest({ url: `/api/plots/status/${tid}`, method: 'DELETE' }).catch(() => {})
+  }
+  ctx.generating = false
+  ctx.taskId = ''
+}
+
+// 只转换新增的图像（任务进行中已完成的图像会逐张返回）
+async function appendImages(ctx, res, toWxFileFromDataUri) {
+  const imgs = (res.images_data && res.images_data.length) ? res.images_data : (res.images || [])
+  let fresh = imgs.slice(ctx.images.length)
+  if (!fresh.length) return
+  if (typeof wx !== 'undefined' && String(fresh[0]).startsWith('data:')) {
+    try {
+      fresh = await Promise.all(fresh.map((d) => toWxFileFromDataUri(d)))
+    } catch (e) {}
+  }
+  ctx.images = ctx.images.concat(fresh)
+}
+
 export async function startGeneration(ctx, apiRequest, startUrl, payload, toWxFileFromDataUri) {
   if (ctx.generating) return
   try {
@@ -12,33 +36,31 @@ export async function startGeneration(ctx, apiRequest, startUrl, payload, toWxFi
     if (!tid) { ctx.generating = false; uni.showToast({ title: '任务创建失败', icon: 'none' }); return }
     ctx.taskId = tid
     if (ctx.pollTimer) clearPolling(ctx)
+    let polling = false
     ctx.pollTimer = setInterval(async () => {
+      if (polling) return
+      polling = true
       try {
-        const res = await apiRequest({ url: `/api/plots/status/${ctx.taskId}`, method: 'GET' })
-        if (!res || !res.status) return
-        if (res.status === 'completed') {
-          let imgs = (res.images_data && res.images_data.length) ? res.images_data : (res.images || [])
-          if (typeof wx !== 'undefined') {
-            if (imgs && imgs.length && String(imgs[0]).startsWith('data:')) {
-              try {
-                const files = await Promise.all(imgs.map((d) => toWxFileFromDataUri(d)))
-                imgs = files
-              } catch (e) {}
-            }
-          }
-          ctx.images = imgs
+        const res = await apiRequest({ url: `/api/plots/status/${tid}`, method: 'GET' })
+        if (!res || !res.status || ctx.taskId !== tid) return
+        if (res.status === 'pending') {
+          await appendImages(ctx, res, toWxFileFromDataUri)
+        } else if (res.status === 'completed') {
+          await appendImages(ctx, res, toWxFileFromDataUri)
           ctx.generating = false
           ctx.taskId = ''
           clearPolling(ctx)
           if (!ctx.images.length) uni.showToast({ title: '未返回图像', icon: 'none' })
-        } else if (res.status === 'failed') {
+        } else {
           ctx.generating = false
           ctx.taskId = ''
           clearPolling(ctx)
           uni.showToast({ title: res.message || '生成失败', icon: 'none' })
         }
-      } catch (e) {}
+      } catch (e) {
+      } finally {
+        polling = false
+      }
     }, 1500)
   } catch (e) { ctx.generating = false }
 }
-